@@ -0,0 +1,49 @@
+# Context recycling for scrapy-playwright, so a long crawl (or a shared warm browser, core.browser_service)
+# doesn't keep growing one context's memory. After PLAYWRIGHT_RECYCLE_PAGES pages a named context is
+# drained (its open pages finish) and closed; the next request for that name gets a fresh one, built
+# from the same playwright_context_kwargs. Persistent (user_data_dir) contexts are left alone.
+#
+#   DOWNLOAD_HANDLERS = {'http': 'core.browser_pool.ContextRecyclingHandler', 'https': 'core.browser_pool.ContextRecyclingHandler'}
+import os
+import time
+import asyncio
+import logging
+from scrapy_playwright.handler import ScrapyPlaywrightDownloadHandler, DEFAULT_CONTEXT_NAME
+
+logger = logging.getLogger(__name__)
+
+RECYCLE_PAGES = int(os.getenv('PLAYWRIGHT_RECYCLE_PAGES', 200))
+DRAIN_TIMEOUT = 60  # Seconds to wait for open pages before closing a context anyway
+
+class ContextRecyclingHandler(ScrapyPlaywrightDownloadHandler):
+    """ScrapyPlaywrightDownloadHandler that replaces each context after PLAYWRIGHT_RECYCLE_PAGES pages (0 disables)."""
+
+    def __init__(self, crawler):
+        super().__init__(crawler)
+        self.recycle_pages = crawler.settings.getint('PLAYWRIGHT_RECYCLE_PAGES', RECYCLE_PAGES)
+        self.recycle_stats = crawler.stats
+        self.pages_served = {}  # context name -> pages opened in its current context
+        self.recycle_locks = {}
+
+    async def _create_page(self, request, spider):
+        name = request.meta.setdefault('playwright_context', DEFAULT_CONTEXT_NAME)
+        wrapper = self.context_wrappers.get(name)
+        if self.recycle_pages and wrapper is not None and not wrapper.persistent and self.pages_served.get(name, 0) >= self.recycle_pages:
+            await self._recycle(name, wrapper)
+        page = await super()._create_page(request, spider)
+        self.pages_served[name] = self.pages_served.get(name, 0) + 1
+        return page
+
+    async def _recycle(self, name, wrapper):
+        async with self.recycle_locks.setdefault(name, asyncio.Lock()):
+            if self.context_wrappers.get(name) is not wrapper:
+                return  # Another request already replaced it
+            deadline = time.monotonic() + DRAIN_TIMEOUT
+            while wrapper.context.pages and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+            logger.info(f"Recycling browser context '{name}' after {self.pages_served.get(name, 0)} pages")
+            async with self.context_launch_lock:  # No page or context for this name is created until it's gone
+                self.pages_served[name] = 0
+                await wrapper.context.close()
+                self.context_wrappers.pop(name, None)  # Normally already dropped by the close callback
+            self.recycle_stats.inc_value('playwright/context_recycled')
@@ -0,0 +1,97 @@
+# Long-lived local Chromium that Playwright crawls attach to over CDP instead of launching their own.
+# scripts/browser_service.py keeps one browser process running with remote debugging on
+# BROWSER_SERVICE_PORT and restarts it if it dies; clients find it through PLAYWRIGHT_CDP_URL:
+#   - Scrapy: settings set PLAYWRIGHT_CDP_URL = service_url() (scrapy-playwright connects over CDP,
+#     pre-warms its startup contexts there, and core.browser_pool recycles contexts after N pages);
+#   - scripts: connect_browser(playwright) returns the warm browser, or None to launch as before.
+# An unset or unreachable PLAYWRIGHT_CDP_URL means everything launches its own browser, as before.
+import os
+import sys
+import time
+import logging
+import subprocess
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+logger = logging.getLogger(__name__)
+
+SERVICE_PORT = int(os.getenv('BROWSER_SERVICE_PORT', 9222))
+SERVICE_PROFILE = os.getenv('BROWSER_SERVICE_PROFILE', os.path.expanduser('~/.cache/ixome/browser_service'))
+SERVICE_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scripts', 'browser_service.py'))
+CHROMIUM_ARGS = ['--disable-blink-features=AutomationControlled', '--no-sandbox', '--disable-gpu', '--no-first-run', '--no-default-browser-check']
+RESTART_BACKOFF = 5
+START_TIMEOUT = 30
+
+def service_available(cdp_url, timeout=1):
+    try:
+        with urlopen(cdp_url.rstrip('/') + '/json/version', timeout=timeout) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+def service_url():
+    """PLAYWRIGHT_CDP_URL if a browser answers there, else None (callers then launch their own)."""
+    cdp_url = os.getenv('PLAYWRIGHT_CDP_URL')
+    if not cdp_url:
+        return None
+    if not service_available(cdp_url):
+        logger.warning(f"No browser service at {cdp_url}; launching a local browser")
+        return None
+    return cdp_url
+
+def connect_browser(playwright):
+    """Sync-API Browser attached to the warm service, or None if there is none to attach to."""
+    cdp_url = service_url()
+    if not cdp_url:
+        return None
+    browser = playwright.chromium.connect_over_cdp(cdp_url)
+    logger.info(f"Attached to browser service at {cdp_url} ({browser.version})")
+    return browser
+
+def ensure_service(timeout=START_TIMEOUT):
+    """Start scripts/browser_service.py in the background if PLAYWRIGHT_CDP_URL is set but nothing answers; True once it does."""
+    cdp_url = os.getenv('PLAYWRIGHT_CDP_URL')
+    if not cdp_url:
+        return False
+    if service_available(cdp_url):
+        return True
+    logger.info(f"Starting browser service for {cdp_url}")
+    port = urlsplit(cdp_url).port or SERVICE_PORT
+    subprocess.Popen([sys.executable, SERVICE_SCRIPT, '--port', str(port)], start_new_session=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if service_available(cdp_url):
+            return True
+        time.sleep(0.5)
+    logger.error(f"Browser service did not come up at {cdp_url} within {timeout}s")
+    return False
+
+def chromium_command(executable, port=SERVICE_PORT, profile=SERVICE_PROFILE, headless=True):
+    command = [executable, f'--remote-debugging-port={port}', '--remote-debugging-address=127.0.0.1', f'--user-data-dir={profile}']
+    if headless:
+        command.append('--headless=new')
+    return command + CHROMIUM_ARGS + ['about:blank']
+
+def run_service(port=SERVICE_PORT, profile=SERVICE_PROFILE, headless=True):
+    """Run Playwright's Chromium with remote debugging on port until interrupted, restarting it if it exits."""
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as p:
+        executable = p.chromium.executable_path
+    os.makedirs(profile, exist_ok=True)
+    command = chromium_command(executable, port, profile, headless)
+    cdp_url = f'http://127.0.0.1:{port}'
+    while True:
+        started = time.time()
+        process = subprocess.Popen(command)
+        while not service_available(cdp_url) and process.poll() is None and time.time() - started < START_TIMEOUT:
+            time.sleep(0.2)
+        logger.info(f"Browser service ready at {cdp_url} (pid {process.pid}, {time.time() - started:.1f}s); export PLAYWRIGHT_CDP_URL={cdp_url}")
+        try:
+            code = process.wait()
+        except KeyboardInterrupt:
+            process.terminate()
+            process.wait(timeout=10)
+            logger.info("Browser service stopped")
+            return
+        logger.warning(f"Browser exited with code {code}; restarting in {RESTART_BACKOFF}s")
+        time.sleep(RESTART_BACKOFF)
@@ -0,0 +1,82 @@
+# Token-aware chunking for embedding input.
+# Splits long documents into overlapping windows that each fit the embedding model, instead of
+# cutting text at a fixed character count and losing the rest.
+import os
+import logging
+from core.embeddings import EMBEDDING_MODEL, MAX_INPUT_TOKENS, _get_encoding, count_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_TOKENS = 800
+DEFAULT_CHUNK_OVERLAP = 100
+
+def _token_windows(text, max_tokens, overlap, model):
+    """Yield (char_offset, chunk_text) windows of at most max_tokens tokens."""
+    encoding = _get_encoding(model)
+    step = max(1, max_tokens - overlap)
+    if encoding is None:
+        # ~3 chars/token is conservative; break on whitespace so words stay whole
+        size, stride = max_tokens * 3, step * 3
+        start = 0
+        while start < len(text):
+            end = min(len(text), start + size)
+            if end < len(text):
+                space = text.rfind(' ', start + size // 2, end)
+                end = space if space > 0 else end
+            yield start, text[start:end]
+            if end >= len(text):
+                break
+            next_start = max(start + 1, end - (size - stride))
+            space = text.find(' ', next_start, end)
+            start = space + 1 if space != -1 else next_start
+        return
+    tokens = encoding.encode(text, disallowed_special=())
+    try:
+        _, offsets = encoding.decode_with_offsets(tokens)
+    except Exception:  # Older tiktoken or a window splitting a multibyte character
+        offsets = None
+    for start in range(0, len(tokens), step):
+        window = tokens[start:start + max_tokens]
+        yield (offsets[start] if offsets else None), encoding.decode(window)
+        if start + max_tokens >= len(tokens):
+            break
+
+def chunk_text(text, max_tokens=None, overlap=None, header='', model=EMBEDDING_MODEL):
+    """Split text into chunks of at most max_tokens tokens (header included), overlapping by overlap tokens.
+
+    Each chunk is a dict with 'text' (header + window), 'chunk_index' and 'chunk_offset'
+    (character offset of the window in the original text).
+    """
+    max_tokens = min(max_tokens or int(os.getenv('CHUNK_TOKENS', DEFAULT_CHUNK_TOKENS)), MAX_INPUT_TOKENS)
+    overlap = overlap if overlap is not None else int(os.getenv('CHUNK_OVERLAP', DEFAULT_CHUNK_OVERLAP))
+    header = header.strip()
+    budget = max_tokens - (count_tokens(header, model) + 1 if header else 0)
+    if budget < 32:
+        raise ValueError(f"Chunk size {max_tokens} leaves no room for a {len(header)}-char header")
+    overlap = min(overlap, budget // 2)
+    text = text or ''
+    if count_tokens(text, model) <= budget:
+        windows = [(0, text)]
+    else:
+        windows = list(_token_windows(text, budget, overlap, model))
+    return [
+        {'text': f"{header} {window}".strip() if header else window, 'chunk_index': i, 'chunk_offset': offset}
+        for i, (offset, window) in enumerate(windows)
+    ]
+
+def chunk_records(items, text_fn, header_fn=None, max_tokens=None, overlap=None, model=EMBEDDING_MODEL):
+    """Expand records into (record_index, chunk) pairs ready for batched embedding."""
+    pairs = []
+    for i, item in enumerate(items):
+        chunks = chunk_text(text_fn(item), max_tokens, overlap, header_fn(item) if header_fn else '', model)
+        if len(chunks) > 1:
+            logger.info(f"Split record {i} into {len(chunks)} chunks")
+        pairs.extend((i, chunk) for chunk in chunks)
+    return pairs
+
+def chunk_metadata(parent_id, chunk):
+    """Metadata linking a chunk vector back to its parent record."""
+    metadata = {'parent_id': str(parent_id), 'chunk_index': chunk['chunk_index']}
+    if chunk['chunk_offset'] is not None:
+        metadata['chunk_offset'] = chunk['chunk_offset']
+    return metadata
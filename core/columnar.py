@@ -0,0 +1,192 @@
+# Columnar (Parquet) intermediate format between the scrape and load stages.
+# Records are written in row groups with zstd compression by default; readers load only the
+# columns they ask for and skip row groups whose brand/crawl-date statistics rule them out,
+# so neither side parses the whole crawl. pyarrow is optional: without it, callers keep using JSON.
+import os
+import json
+import logging
+from datetime import datetime, timezone
+from core.records import FIELDS, DocumentRecord, normalize_record
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency
+    pa = ds = pq = None
+
+PARQUET_MAGIC = b'PAR1'
+ROW_GROUP_ROWS = 50000
+STRING_FIELDS = tuple(f for f in FIELDS if f not in ('depth', 'crawled_at'))
+
+def available():
+    return pa is not None
+
+def is_parquet(path):
+    with open(path, 'rb') as f:
+        return f.read(4) == PARQUET_MAGIC
+
+def default_compression():
+    """PARQUET_COMPRESSION (default zstd; 'none' to disable), falling back to snappy if zstd is missing."""
+    codec = os.getenv('PARQUET_COMPRESSION', 'zstd').lower()
+    if codec == 'none':
+        return None
+    if not pa.Codec.is_available(codec):
+        logger.warning(f"Parquet codec {codec} unavailable; using snappy")
+        return 'snappy'
+    return codec
+
+def record_schema(extra_fields=()):
+    return pa.schema([(f, pa.string()) for f in STRING_FIELDS] + [
+        ('depth', pa.int32()),
+        ('crawled_at', pa.timestamp('ms', tz='UTC')),
+    ] + [(f, pa.string()) for f in extra_fields])
+
+def timestamp(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+class ParquetRecordWriter:
+    """Append records (DocumentRecords or dicts) to a Parquet file one row group at a time.
+
+    add(record, extra) also stores extra (a dict of non-FIELDS values) as string columns; the set
+    of extra columns is fixed by the first row group, and keys first seen later are dropped with a warning.
+    """
+
+    def __init__(self, where, compression='default', row_group_rows=ROW_GROUP_ROWS):
+        if not available():
+            raise ImportError("pyarrow is required for Parquet export")
+        self.where = where
+        self.compression = default_compression() if compression == 'default' else compression
+        self.schema = None
+        self._writer = None  # Opened at the first flush, once the extra columns are known
+        self.row_group_rows = row_group_rows
+        self.extra_fields = ()
+        self._columns = {f: [] for f in FIELDS}
+        self._extras = []
+        self._dropped = set()
+        self._buffered = 0
+        self.written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, record, extra=None):
+        self._extras.append(extra or {})
+        get = record.get
+        for field in STRING_FIELDS:
+            value = get(field)
+            self._columns[field].append('' if value is None else str(value))
+        self._columns['depth'].append(int(get('depth') or 0))
+        self._columns['crawled_at'].append(timestamp(get('crawled_at')))
+        self._buffered += 1
+        if self._buffered >= self.row_group_rows:
+            self.flush()
+
+    def _open(self):
+        self.extra_fields = tuple(sorted({key for extra in self._extras for key in extra}))
+        self.schema = record_schema(self.extra_fields)
+        self._writer = pq.ParquetWriter(self.where, self.schema, compression=self.compression or 'none')
+
+    def flush(self):
+        if self._writer is None:
+            self._open()
+        if not self._buffered:
+            return
+        dropped = {key for extra in self._extras for key in extra} - set(self.extra_fields) - self._dropped
+        if dropped:
+            logger.warning(f"Parquet schema was fixed by the first row group; dropping new field(s) {', '.join(sorted(dropped))}")
+            self._dropped |= dropped
+        columns = dict(self._columns)
+        for field in self.extra_fields:
+            columns[field] = [None if extra.get(field) is None else str(extra[field]) for extra in self._extras]
+        table = pa.Table.from_pydict(columns, schema=self.schema)
+        self._writer.write_table(table, row_group_size=self.row_group_rows)
+        self.written += self._buffered
+        self._columns = {f: [] for f in FIELDS}
+        self._extras = []
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+def write_records(records, path, compression='default'):
+    """Write records to a Parquet file; returns the number written."""
+    with ParquetRecordWriter(path, compression) as writer:
+        for record in records:
+            writer.add(record)
+    logger.info(f"Wrote {writer.written} records to {path}")
+    return writer.written
+
+def iter_parquet(path, columns=None, brand=None, crawled_since=None, crawled_until=None, batch_rows=ROW_GROUP_ROWS):
+    """Yield record dicts holding only columns (default: all), filtered by brand and crawl time.
+
+    Filters are pushed down to row-group statistics, so non-matching groups are never decoded.
+    """
+    if not available():
+        raise ImportError(f"pyarrow is required to read {path}")
+    dataset = ds.dataset(path, format='parquet')
+    names = [c for c in (columns or FIELDS) if c in dataset.schema.names]
+    terms = []
+    if brand:
+        terms.append(ds.field('brand') == brand)
+    if crawled_since:
+        terms.append(ds.field('crawled_at') >= timestamp(crawled_since))
+    if crawled_until:
+        terms.append(ds.field('crawled_at') < timestamp(crawled_until))
+    condition = None
+    for term in terms:
+        condition = term if condition is None else condition & term
+    for batch in dataset.to_batches(columns=names, filter=condition, batch_size=batch_rows):
+        data = batch.to_pydict()
+        if 'crawled_at' in data:
+            data['crawled_at'] = [v.isoformat() if v else '' for v in data['crawled_at']]
+        for row in zip(*(data[name] for name in names)):
+            yield dict(zip(names, row))
+
+class ParquetItemExporter:
+    """Scrapy feed exporter: FEED_EXPORTERS = {'parquet': 'core.columnar.ParquetItemExporter'}, then -o items.parquet."""
+
+    def __init__(self, file, **kwargs):
+        self.file = file
+        self.writer = None
+
+    def start_exporting(self):
+        self.writer = ParquetRecordWriter(self.file)
+        self._crawled_at = datetime.now(timezone.utc)
+
+    def export_item(self, item):
+        item_dict = dict(item)
+        # Same normalization as the JSON pipelines (title/description fill issue/solution); other
+        # scraper fields such as pdf_url, sku, title and description are kept as extra columns
+        record = normalize_record(item_dict) or item_dict
+        record = record.to_dict() if isinstance(record, DocumentRecord) else record
+        if not record.get('crawled_at'):
+            record['crawled_at'] = self._crawled_at
+        self.writer.add(record, {k: v for k, v in item_dict.items() if k not in FIELDS})
+        return item
+
+    def finish_exporting(self):
+        self.writer.close()
+
+def export_records(records, path):
+    """Save records as Parquet when path ends in .parquet, otherwise as a compact JSON array."""
+    if path.endswith('.parquet'):
+        return write_records(records, path)
+    records = [r.to_dict() if isinstance(r, DocumentRecord) else r for r in records]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False)
+    return len(records)
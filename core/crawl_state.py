@@ -0,0 +1,264 @@
+# Persistent crawl state for incremental recrawls.
+# A SQLite file keeps, per URL fingerprint, the ETag/Last-Modified validators and a hash of the last
+# body, and per scraped item (core.manifest document key) the hash last emitted. With CRAWL_INCREMENTAL=1
+# leaf pages that opt in (meta['crawl_state_skip'] = True: articles, data sheets) are requested
+# conditionally and not parsed again when they come back 304 or with an identical body; listing and
+# search pages are always parsed so their next-page links are followed. Items are dropped before the
+# output pipelines only if their content has not changed and a loader acknowledged ingesting it
+# (acknowledge_loaded() after IngestManifest.commit), so a crawl whose output was never loaded, or
+# whose load failed, emits the same changes again next time.
+# Entries older than CRAWL_STATE_MAX_AGE_DAYS are refreshed in full so nothing goes stale forever.
+#
+# Incremental output holds only new/changed items, so loaders must not prune by its absences; the
+# writers mark it (core.record_writer.mark_incremental) and the loaders check the mark, not their
+# own environment.
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from core.manifest import canonical_url, document_key, content_hash
+from core.record_writer import mark_incremental
+
+logger = logging.getLogger(__name__)
+
+try:
+    from scrapy import signals
+    from scrapy.exceptions import DropItem, IgnoreRequest
+except ImportError:  # Optional dependency; only the Scrapy middleware and pipeline need it
+    signals = DropItem = IgnoreRequest = None
+
+DEFAULT_CRAWL_STATE_PATH = os.path.expanduser('~/.cache/ixome/crawl_state.sqlite')
+MAX_AGE_DAYS = 7
+COMMIT_EVERY = 200
+
+def incremental_enabled():
+    return os.getenv('CRAWL_INCREMENTAL', '0').strip().lower() in ('1', 'true', 'yes', 'on')
+
+def url_fingerprint(url):
+    return hashlib.sha1(canonical_url(url).encode('utf-8')).hexdigest()
+
+def body_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+class CrawlState:
+    """SQLite store of page validators/hashes and emitted item hashes; thread-safe, batched commits."""
+
+    def __init__(self, path=DEFAULT_CRAWL_STATE_PATH, max_age_days=MAX_AGE_DAYS):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url_fp TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                parsed_at REAL,
+                checked_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                doc_key TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                emitted_at REAL NOT NULL,
+                loaded_at REAL
+            )
+        """)
+        if 'loaded_at' not in [row[1] for row in self._conn.execute('PRAGMA table_info(items)')]:
+            self._conn.execute('ALTER TABLE items ADD COLUMN loaded_at REAL')  # Older state files: every item counts as not loaded yet
+        self._conn.commit()
+
+    def _fresh(self, timestamp):
+        return timestamp is not None and time.time() - timestamp < self.max_age
+
+    def _wrote(self):
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+    def conditional_headers(self, url):
+        """If-None-Match/If-Modified-Since for a page parsed within the max age, else {}."""
+        with self._lock:
+            row = self._conn.execute('SELECT etag, last_modified, parsed_at FROM pages WHERE url_fp = ?', (url_fingerprint(url),)).fetchone()
+        if row is None or not self._fresh(row[2]):
+            return {}
+        headers = {}
+        if row[0]:
+            headers['If-None-Match'] = row[0]
+        if row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def not_modified(self, url):
+        with self._lock:
+            self._conn.execute('UPDATE pages SET checked_at = ? WHERE url_fp = ?', (time.time(), url_fingerprint(url)))
+            self._wrote()
+
+    def record_page(self, url, etag=None, last_modified=None, digest=None):
+        """Store a fetched page; True if it should be parsed (new, changed or due for a full refresh)."""
+        fp, now = url_fingerprint(url), time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT content_hash, parsed_at FROM pages WHERE url_fp = ?', (fp,)).fetchone()
+            changed = row is None or row[0] != digest or not self._fresh(row[1])
+            parsed_at = now if changed else row[1]
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pages (url_fp, url, etag, last_modified, content_hash, parsed_at, checked_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (fp, url, etag, last_modified, digest, parsed_at, now)
+            )
+            self._wrote()
+        return changed
+
+    def record_item(self, item):
+        """True unless item was emitted unchanged within the max age and a loader has acknowledged it since; records it as emitted."""
+        key, digest = document_key(item), content_hash(item)
+        with self._lock:
+            row = self._conn.execute('SELECT content_hash, emitted_at, loaded_at FROM items WHERE doc_key = ?', (key,)).fetchone()
+            if row is not None and row[0] == digest and self._fresh(row[1]) and row[2] is not None and row[2] >= row[1]:
+                return False
+            self._conn.execute('INSERT OR REPLACE INTO items (doc_key, content_hash, emitted_at, loaded_at) VALUES (?, ?, ?, ?)',
+                               (key, digest, time.time(), row[2] if row is not None else None))
+            self._wrote()
+        return True
+
+    def acknowledge(self, keys, since):
+        """Mark items as ingested by a load that started reading at since; later emissions stay pending."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany('UPDATE items SET loaded_at = ? WHERE doc_key = ? AND emitted_at <= ?', [(now, key, since) for key in keys])
+            self._conn.commit()
+            self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+_states = {}
+_states_lock = threading.Lock()
+
+def get_crawl_state(path=None, max_age_days=None):
+    """Process-wide CrawlState per file (CRAWL_STATE_PATH), shared so writers never contend for the SQLite lock."""
+    path = path or os.getenv('CRAWL_STATE_PATH', DEFAULT_CRAWL_STATE_PATH)
+    if max_age_days is None:
+        max_age_days = float(os.getenv('CRAWL_STATE_MAX_AGE_DAYS', MAX_AGE_DAYS))
+    with _states_lock:
+        if path not in _states:
+            _states[path] = CrawlState(path, max_age_days)
+        return _states[path]
+
+def acknowledge_loaded(plan, failed=(), skipped=()):
+    """After IngestManifest.commit: acknowledge the plan's unchanged and successfully upserted records, plus skipped keys (e.g. filtered out)."""
+    keys = [key for i, (key, _, _) in enumerate(plan.changed) if i not in failed] + list(plan.unchanged) + list(skipped)
+    get_crawl_state().acknowledge(keys, plan.started_at)
+
+def _from_settings(settings):
+    max_age = settings.get('CRAWL_STATE_MAX_AGE_DAYS')
+    state = get_crawl_state(settings.get('CRAWL_STATE_PATH'), float(max_age) if max_age is not None else None)
+    return state, settings.getbool('CRAWL_INCREMENTAL', incremental_enabled())
+
+class CrawlStateMiddleware:
+    """Downloader middleware: conditional requests, and unchanged leaf pages dropped before parsing.
+
+    Settings: CRAWL_STATE_PATH, CRAWL_STATE_MAX_AGE_DAYS, CRAWL_INCREMENTAL (defaults from the
+    environment). Without CRAWL_INCREMENTAL the state is only recorded. Only requests with
+    meta['crawl_state_skip'] = True are skipped (IgnoreRequest, which errbacks should treat as
+    expected); requests with meta['crawl_state'] = False (logins, searches, listings whose URL does
+    not identify the results) are left alone. Install below HttpCompressionMiddleware (e.g. 560) so
+    bodies are hashed decompressed.
+    """
+
+    def __init__(self, state, incremental, stats):
+        self.state = state
+        self.incremental = incremental
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(*_from_settings(crawler.settings), crawler.stats)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def _skippable(self, request):
+        return self.incremental and request.meta.get('crawl_state_skip') and request.meta.get('crawl_state') is not False
+
+    def process_request(self, request, spider):
+        if not self._skippable(request):
+            return None
+        for header, value in self.state.conditional_headers(request.url).items():
+            request.headers.setdefault(header, value)
+        return None
+
+    def process_response(self, request, response, spider):
+        if request.meta.get('crawl_state') is False:
+            return response
+        if response.status == 304 and self._skippable(request):
+            self.state.not_modified(request.url)
+            self.stats.inc_value('crawl_state/not_modified')
+            raise IgnoreRequest(f"Not modified since last crawl: {request.url}")
+        if response.status != 200:
+            return response
+        changed = self.state.record_page(
+            request.url,
+            response.headers.get('ETag', b'').decode('latin-1') or None,
+            response.headers.get('Last-Modified', b'').decode('latin-1') or None,
+            body_hash(response.body),
+        )
+        if not changed and self._skippable(request):
+            self.stats.inc_value('crawl_state/unchanged')
+            raise IgnoreRequest(f"Unchanged since last crawl: {request.url}")
+        return response
+
+    def spider_closed(self, spider):
+        self.state.flush()
+
+class CrawlStatePipeline:
+    """Item pipeline: drops items whose content was already emitted and loaded (CRAWL_INCREMENTAL only).
+
+    Runs before the output pipelines, e.g. ITEM_PIPELINES = {'core.crawl_state.CrawlStatePipeline': 200, ...}.
+    Local feed exports (-o items.json) are marked incremental while the crawl runs, and keep the
+    mark at the end of an incremental crawl.
+    """
+
+    def __init__(self, state, incremental, stats, outputs=()):
+        self.state = state
+        self.incremental = incremental
+        self.stats = stats
+        self.outputs = outputs
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(*_from_settings(crawler.settings), crawler.stats, feed_paths(crawler.settings))
+
+    def open_spider(self, spider):
+        for path in self.outputs:
+            mark_incremental(path, True)  # An unfinished crawl's output is partial too
+
+    def process_item(self, item, spider):
+        if not self.state.record_item(item) and self.incremental:
+            self.stats.inc_value('crawl_state/unchanged_items')
+            raise DropItem(f"Unchanged since last crawl: {item.get('url')}")
+        return item
+
+    def close_spider(self, spider):
+        self.state.flush()
+        for path in self.outputs:
+            mark_incremental(path, self.incremental)
+
+def feed_paths(settings):
+    """Local file paths of the FEEDS exports (templated URIs are skipped)."""
+    paths = []
+    for uri in settings.getdict('FEEDS'):
+        uri = str(uri)
+        if '%(' in uri or ('://' in uri and not uri.startswith('file://')):
+            continue
+        paths.append(uri[len('file://'):] if uri.startswith('file://') else uri)
+    return paths
@@ -0,0 +1,132 @@
+# Process-wide Postgres connection pool shared by the graphs, loaders and retrieval.
+# Connections are opened once and reused, checked before being handed out after sitting idle, and
+# keep their server-side prepared statements, so hot per-row statements are parsed only once.
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+from core.schema import DOCUMENT_COLUMNS, document_row
+
+logger = logging.getLogger(__name__)
+
+class PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers its prepared statements and when it was last used."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.last_used = time.monotonic()
+
+class ConnectionPool:
+    """Blocking wrapper around ThreadedConnectionPool with health checks.
+
+    Sizes come from PG_POOL_MIN/PG_POOL_MAX; a connection idle for more than
+    PG_POOL_CHECK_SECONDS is pinged with SELECT 1 before reuse and replaced if dead.
+    """
+
+    def __init__(self, minconn=None, maxconn=None, check_after=None, **connect_kwargs):
+        self.minconn = minconn or int(os.getenv('PG_POOL_MIN', 1))
+        self.maxconn = maxconn or int(os.getenv('PG_POOL_MAX', 10))
+        self.check_after = check_after if check_after is not None else float(os.getenv('PG_POOL_CHECK_SECONDS', 30))
+        self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, connection_factory=PooledConnection, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(self.maxconn)  # getconn() raises when exhausted; wait instead
+        logger.info(f"Postgres pool ready ({self.minconn}-{self.maxconn} connections)")
+
+    def _healthy(self, conn):
+        if conn.closed:
+            return False
+        if time.monotonic() - conn.last_used < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            logger.warning(f"Discarding dead pooled connection: {e}")
+            return False
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            for _ in range(self.maxconn + 1):
+                conn = self._pool.getconn()
+                if self._healthy(conn):
+                    return conn
+                self._pool.putconn(conn, close=True)
+            raise psycopg2.OperationalError("No healthy Postgres connection available")
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        try:
+            if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()  # Never hand out a connection mid-transaction
+            conn.last_used = time.monotonic()
+            self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        self._pool.closeall()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """The process-wide pool, configured from the PG_* environment variables on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                dbname=os.getenv('PG_DBNAME', 'ixome_db'),
+                user=os.getenv('PG_USER', 'postgres'),
+                password=os.getenv('PG_PASSWORD'),
+                host=os.getenv('PG_HOST', 'localhost'),
+                port=os.getenv('PG_PORT', 5432)
+            )
+        return _pool
+
+@contextmanager
+def get_pg_connection():
+    """Borrow a pooled connection; commits on success, rolls back on error, then returns it."""
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.release(conn)
+
+def execute_prepared(cur, name, sql, params):
+    """Run sql (with %s placeholders) as a server-side prepared statement, preparing it once per connection."""
+    conn = cur.connection
+    if name not in conn.prepared:
+        parts = sql.split('%s')
+        cur.execute(f"PREPARE {name} AS " + parts[0] + ''.join(f"${i}{part}" for i, part in enumerate(parts[1:], start=1)))
+        conn.prepared.add(name)
+    cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+def upsert_document(item, brand, source, conn=None):
+    """Insert or update one documents row by canonical URL and return its id; pass conn to reuse a borrowed connection."""
+    if conn is None:
+        with get_pg_connection() as conn:
+            return upsert_document(item, brand, source, conn)
+    columns = ', '.join(DOCUMENT_COLUMNS)
+    updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in DOCUMENT_COLUMNS if c != 'doc_key')
+    with conn.cursor() as cur:
+        execute_prepared(cur, 'upsert_document', f"""
+            INSERT INTO documents ({columns}) VALUES ({', '.join(['%s'] * len(DOCUMENT_COLUMNS))})
+            ON CONFLICT (doc_key) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP
+            RETURNING id
+        """, document_row(item, brand, source))
+        return cur.fetchone()[0]
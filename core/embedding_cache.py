@@ -0,0 +1,121 @@
+# Content-addressed on-disk embedding cache shared by all loaders.
+# Keyed by sha256 of (model, normalized text); LRU-evicted once it holds more than max_entries vectors.
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.expanduser('~/.cache/ixome/embeddings.sqlite')
+DEFAULT_MAX_ENTRIES = 500000
+
+def normalize_text(text):
+    return ' '.join(text.split())
+
+def cache_key(model, text):
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache with LRU eviction and hit/miss counters."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)')
+        self._conn.commit()
+        self._size = self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+    def __len__(self):
+        return self._size
+
+    def get_many(self, keys):
+        """Return {key: embedding} for the keys present in the cache."""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(unique), 500):  # Stay under SQLite's bound-parameter limit
+                chunk = unique[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for key, blob in self._conn.execute(f'SELECT key, vector FROM embeddings WHERE key IN ({placeholders})', chunk):
+                    found[key] = array('f', blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany('UPDATE embeddings SET last_access = ? WHERE key = ?', [(now, key) for key in found])
+                self._conn.commit()
+        self.hits += sum(1 for key in keys if key in found)
+        self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items):
+        """Store (key, embedding) pairs, evicting least recently used entries past max_entries."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, array('f', embedding).tobytes(), now) for key, embedding in items]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany('INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)', rows)
+            self._size += self._conn.total_changes - before
+            if self._size > self.max_entries:
+                excess = self._size - self.max_entries
+                self._conn.execute(
+                    'DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access LIMIT ?)',
+                    (excess,)
+                )
+                self._size -= excess
+                logger.info(f"Evicted {excess} least recently used embeddings from cache")
+            self._conn.commit()
+
+    def put(self, key, embedding):
+        self.put_many([(key, embedding)])
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': self._size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+
+def get_embedding_cache():
+    """Process-wide cache configured from EMBEDDING_CACHE_PATH / EMBEDDING_CACHE_MAX_ENTRIES.
+
+    Set EMBEDDING_CACHE_PATH to an empty string to disable caching.
+    """
+    global _cache
+    path = os.getenv('EMBEDDING_CACHE_PATH', DEFAULT_CACHE_PATH)
+    if not path:
+        return None
+    if _cache is None:
+        _cache = EmbeddingCache(path, int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)))
+        logger.info(f"Using embedding cache at {path} ({len(_cache)} entries)")
+    return _cache
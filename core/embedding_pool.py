@@ -0,0 +1,181 @@
+# Async bounded-concurrency embedding executor with token-bucket rate limiting.
+# Keeps up to `concurrency` embedding requests in flight, paced by requests/min and tokens/min
+# buckets, and backs every worker off together when the API answers 429.
+import os
+import time
+import queue
+import random
+import asyncio
+import logging
+import threading
+from openai import AsyncOpenAI, RateLimitError
+from core.embeddings import BatchEmbedder, EMBEDDING_MODEL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_REQUESTS_PER_MINUTE = 3000
+DEFAULT_TOKENS_PER_MINUTE = 1000000
+MAX_BACKOFF = 60.0
+
+_DONE = object()
+
+class TokenBucket:
+    """Refills at per_minute/60 units per second up to a burst of per_minute units."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        # Single event loop thread: check-and-take between awaits is atomic
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.available >= amount:
+                self.available -= amount
+                return
+            await asyncio.sleep((amount - self.available) / self.rate)
+
+def _retry_after(error):
+    try:
+        return float(error.response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+class AsyncEmbeddingExecutor(BatchEmbedder):
+    """BatchEmbedder that sends its request batches concurrently under API quota limits.
+
+    Usable from synchronous code: iter_batches()/embed_texts()/embed_query() drive a private
+    event loop thread, so the loaders and graph nodes need no asyncio of their own. Async
+    callers can use aiter_batches()/aembed_texts() directly on that loop.
+    """
+
+    def __init__(self, client=None, model=EMBEDDING_MODEL, concurrency=None, requests_per_minute=None,
+                 tokens_per_minute=None, max_retries=6, **kwargs):
+        super().__init__(client=client or AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY')), model=model, **kwargs)
+        self.concurrency = concurrency or int(os.getenv('EMBEDDING_CONCURRENCY', DEFAULT_CONCURRENCY))
+        self.request_bucket = TokenBucket(requests_per_minute or int(os.getenv('EMBEDDING_RPM', DEFAULT_REQUESTS_PER_MINUTE)))
+        self.token_bucket = TokenBucket(tokens_per_minute or int(os.getenv('EMBEDDING_TPM', DEFAULT_TOKENS_PER_MINUTE)))
+        self.max_retries = max_retries
+        self.rate_limited = 0
+        self._backoff = 0.0
+        self._resume_at = 0.0
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def _get_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='embedding-executor', daemon=True).start()
+        return self._loop
+
+    async def _request_async(self, inputs, tokens):
+        for attempt in range(self.max_retries + 1):
+            delay = self._resume_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self.request_bucket.acquire(1)
+            await self.token_bucket.acquire(tokens)
+            try:
+                response = await self.client.embeddings.create(input=inputs, model=self.model)
+            except RateLimitError as e:
+                self.rate_limited += 1
+                if attempt == self.max_retries:
+                    raise
+                # Back off every worker together; grow on repeated 429s, honour Retry-After
+                self._backoff = min(max(self._backoff * 2, 1.0), MAX_BACKOFF)
+                wait = max(self._backoff, _retry_after(e) or 0.0) * random.uniform(1.0, 1.25)
+                self._resume_at = max(self._resume_at, time.monotonic() + wait)
+                logger.warning(f"Rate limited (attempt {attempt + 1}), pausing embedding workers for {wait:.1f}s")
+                continue
+            self.requests += 1
+            self._backoff /= 2
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    async def aiter_batches(self, texts):
+        """Yield [(index, embedding), ...] as each request completes (cache hits first)."""
+        keys = self._keys(texts)
+        if self.cache is not None:
+            misses = {}
+            for hits in self._cache_hits(keys, misses):
+                yield hits
+            keys = misses
+        positions_by_key, requests = self._plan_requests(texts, keys)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(batch_keys, inputs, tokens):
+            async with semaphore:
+                try:
+                    embeddings = await self._request_async(inputs, tokens)
+                except Exception as e:
+                    logger.error(f"Failed to embed batch of {len(inputs)} texts: {e}")
+                    return None
+            logger.info(f"Embedded batch of {len(inputs)} texts ({tokens} tokens)")
+            return self._store(batch_keys, embeddings, positions_by_key)
+
+        tasks = [asyncio.ensure_future(run(*request)) for request in requests]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def aembed_texts(self, texts):
+        results = [None] * len(texts)
+        async for batch in self.aiter_batches(texts):
+            for i, embedding in batch:
+                results[i] = embedding
+        return results
+
+    def iter_batches(self, texts):
+        """Synchronous view of aiter_batches, with at most a few completed batches buffered."""
+        loop = self._get_loop()
+        results = queue.Queue(maxsize=self.concurrency * 2)
+        stop = threading.Event()
+
+        async def offer(item):
+            # Never block the loop thread: the consumer may have stopped reading
+            while not stop.is_set():
+                try:
+                    results.put_nowait(item)
+                    return True
+                except queue.Full:
+                    await asyncio.sleep(0.05)
+            return False
+
+        async def pump():
+            try:
+                async for batch in self.aiter_batches(texts):
+                    if not await offer(batch):
+                        return
+            except Exception as e:
+                await offer(e)
+            finally:
+                await offer(_DONE)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            future.cancel()
+        if self.rate_limited:
+            logger.info(f"Embedding run hit {self.rate_limited} rate-limit responses so far")
@@ -0,0 +1,155 @@
+# Batched embedding engine shared by the loaders.
+# Packs many inputs into one embeddings request (sized by token count) and reuses a single client.
+# Texts already in the embedding cache are answered locally and never sent to the API.
+import os
+import logging
+from openai import OpenAI
+from core.embedding_cache import cache_key, get_embedding_cache
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to a character estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = 'text-embedding-ada-002'
+MAX_INPUT_TOKENS = 8191  # Per-input limit for text-embedding-ada-002
+MAX_BATCH_INPUTS = 2048  # Per-request input limit of the embeddings endpoint
+MAX_BATCH_TOKENS = 250000  # Stay under the 300k tokens-per-request limit
+
+_encodings = {}
+
+def _get_encoding(model):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding('cl100k_base')
+        except Exception as e:  # BPE file download can fail offline
+            logger.warning(f"Could not load tiktoken encoding for {model}, estimating tokens: {e}")
+            _encodings[model] = None
+    return _encodings[model]
+
+def count_tokens(text, model=EMBEDDING_MODEL):
+    """Count tokens in text (estimated at ~4 chars/token without tiktoken)."""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text, max_tokens=MAX_INPUT_TOKENS, model=EMBEDDING_MODEL):
+    """Cut text to at most max_tokens tokens."""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 3]  # Conservative for dense text like model numbers
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+def pack_batches(token_counts, max_tokens=MAX_BATCH_TOKENS, max_inputs=MAX_BATCH_INPUTS):
+    """Group input indices into request-sized batches by token count and input count."""
+    batches = []
+    current, current_tokens = [], 0
+    for i, tokens in enumerate(token_counts):
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+class BatchEmbedder:
+    """Embeds many texts per request with one reused OpenAI client.
+
+    Results are always mapped back to the caller's input positions, so a text that
+    is empty or whose request failed comes back as None in its slot. Pass cache=False
+    to bypass the shared embedding cache.
+    """
+
+    def __init__(self, client=None, model=EMBEDDING_MODEL, max_batch_tokens=None, max_batch_inputs=None, cache=None):
+        self.client = client or OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.model = model
+        self.cache = get_embedding_cache() if cache is None else (cache or None)
+        self.max_batch_tokens = max_batch_tokens or int(os.getenv('EMBEDDING_BATCH_TOKENS', MAX_BATCH_TOKENS))
+        self.max_batch_inputs = min(max_batch_inputs or int(os.getenv('EMBEDDING_BATCH_INPUTS', MAX_BATCH_INPUTS)), MAX_BATCH_INPUTS)
+        self.requests = 0
+
+    def _request(self, texts):
+        response = self.client.embeddings.create(input=texts, model=self.model)
+        self.requests += 1
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+    def _keys(self, texts):
+        return {i: cache_key(self.model, text) for i, text in enumerate(texts) if text and text.strip()}
+
+    def _cache_hits(self, keys, misses):
+        """Yield cached [(index, embedding), ...] chunks, collecting uncached keys into misses."""
+        items = list(keys.items())
+        for start in range(0, len(items), self.max_batch_inputs):
+            chunk = items[start:start + self.max_batch_inputs]
+            cached = self.cache.get_many([key for _, key in chunk])
+            hits = [(i, cached[key]) for i, key in chunk if key in cached]
+            misses.update((i, key) for i, key in chunk if key not in cached)
+            if hits:
+                yield hits
+        logger.info(f"Embedding cache answered {len(keys) - len(misses)} of {len(keys)} texts")
+
+    def _plan_requests(self, texts, keys):
+        """Pack uncached texts into requests of (keys, inputs, token total).
+
+        Identical texts are sent once and fanned back out to every position that asked for them.
+        """
+        positions_by_key = {}
+        for i, key in keys.items():
+            positions_by_key.setdefault(key, []).append(i)
+        unique = [indices[0] for indices in positions_by_key.values()]
+        prepared = [truncate_tokens(texts[i], model=self.model) for i in unique]
+        token_counts = [count_tokens(text, self.model) for text in prepared]
+        requests = []
+        for batch in pack_batches(token_counts, self.max_batch_tokens, self.max_batch_inputs):
+            requests.append((
+                [keys[unique[b]] for b in batch],
+                [prepared[b] for b in batch],
+                sum(token_counts[b] for b in batch)
+            ))
+        return positions_by_key, requests
+
+    def _store(self, batch_keys, embeddings, positions_by_key):
+        if self.cache is not None:
+            self.cache.put_many(list(zip(batch_keys, embeddings)))
+        return [(i, embedding) for key, embedding in zip(batch_keys, embeddings) for i in positions_by_key[key]]
+
+    def iter_batches(self, texts):
+        """Yield [(index, embedding), ...] for each request; failed or empty inputs are left out."""
+        keys = self._keys(texts)
+        if self.cache is not None:
+            misses = {}
+            yield from self._cache_hits(keys, misses)
+            keys = misses
+        positions_by_key, requests = self._plan_requests(texts, keys)
+        for batch_keys, inputs, tokens in requests:
+            try:
+                embeddings = self._request(inputs)
+            except Exception as e:
+                logger.error(f"Failed to embed batch of {len(inputs)} texts: {e}")
+                continue
+            logger.info(f"Embedded batch of {len(inputs)} texts ({tokens} tokens)")
+            yield self._store(batch_keys, embeddings, positions_by_key)
+
+    def embed_texts(self, texts):
+        """Embed texts, returning a list aligned with the input (None where embedding failed)."""
+        results = [None] * len(texts)
+        for batch in self.iter_batches(texts):
+            for i, embedding in batch:
+                results[i] = embedding
+        return results
+
+    def embed_query(self, text):
+        return self.embed_texts([text])[0]
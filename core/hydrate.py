@@ -0,0 +1,75 @@
+# Slim vector metadata and query-time hydration from Postgres.
+# With VECTOR_METADATA=slim, vectors carry only the row reference plus the fields used for filtering;
+# the full record text is read back from Postgres for a whole result set in one round trip.
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+SLIM_FIELDS = ('db_id', 'source', 'brand', 'product', 'category')
+HYDRATE_TABLES = ('documents', 'dealer_info', 'snapone_pdfs')  # Valid values of metadata['source']; the last two are pre-migration tables
+HYDRATE_COLUMNS = ('url', 'product', 'category', 'issue', 'solution')
+
+def slim_metadata_enabled():
+    return os.getenv('VECTOR_METADATA', 'full').strip().lower() == 'slim'
+
+def vector_metadata(metadata, slim=None):
+    """Metadata to store with a vector: all of it, or only SLIM_FIELDS in slim mode.
+
+    Records without a db_id cannot be hydrated, so they always keep their full metadata.
+    """
+    if slim is None:
+        slim = slim_metadata_enabled()
+    if not slim or not metadata.get('db_id'):
+        return metadata
+    return {field: metadata[field] for field in SLIM_FIELDS if field in metadata}
+
+def _row_ref(metadata):
+    db_id = metadata.get('db_id')
+    if not db_id:
+        return None
+    source = metadata.get('source', 'dealer_info')
+    if source not in HYDRATE_TABLES:
+        logger.warning(f"Cannot hydrate match from unknown source table {source}")
+        return None
+    return source, int(db_id)
+
+def fetch_rows(conn, refs):
+    """Read (source, id) rows from all source tables with a single query."""
+    ids_by_source = {}
+    for source, db_id in refs:
+        ids_by_source.setdefault(source, set()).add(db_id)
+    if not ids_by_source:
+        return {}
+    columns = ', '.join(HYDRATE_COLUMNS)
+    # Table names come from HYDRATE_TABLES, never from metadata directly
+    sql = ' UNION ALL '.join(f"SELECT '{source}', id, {columns} FROM {source} WHERE id = ANY(%s)" for source in ids_by_source)
+    with conn.cursor() as cur:
+        cur.execute(sql, [sorted(ids) for ids in ids_by_source.values()])
+        return {(row[0], row[1]): dict(zip(HYDRATE_COLUMNS, row[2:])) for row in cur.fetchall()}
+
+def hydrate_matches(conn, matches, dedupe=True):
+    """Replace chunk or slim metadata with the full Postgres record of each match.
+
+    With dedupe, several chunks of one record collapse to its best-scoring match, so each
+    record's full text comes back once. Matches without a db_id are returned unchanged.
+    """
+    refs = [_row_ref(match.get('metadata') or {}) for match in matches]
+    rows = fetch_rows(conn, [ref for ref in refs if ref])
+    hydrated, seen = [], set()
+    for match, ref in zip(matches, refs):
+        if ref is None:
+            hydrated.append(match)
+            continue
+        if dedupe and ref in seen:
+            continue
+        seen.add(ref)
+        row = rows.get(ref)
+        if row is None:
+            logger.warning(f"Match {match.get('id')} points at missing {ref[0]} row {ref[1]}")
+            hydrated.append(match)
+            continue
+        metadata = dict(match.get('metadata') or {})
+        metadata.update({field: value for field, value in row.items() if value is not None})
+        hydrated.append(dict(match, metadata=metadata))
+    return hydrated
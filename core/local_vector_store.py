@@ -0,0 +1,178 @@
+# In-process brute-force vector store.
+# Vectors live L2-normalized in one contiguous float32 matrix, so a cosine top-k query is a single
+# matrix-vector product plus argpartition, and a batch of queries is a single matrix product.
+import os
+import json
+import logging
+import threading
+import numpy as np
+from core.vector_store import VectorStore, DIMENSION, normalize_vectors
+
+logger = logging.getLogger(__name__)
+
+def _matches_filter(metadata, filter):
+    """Evaluate the Pinecone filter subset we use: field equality, $eq, $ne, $in, $nin and $and."""
+    for field, condition in filter.items():
+        if field == '$and':
+            if not all(_matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        value = metadata.get(field)
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        for op, expected in condition.items():
+            if op == '$eq' and value != expected:
+                return False
+            if op == '$ne' and value == expected:
+                return False
+            if op == '$in' and value not in expected:
+                return False
+            if op == '$nin' and value in expected:
+                return False
+    return True
+
+class NumpyVectorStore(VectorStore):
+    """Local VectorStore for offline development, CI and latency benchmarking.
+
+    Namespaces are ignored. When a path is given, flush() saves the store there and the
+    constructor loads it back, so a loader run and a later query run can share data.
+    """
+
+    def __init__(self, dimension=DIMENSION, path=None, initial_capacity=1024):
+        self.dimension = dimension
+        self.path = path
+        self._matrix = np.zeros((initial_capacity, dimension), dtype=np.float32)
+        self._ids = []
+        self._rows = {}
+        self._metadata = []
+        self._lock = threading.Lock()  # Upserts may arrive from several writer threads
+        if path and os.path.exists(os.path.join(path, 'vectors.npy')):
+            self._load()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _ensure_capacity(self, size):
+        if size > self._matrix.shape[0]:
+            grown = np.zeros((max(size, self._matrix.shape[0] * 2), self.dimension), dtype=np.float32)
+            grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+            self._matrix = grown
+
+    @staticmethod
+    def _unit(values):
+        norms = np.linalg.norm(values, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return values / norms
+
+    def upsert(self, vectors=None, namespace=None):
+        vectors = normalize_vectors(vectors or [])
+        if not vectors:
+            return {'upserted_count': 0}
+        values = np.asarray([v for _, v, _ in vectors], dtype=np.float32)
+        if values.shape[1] != self.dimension:
+            raise ValueError(f"Vector dimension {values.shape[1]} does not match index dimension {self.dimension}")
+        values = self._unit(values)
+        with self._lock:
+            self._write_rows(vectors, values)
+        return {'upserted_count': len(vectors)}
+
+    def _write_rows(self, vectors, values):
+        self._ensure_capacity(len(self._ids) + len(vectors))
+        for (vector_id, _, metadata), row_values in zip(vectors, values):
+            row = self._rows.get(vector_id)
+            if row is None:
+                row = len(self._ids)
+                self._rows[vector_id] = row
+                self._ids.append(vector_id)
+                self._metadata.append(metadata)
+            else:
+                self._metadata[row] = metadata
+            self._matrix[row] = row_values
+
+    def _mask(self, filter):
+        if not filter:
+            return None
+        return np.fromiter((_matches_filter(m, filter) for m in self._metadata), dtype=bool, count=len(self._ids))
+
+    def _top_k(self, scores, top_k, include_metadata, include_values):
+        k = min(top_k, int(np.count_nonzero(scores > -np.inf)))
+        if k <= 0:
+            return {'matches': []}
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        matches = []
+        for row in top:
+            match = {'id': self._ids[row], 'score': float(scores[row])}
+            if include_metadata:
+                match['metadata'] = self._metadata[row]
+            if include_values:
+                match['values'] = self._matrix[row].tolist()
+            matches.append(match)
+        return {'matches': matches}
+
+    def query_many(self, vectors, top_k=10, include_metadata=True, include_values=False, filter=None, namespace=None):
+        if not self._ids:
+            return [{'matches': []} for _ in vectors]
+        queries = self._unit(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension))
+        scores = queries @ self._matrix[:len(self._ids)].T
+        mask = self._mask(filter)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+        return [self._top_k(row, top_k, include_metadata, include_values) for row in scores]
+
+    def query(self, vector=None, top_k=10, include_metadata=True, include_values=False, filter=None, namespace=None):
+        if not self._ids:
+            return {'matches': []}
+        scores = self._matrix[:len(self._ids)] @ self._unit(np.asarray(vector, dtype=np.float32))
+        mask = self._mask(filter)
+        if mask is not None:
+            scores[~mask] = -np.inf
+        return self._top_k(scores, top_k, include_metadata, include_values)
+
+    def delete(self, ids=None, namespace=None):
+        # Move the last row into each freed slot so the live rows stay contiguous
+        with self._lock:
+            self._delete_rows(ids or [])
+        return {}
+
+    def _delete_rows(self, ids):
+        for vector_id in ids:
+            row = self._rows.pop(str(vector_id), None)
+            if row is None:
+                continue
+            last = len(self._ids) - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._metadata[row] = self._metadata[last]
+                self._rows[self._ids[row]] = row
+            self._ids.pop()
+            self._metadata.pop()
+
+    def fetch(self, ids, namespace=None):
+        vectors = {}
+        for vector_id in ids:
+            row = self._rows.get(str(vector_id))
+            if row is not None:
+                vectors[vector_id] = {'id': vector_id, 'values': self._matrix[row].tolist(), 'metadata': self._metadata[row]}
+        return {'vectors': vectors}
+
+    def flush(self):
+        if not self.path:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        np.save(os.path.join(self.path, 'vectors.npy'), self._matrix[:len(self._ids)])
+        with open(os.path.join(self.path, 'records.json'), 'w', encoding='utf-8') as f:
+            json.dump({'ids': self._ids, 'metadata': self._metadata}, f)
+        logger.info(f"Saved {len(self._ids)} vectors to {self.path}")
+
+    def _load(self):
+        matrix = np.load(os.path.join(self.path, 'vectors.npy'))
+        with open(os.path.join(self.path, 'records.json'), 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        self._ids = records['ids']
+        self._metadata = records['metadata']
+        self._rows = {vector_id: row for row, vector_id in enumerate(self._ids)}
+        self._matrix = np.zeros((max(len(self._ids), self._matrix.shape[0]), self.dimension), dtype=np.float32)
+        self._matrix[:len(self._ids)] = matrix
+        logger.info(f"Loaded {len(self._ids)} vectors from {self.path}")
@@ -0,0 +1,215 @@
+# Deterministic vector IDs and the ingest manifest.
+# A document is identified by its canonical URL, so re-runs produce the same vector IDs; the
+# manifest remembers each document's content hash so unchanged records are skipped, and records
+# that disappeared from a source get their vectors deleted.
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from itertools import chain
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote, unquote
+from core.record_reader import record_files
+from core.record_writer import is_incremental
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MANIFEST_PATH = os.path.expanduser('~/.cache/ixome/manifest.sqlite')
+TRACKING_PARAMS = ('utm_', 'gclid', 'fbclid', 'mc_')
+CONTENT_FIELDS = ('url', 'brand', 'product', 'category', 'issue', 'solution')
+# Keyed per source: loaders feeding the same documents (lutron_data, dealer_info, ...) each keep their own rows
+MANIFEST_COLUMNS = """
+    source TEXT NOT NULL,
+    doc_key TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (source, doc_key)
+"""
+
+def canonical_url(url):
+    """Normalize a URL so trivially different spellings map to one document."""
+    url = (url or '').strip()
+    if not url:
+        return ''
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower() or 'https'
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = quote(unquote(parts.path), safe="/:@!$&'()*+,;=-._~") or '/'
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not k.lower().startswith(TRACKING_PARAMS)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+def document_key(item):
+    """Canonical URL of the record, or a hash of its text when it has no URL."""
+    url = canonical_url(item.get('url', ''))
+    if url:
+        return url
+    return 'text:' + hashlib.sha256(f"{item.get('issue', '')}\x00{item.get('product', '')}\x00{item.get('solution', '')}".encode('utf-8')).hexdigest()
+
+def document_id(key):
+    return 'doc_' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+def vector_id(key, chunk_index=0):
+    """Stable vector ID for chunk chunk_index of the document with this key."""
+    return f"{document_id(key)}#{chunk_index}"
+
+def content_hash(item, fields=CONTENT_FIELDS):
+    payload = json.dumps({field: item.get(field, '') for field in fields}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class IngestPlan:
+    """Outcome of comparing a run's records against the manifest."""
+
+    def __init__(self, changed, unchanged, removed, started_at=None):
+        self.changed = changed  # [(key, hash, item)] new or modified records to embed and upsert
+        self.unchanged = unchanged  # [key] records to skip
+        self.removed = removed  # [(key, chunk_count)] manifest entries no longer in the source
+        self.started_at = started_at or time.time()  # Before the first record was read (core.crawl_state.acknowledge_loaded)
+
+    def __repr__(self):
+        return f"IngestPlan(changed={len(self.changed)}, unchanged={len(self.unchanged)}, removed={len(self.removed)})"
+
+class IngestManifest:
+    """SQLite record of what has been upserted: document key -> content hash and chunk count."""
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS manifest ({MANIFEST_COLUMNS})")
+        self._migrate()
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_manifest_doc_key ON manifest (doc_key)')
+        self._conn.commit()
+
+    def _migrate(self):
+        """Rekey manifests created with doc_key alone as the primary key, where sources overwrote each other's rows."""
+        primary_key = [row[1] for row in sorted(self._conn.execute('PRAGMA table_info(manifest)'), key=lambda row: row[5]) if row[5]]
+        if primary_key == ['source', 'doc_key']:
+            return
+        logger.info("Migrating ingest manifest to per-source document keys")
+        self._conn.execute('DROP INDEX IF EXISTS idx_manifest_source')
+        self._conn.execute('ALTER TABLE manifest RENAME TO manifest_old')
+        self._conn.execute(f"CREATE TABLE manifest ({MANIFEST_COLUMNS})")
+        self._conn.execute('INSERT INTO manifest SELECT source, doc_key, content_hash, chunk_count, updated_at FROM manifest_old')
+        self._conn.execute('DROP TABLE manifest_old')
+
+    def plan(self, source, items, prune=True):
+        """Split items into changed/unchanged; with prune, also list this source's documents that disappeared.
+
+        Records sharing a document key are collapsed to the first occurrence.
+        """
+        started_at = time.time()
+        with self._lock:
+            known = {key: (digest, chunks) for key, digest, chunks in self._conn.execute(
+                'SELECT doc_key, content_hash, chunk_count FROM manifest WHERE source = ?', (source,))}
+        changed, unchanged, seen = [], [], set()
+        for item in items:
+            key = document_key(item)
+            if key in seen:
+                continue
+            seen.add(key)
+            digest = content_hash(item)
+            if key in known and known[key][0] == digest:
+                unchanged.append(key)
+            else:
+                changed.append((key, digest, item))
+        removed = [(key, chunks) for key, (_, chunks) in known.items() if key not in seen] if prune else []
+        plan = IngestPlan(changed, unchanged, removed, started_at)
+        logger.info(f"Manifest plan for {source}: {plan}")
+        return plan
+
+    def previous_chunk_count(self, source, key):
+        with self._lock:
+            row = self._conn.execute('SELECT chunk_count FROM manifest WHERE source = ? AND doc_key = ?', (source, key)).fetchone()
+        return row[0] if row else 0
+
+    def shared_chunk_count(self, source, key):
+        """Chunks other sources still hold under the same vector IDs."""
+        with self._lock:
+            row = self._conn.execute('SELECT MAX(chunk_count) FROM manifest WHERE source != ? AND doc_key = ?', (source, key)).fetchone()
+        return row[0] or 0
+
+    def stale_vector_ids(self, source, key, chunk_count):
+        """IDs of chunks a shrunken (or, with chunk_count=0, removed) document no longer has and no other source uses."""
+        start = max(chunk_count, self.shared_chunk_count(source, key))
+        return [vector_id(key, i) for i in range(start, self.previous_chunk_count(source, key))]
+
+    def record(self, source, entries):
+        """Mark (key, content_hash, chunk_count) entries as successfully upserted."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO manifest (doc_key, source, content_hash, chunk_count, updated_at) VALUES (?, ?, ?, ?, ?)',
+                [(key, source, digest, chunks, now) for key, digest, chunks in entries]
+            )
+            self._conn.commit()
+
+    def forget(self, source, keys):
+        with self._lock:
+            self._conn.executemany('DELETE FROM manifest WHERE source = ? AND doc_key = ?', [(source, key) for key in keys])
+            self._conn.commit()
+
+    def commit(self, index, source, plan, chunk_counts, failed=()):
+        """Finish a run: delete vectors of removed documents and dropped chunks, then record what was upserted.
+
+        chunk_counts maps positions in plan.changed to their chunk count; positions in failed
+        are left out of the manifest so the next run retries them.
+        """
+        entries = [(key, digest, chunk_counts.get(i, 0)) for i, (key, digest, _) in enumerate(plan.changed) if i not in failed]
+        stale = []
+        for key, _, chunks in entries + [(key, None, 0) for key, _ in plan.removed]:
+            stale.extend(self.stale_vector_ids(source, key, chunks))
+        for start in range(0, len(stale), 1000):  # Pinecone deletes at most 1000 IDs per call
+            index.delete(ids=stale[start:start + 1000])
+        if stale:
+            logger.info(f"Deleted {len(stale)} stale vectors for {source}")
+        self.record(source, entries)
+        self.forget(source, [key for key, _ in plan.removed])
+
+def plan_files(manifest, source, paths, read, prune=True):
+    """manifest.plan() over read(path, on_error=...) for every input file, pruning only when all were read in full.
+
+    A missing, unreadable or partly corrupt input would otherwise look as if the documents it
+    supplied (or those past the damage) had been deleted, and an incremental crawl's output
+    (core.record_writer.is_incremental) holds only what changed. read passes on_error on to
+    core.record_reader.iter_records; an exception stops that file and turns pruning off.
+    """
+    missing = [path for path in paths if not record_files(path)]
+    incremental = [path for path in paths if is_incremental(path)]
+    if prune and incremental:
+        logger.info(f"Not pruning {source}: incremental crawl output in {', '.join(incremental)}")
+        prune = False
+    incomplete = []
+
+    def on_error(path, message):
+        logger.error(f"Reading {path}: {message}")
+        incomplete.append(path)
+
+    def read_file(path):
+        try:
+            yield from read(path, on_error=on_error)
+        except Exception as e:
+            on_error(path, e)
+
+    records = chain.from_iterable(read_file(path) for path in paths if path not in missing)
+    plan = manifest.plan(source, records, prune=prune and not missing)
+    if prune and (missing or incomplete):
+        logger.warning(f"Not pruning {source}: missing or unreadable input(s) {', '.join(missing + incomplete)}")
+        plan.removed = []
+    return plan
+
+_manifest = None
+
+def get_manifest():
+    """Process-wide manifest at INGEST_MANIFEST_PATH."""
+    global _manifest
+    if _manifest is None:
+        _manifest = IngestManifest(os.getenv('INGEST_MANIFEST_PATH', DEFAULT_MANIFEST_PATH))
+    return _manifest
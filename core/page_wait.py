@@ -0,0 +1,84 @@
+# Event-driven page waits shared by the Playwright spiders, login_snapone and the Selenium scraper.
+# Instead of fixed sleeps, SETTLE_JS runs in the page and returns as soon as the DOM has stopped
+# changing and no new network responses have arrived for quiet_ms (and, given a selector, at least
+# min_count matches exist), with timeout_ms as a hard cap. With scroll=True it keeps scrolling to the
+# bottom and settling until neither the page height nor the match count grows, i.e. an infinite scroll is done.
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUIET_MS = int(os.getenv('PAGE_QUIET_MS', 500))
+TIMEOUT_MS = int(os.getenv('PAGE_WAIT_TIMEOUT_MS', 30000))
+MAX_SCROLLS = 50
+
+SETTLE_JS = '''async (opts) => {
+    const {selector = null, minCount = 1, quietMs = 500, timeoutMs = 30000, scroll = false, maxScrolls = 50} = opts || {};
+    const start = performance.now();
+    const deadline = start + timeoutMs;
+    const count = () => selector ? document.querySelectorAll(selector).length : 0;
+    let lastChange = start;
+    const touch = () => { lastChange = performance.now(); };
+    const mutations = new MutationObserver(touch);
+    mutations.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    let responses = null;
+    try {
+        responses = new PerformanceObserver(touch);  // Each finished fetch/XHR/resource counts as activity
+        responses.observe({type: 'resource'});
+    } catch (e) {}
+    const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+    const settle = async () => {
+        while (performance.now() < deadline) {
+            if (performance.now() - lastChange >= quietMs && (!selector || count() >= minCount)) return true;
+            await sleep(Math.min(100, quietMs));
+        }
+        return false;
+    };
+    let settled = await settle();
+    let scrolls = 0;
+    while (scroll && settled && scrolls < maxScrolls) {
+        const root = document.scrollingElement || document.documentElement;
+        const height = root.scrollHeight, before = count();
+        window.scrollTo(0, height);
+        scrolls++;
+        touch();  // Give lazy loaders quietMs to start fetching
+        settled = await settle();
+        if (root.scrollHeight <= height && count() <= before) break;
+    }
+    mutations.disconnect();
+    if (responses) responses.disconnect();
+    return {count: count(), scrolls: scrolls, elapsed: Math.round(performance.now() - start), timedOut: !settled};
+}'''
+
+def settle_options(selector=None, min_count=1, quiet_ms=None, timeout_ms=None, scroll=False, max_scrolls=MAX_SCROLLS):
+    return {
+        'selector': selector,
+        'minCount': min_count,
+        'quietMs': QUIET_MS if quiet_ms is None else quiet_ms,
+        'timeoutMs': TIMEOUT_MS if timeout_ms is None else timeout_ms,
+        'scroll': scroll,
+        'maxScrolls': max_scrolls,
+    }
+
+def _log(result, where):
+    if result and result.get('timedOut'):
+        logger.warning(f"Page did not settle on {where} within the cap: {result}")
+    else:
+        logger.debug(f"Page settled on {where}: {result}")
+    return result
+
+def settle_page_method(**kwargs):
+    """scrapy-playwright PageMethod running SETTLE_JS; its .result holds the settle summary."""
+    from scrapy_playwright.page import PageMethod
+    return PageMethod('evaluate', SETTLE_JS, settle_options(**kwargs))
+
+def settle(page, **kwargs):
+    """Wait on a sync-API Playwright page; returns {count, scrolls, elapsed, timedOut}."""
+    return _log(page.evaluate(SETTLE_JS, settle_options(**kwargs)), page.url)
+
+def settle_driver(driver, **kwargs):
+    """Same wait for a Selenium WebDriver, via execute_async_script."""
+    options = settle_options(**kwargs)
+    driver.set_script_timeout(options['timeoutMs'] / 1000 + 5)
+    script = f"const done = arguments[arguments.length - 1]; ({SETTLE_JS})(arguments[0]).then(done, e => done({{error: String(e)}}));"
+    return _log(driver.execute_async_script(script, options), driver.current_url)
@@ -0,0 +1,143 @@
+# Streaming reader for scraped record dumps.
+# Detects Parquet, a JSON array or JSON Lines / concatenated objects from the first bytes, reads
+# gzip transparently and yields one record at a time, so memory stays flat however big the dump is.
+import io
+import os
+import json
+import gzip
+import logging
+from core.columnar import is_parquet, iter_parquet, timestamp
+from core.record_writer import part_files
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_CHARS = 1 << 16
+MAX_RECORD_CHARS = 64 << 20  # A "record" larger than this is treated as corrupt and skipped
+GZIP_MAGIC = b'\x1f\x8b'
+
+def open_text(path):
+    """Open path for reading text, decompressing gzip based on its magic bytes rather than its name."""
+    raw = open(path, 'rb')
+    is_gzip = raw.peek(2)[:2] == GZIP_MAGIC
+    stream = gzip.GzipFile(fileobj=raw) if is_gzip else raw
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace')
+
+class _Scanner:
+    """raw_decode over a sliding text window refilled from the file."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.skipped = 0
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        # Read at least as much as is already pending so a large record is re-scanned O(log n) times
+        chunk = self.f.read(max(READ_CHUNK_CHARS, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self, skip=' \t\r\n'):
+        """Next significant character (None at end of input), skipping whitespace and given separators."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in skip:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return None
+
+    def skip_line(self):
+        while True:
+            newline = self.buffer.find('\n', self.pos)
+            if newline >= 0:
+                self.pos = newline + 1
+                return
+            self.pos = len(self.buffer)
+            if not self.fill():
+                return
+
+    def decode(self):
+        """Decode the value at the cursor, reading more input until it is complete; None if corrupt."""
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                if end < len(self.buffer) or self.eof or isinstance(value, (dict, list)):
+                    self.pos = end
+                    return value
+                # A bare number or literal that reaches the window edge may continue in the next chunk
+            except json.JSONDecodeError as e:
+                # JSON strings cannot span raw newlines, so only errors at the window edge can be truncation
+                truncated = e.pos >= len(self.buffer) - 8 or e.msg.startswith('Unterminated string')
+                if not truncated or self.eof or len(self.buffer) - self.pos > MAX_RECORD_CHARS:
+                    logger.warning(f"Skipping malformed record: {e.msg} near {self.buffer[self.pos:self.pos + 50]!r}")
+                    self.skipped += 1
+                    self.skip_line()
+                    return None
+            self.fill()
+
+def _in_range(record, brand, crawled_since, crawled_until):
+    if brand and record.get('brand') != brand:
+        return False
+    if crawled_since or crawled_until:
+        crawled = timestamp(record.get('crawled_at'))
+        if crawled is None or (crawled_since and crawled < timestamp(crawled_since)) or (crawled_until and crawled >= timestamp(crawled_until)):
+            return False
+    return True
+
+def iter_records(path, normalize=None, columns=None, brand=None, crawled_since=None, crawled_until=None, on_error=None):
+    """Yield the dict records in path (JSON array, JSON Lines or concatenated objects, optionally gzipped, or Parquet).
+
+    normalize(record) may return a cleaned record or None to drop it. Malformed records are
+    logged and skipped; once the file is read, on_error(path, message) is called if any were, or
+    if a JSON array is cut off. Read errors (e.g. a truncated gzip stream) are raised. For Parquet
+    input only the given columns are read and the brand/crawl time filters skip whole row groups;
+    JSON input is parsed fully and filtered per record.
+    """
+    if is_parquet(path):
+        for record in iter_parquet(path, columns, brand, crawled_since, crawled_until):
+            record = normalize(record) if normalize is not None else record
+            if record is not None:
+                yield record
+        return
+    filtered = brand or crawled_since or crawled_until
+    with open_text(path) as f:
+        scanner = _Scanner(f)
+        first = scanner.peek()
+        if first is None:
+            return
+        in_array = first == '['
+        if in_array:
+            scanner.pos += 1
+        while True:
+            char = scanner.peek(' \t\r\n,' if in_array else ' \t\r\n')
+            if char is None or (in_array and char == ']'):
+                if on_error is not None and (scanner.skipped or (in_array and char is None)):
+                    on_error(path, f"{scanner.skipped} malformed record(s) skipped" if scanner.skipped else "JSON array is not terminated")
+                return
+            record = scanner.decode()
+            if not isinstance(record, dict) or (filtered and not _in_range(record, brand, crawled_since, crawled_until)):
+                continue
+            if normalize is not None:
+                record = normalize(record)
+                if record is None:
+                    continue
+            yield record
+
+def record_files(path):
+    """path's core.record_writer part files (name.00000.json[.gz], ...) in order if there are any, else path(.gz) itself."""
+    parts = part_files(path)
+    if parts:
+        return parts
+    return [candidate for candidate in (path, path + '.gz') if os.path.exists(candidate)][:1]
+
+def iter_record_files(path, **kwargs):
+    """iter_records over every file record_files(path) finds."""
+    for part in record_files(path):
+        yield from iter_records(part, **kwargs)
@@ -0,0 +1,122 @@
+# Buffered JSON Lines writer for scraped records, the counterpart of core.record_reader.
+# Lines are encoded into an in-memory buffer and written in one call once it holds flush_bytes or
+# flush_seconds have passed, so per-item cost is a json.dumps. Output rotates to numbered part files
+# once a part reaches max_bytes on disk, optionally gzip-compressed; memory stays bounded by the buffer.
+# Each run replaces the previous one: the first file opened removes the old parts and unrotated file.
+import os
+import glob
+import json
+import gzip
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_MARKER = '.incremental'
+FLUSH_BYTES = 1 << 20
+FLUSH_SECONDS = 5.0
+MAX_BYTES = 256 << 20
+
+def part_path(path, part, compress=False):
+    """lutron_data.json -> lutron_data.00003.json(.gz)"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{part:05d}{ext}" + ('.gz' if compress else '')
+
+def part_files(path):
+    """Existing part files of path (either compression), in part order."""
+    root, ext = os.path.splitext(path)
+    return sorted(glob.glob(f"{glob.escape(root)}.[0-9][0-9][0-9][0-9][0-9]{glob.escape(ext)}") +
+                  glob.glob(f"{glob.escape(root)}.[0-9][0-9][0-9][0-9][0-9]{glob.escape(ext)}.gz"))
+
+def remove_outputs(path):
+    """Delete what an earlier run left at path: its part files and the unrotated path(.gz)."""
+    for stale in part_files(path) + [path, path + '.gz']:
+        if os.path.exists(stale):
+            os.remove(stale)
+            logger.debug(f"Removed previous output {stale}")
+
+def mark_incremental(path, incremental):
+    """Flag the output at path as holding only new/changed items (path + '.incremental'), or clear the flag."""
+    marker = path + INCREMENTAL_MARKER
+    if incremental:
+        with open(marker, 'w') as f:
+            f.write(f"{time.time()}\n")
+    elif os.path.exists(marker):
+        os.remove(marker)
+
+def is_incremental(path):
+    """True if the output at path came from an incremental (or unfinished) crawl; loaders then must not prune by absence."""
+    return os.path.exists(path + INCREMENTAL_MARKER)
+
+class RecordWriter:
+    """Append dict records (or DocumentRecords) to path as JSON Lines.
+
+    With max_bytes=0 everything goes to path itself (plus .gz when compressed); otherwise to
+    part files from part_path(), a new one starting whenever the current part reaches max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=MAX_BYTES, flush_bytes=FLUSH_BYTES, flush_seconds=FLUSH_SECONDS, compress=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        self.compress = compress
+        self.part = 0
+        self.paths = []
+        self.written = 0
+        self._raw = self._stream = None
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self):
+        if not self.paths:
+            remove_outputs(self.path)  # A shorter rerun must not leave higher-numbered parts behind
+        if self.max_bytes:
+            path = part_path(self.path, self.part, self.compress)
+            self.part += 1
+        else:
+            path = self.path + ('.gz' if self.compress else '')
+        self._raw = open(path, 'wb')
+        self._stream = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=6) if self.compress else self._raw
+        self.paths.append(path)
+
+    def _close_part(self):
+        if self._stream is not self._raw:
+            self._stream.close()  # Writes the gzip trailer; leaves _raw open
+        self._raw.close()
+        self._raw = self._stream = None
+
+    def write(self, record):
+        if hasattr(record, 'to_dict'):
+            record = record.to_dict()
+        line = (json.dumps(record, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        self._buffer.append(line)
+        self._buffered_bytes += len(line)
+        self.written += 1
+        if self._buffered_bytes >= self.flush_bytes or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        if self._raw is None:
+            self._open()
+        self._stream.write(b''.join(self._buffer))
+        self._buffer = []
+        self._buffered_bytes = 0
+        if self.max_bytes and self._raw.tell() >= self.max_bytes:  # Compressed size once the compressor has emitted it
+            self._close_part()
+
+    def close(self):
+        self.flush()
+        if self._raw is not None:
+            self._close_part()
+        logger.info(f"Wrote {self.written} records to {len(self.paths)} file(s) from {self.path}")
@@ -0,0 +1,136 @@
+# Render only when needed: a scrapy-playwright download handler that tries a plain HTTP fetch first.
+# A Playwright request carrying meta['render_check'] (CSS selector or list of them) is fetched without
+# the browser; if the response already contains a match it is returned as is, otherwise the request is
+# rendered by Playwright as before. Outcomes are counted per URL pattern (host plus the first path
+# segments), and patterns that keep needing the browser go straight to it from then on.
+#
+#   DOWNLOAD_HANDLERS = {'http': 'core.render_router.RenderRouterHandler', 'https': 'core.render_router.RenderRouterHandler'}
+import os
+import json
+import logging
+from urllib.parse import urlsplit
+from scrapy import version_info as scrapy_version_info
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+from scrapy.http import TextResponse
+from scrapy.utils.defer import deferred_from_coro, maybe_deferred_to_future
+from scrapy_playwright.handler import ScrapyPlaywrightDownloadHandler
+from core.browser_pool import ContextRecyclingHandler
+
+logger = logging.getLogger(__name__)
+
+LEARN_MISSES = 3  # Plain fetches that must fail before a pattern is sent straight to the browser
+PATTERN_DEPTH = 2
+ASYNC_HANDLERS = scrapy_version_info >= (2, 14, 0)  # Download handlers became coroutines without a spider argument
+
+class RenderRouter:
+    """Per-pattern record of whether plain HTTP responses had the expected content.
+
+    A pattern goes to the browser once it has LEARN_MISSES misses and under a fifth of its checks
+    succeeded. With state_path, counts are loaded from and saved to a JSON file across crawls.
+    """
+
+    def __init__(self, state_path=None, learn_misses=LEARN_MISSES, pattern_depth=PATTERN_DEPTH):
+        self.state_path = state_path
+        self.learn_misses = learn_misses
+        self.pattern_depth = pattern_depth
+        self.counts = {}  # pattern -> [plain hits, plain misses]
+        if state_path and os.path.exists(state_path):
+            with open(state_path, encoding='utf-8') as f:
+                self.counts = json.load(f)
+            logger.info(f"Loaded render routes for {len(self.counts)} URL patterns from {state_path}")
+
+    def pattern(self, url):
+        parts = urlsplit(url)
+        segments = [s for s in parts.path.split('/') if s][:self.pattern_depth]
+        return '/'.join([parts.netloc.lower()] + segments)
+
+    def try_plain(self, url):
+        hits, misses = self.counts.get(self.pattern(url), (0, 0))
+        return misses < self.learn_misses or hits * 5 >= hits + misses
+
+    def record(self, url, plain_ok):
+        counts = self.counts.setdefault(self.pattern(url), [0, 0])
+        counts[0 if plain_ok else 1] += 1
+
+    def save(self):
+        if self.state_path:
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump(self.counts, f, indent=1, sort_keys=True)
+
+def has_expected_content(response, selectors):
+    if not isinstance(response, TextResponse) or response.status != 200:
+        return False
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    return any(response.css(selector) for selector in selectors)
+
+class RenderRouterHandler(ContextRecyclingHandler):
+    """Playwright download handler that skips the browser for pages whose HTML already has the content.
+
+    Settings: RENDER_ROUTER_STATE (JSON file to persist routes, optional), RENDER_ROUTER_LEARN_MISSES,
+    RENDER_ROUTER_PATTERN_DEPTH. Requests without render_check behave exactly as before. Browser
+    contexts are recycled as in core.browser_pool.ContextRecyclingHandler.
+    """
+
+    def __init__(self, crawler):
+        super().__init__(crawler)
+        settings = crawler.settings
+        self.router = RenderRouter(
+            settings.get('RENDER_ROUTER_STATE'),
+            settings.getint('RENDER_ROUTER_LEARN_MISSES', LEARN_MISSES),
+            settings.getint('RENDER_ROUTER_PATTERN_DEPTH', PATTERN_DEPTH),
+        )
+        self.router_stats = crawler.stats
+
+    @staticmethod
+    def _routed(request):
+        return bool(request.meta.get('playwright') and request.meta.get('render_check'))
+
+    async def _call(self, handler_class, request, spider):
+        download = handler_class.download_request
+        if ASYNC_HANDLERS:
+            return await download(self, request)
+        return await maybe_deferred_to_future(download(self, request, spider))
+
+    async def _route(self, request, spider):
+        if not self.router.try_plain(request.url):
+            self.router_stats.inc_value('render_router/browser')
+            return await self._call(ScrapyPlaywrightDownloadHandler, request, spider)
+        plain = request.replace(meta=dict(request.meta, playwright=False))
+        try:
+            response = await self._call(HTTP11DownloadHandler, plain, spider)
+        except Exception as e:
+            logger.debug(f"Plain fetch of {request.url} failed ({e}); rendering")
+            response = None
+        if response is not None and response.status == 304:
+            return response  # Conditional request (core.crawl_state): unchanged, nothing to render
+        if response is not None and has_expected_content(response, request.meta['render_check']):
+            self.router.record(request.url, True)
+            self.router_stats.inc_value('render_router/plain')
+            response.flags.append('plain-http')
+            return response
+        self.router.record(request.url, False)
+        self.router_stats.inc_value('render_router/fallback')
+        return await self._call(ScrapyPlaywrightDownloadHandler, request, spider)
+
+    if ASYNC_HANDLERS:
+
+        async def download_request(self, request):
+            if not self._routed(request):
+                return await super().download_request(request)
+            return await self._route(request, None)
+
+        async def close(self):
+            self.router.save()
+            await super().close()
+
+    else:
+
+        def download_request(self, request, spider):
+            if not self._routed(request):
+                return super().download_request(request, spider)
+            return deferred_from_coro(self._route(request, spider))
+
+        def close(self):
+            self.router.save()
+            return super().close()
@@ -0,0 +1,81 @@
+# Request interception for Playwright crawls: abort images, media, fonts and third-party trackers.
+# The scraped data lives in the DOM text and links, so none of these are needed; dropping them cuts
+# bandwidth per page and lets networkidle settle once the document and its scripts are in.
+# Scrapy spiders use abort_request() as PLAYWRIGHT_ABORT_REQUEST; standalone scripts call block_resources().
+import os
+import logging
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+BLOCK_RESOURCE_TYPES = ('image', 'media', 'font')
+BLOCK_DOMAINS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googleadservices.com',
+    'googlesyndication.com', 'facebook.net', 'connect.facebook.com', 'bat.bing.com', 'clarity.ms',
+    'hotjar.com', 'hotjar.io', 'snap.licdn.com', 'ads.linkedin.com', 'nr-data.net', 'newrelic.com',
+    'segment.io', 'segment.com', 'optimizely.com', 'hs-analytics.net', 'hs-scripts.com', 'hubspot.com',
+    'quantserve.com', 'scorecardresearch.com', 'adsrvr.org', 'cookielaw.org', 'onetrust.com',
+)
+
+def blocking_enabled():
+    return os.getenv('PLAYWRIGHT_BLOCKING', 'on').strip().lower() not in ('0', 'off', 'false', 'no')
+
+def _env_list(name):
+    return tuple(v.strip().lower() for v in os.getenv(name, '').split(',') if v.strip())
+
+def _matches(host, domains):
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+class ResourceBlocker:
+    """Decides which requests to abort, by Playwright resource type and by domain.
+
+    block_types/block_domains default to the module lists plus PLAYWRIGHT_BLOCK_TYPES /
+    PLAYWRIGHT_BLOCK_DOMAINS (comma-separated). allow_types and allow_domains are a spider's
+    exceptions: allowed types are always loaded, and allowed domains (with their subdomains) are
+    exempt from the domain blocklist, though their images/fonts/media are still dropped.
+    """
+
+    def __init__(self, block_types=None, block_domains=None, allow_types=(), allow_domains=()):
+        block_types = BLOCK_RESOURCE_TYPES if block_types is None else block_types
+        block_domains = BLOCK_DOMAINS if block_domains is None else block_domains
+        self.block_types = frozenset(tuple(block_types) + _env_list('PLAYWRIGHT_BLOCK_TYPES')) - frozenset(allow_types)
+        self.block_domains = tuple(block_domains) + _env_list('PLAYWRIGHT_BLOCK_DOMAINS')
+        self.allow_domains = tuple(allow_domains)
+        self.enabled = blocking_enabled()
+        self.aborted = 0
+        self._host_blocked = lru_cache(maxsize=4096)(self._check_host)
+
+    def _check_host(self, host):
+        return _matches(host, self.block_domains) and not _matches(host, self.allow_domains)
+
+    def should_abort(self, resource_type, url):
+        if not self.enabled:
+            return False
+        if resource_type in self.block_types or self._host_blocked((urlsplit(url).hostname or '').lower()):
+            self.aborted += 1
+            return True
+        return False
+
+    def __call__(self, request):
+        """PLAYWRIGHT_ABORT_REQUEST predicate (takes a playwright Request)."""
+        return self.should_abort(request.resource_type, request.url)
+
+    def route(self, route):
+        """Route handler for the sync Playwright API: context.route('**/*', blocker.route)."""
+        if self.should_abort(route.request.resource_type, route.request.url):
+            route.abort()
+        else:
+            route.continue_()
+
+def abort_request(**kwargs):
+    """Predicate for scrapy-playwright: PLAYWRIGHT_ABORT_REQUEST = abort_request(allow_types=('image',))."""
+    return ResourceBlocker(**kwargs)
+
+def block_resources(target, **kwargs):
+    """Install a ResourceBlocker on a sync-API BrowserContext or Page; returns it (its .aborted counts requests)."""
+    blocker = ResourceBlocker(**kwargs)
+    if blocker.enabled:
+        target.route('**/*', blocker.route)
+        logger.info(f"Blocking resource types {sorted(blocker.block_types)} and {len(blocker.block_domains)} tracker domains")
+    return blocker
@@ -0,0 +1,89 @@
+# Hybrid retrieval: Postgres full-text search and vector search, merged with reciprocal-rank fusion.
+# The lexical side uses the generated tsvector column and GIN index of the documents table (core.schema),
+# so model numbers such as "SE-350" are an index lookup instead of an ILIKE sequential scan; the vector
+# side catches paraphrases.
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from core.hydrate import hydrate_matches, HYDRATE_TABLES
+
+logger = logging.getLogger(__name__)
+
+TS_CONFIG = 'english'
+RRF_K = 60  # Standard RRF constant; dampens the weight of top ranks
+# Control4 is sold by SnapOne; data from both sites is labelled with either brand
+BRAND_ALIASES = {'Control4': ('Control4', 'SnapOne'), 'SnapOne': ('SnapOne', 'Control4')}
+
+def lexical_search(conn, query, brand=None, limit=20):
+    """Ranked [(source, id)] full-text matches from the documents table, best first."""
+    where = 'search_tsv @@ q'
+    params = [query]
+    if brand:
+        where += ' AND brand = ANY(%s)'
+        params.append(list(BRAND_ALIASES.get(brand, (brand,))))
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT id FROM documents, websearch_to_tsquery('{TS_CONFIG}', %s) q WHERE {where} "
+                    f"ORDER BY ts_rank_cd(search_tsv, q) DESC LIMIT %s", params + [limit])
+        return [('documents', db_id) for db_id, in cur.fetchall()]
+
+def _match_key(match):
+    metadata = match.get('metadata') or {}
+    if metadata.get('db_id') and metadata.get('source', 'dealer_info') in HYDRATE_TABLES:
+        return metadata.get('source', 'dealer_info'), int(metadata['db_id'])
+    return 'vector', match['id']
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Merge ranked key lists into [(key, score)] ordered by sum(1 / (k + rank))."""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+class HybridRetriever:
+    """Runs full-text and vector search concurrently and fuses the rankings.
+
+    search() returns match dicts shaped like vector store matches ({'id', 'score', 'metadata'}),
+    with the full Postgres record hydrated into metadata and one match per record.
+    """
+
+    def __init__(self, index, embedder, connect, candidates=20, rrf_k=RRF_K):
+        self.index = index
+        self.embedder = embedder
+        self.connect = connect  # Context manager yielding a psycopg2 connection, e.g. core.db.get_pg_connection
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='retrieval')
+
+    def vector_search(self, query, brand=None):
+        embedding = self.embedder.embed_query(query)
+        if embedding is None:
+            return []
+        filter = {'brand': {'$in': list(BRAND_ALIASES.get(brand, (brand,)))}} if brand else None
+        return self.index.query(vector=embedding, top_k=self.candidates, include_metadata=True, filter=filter).get('matches', [])
+
+    def search(self, query, brand=None, top_k=5):
+        vector_future = self._pool.submit(self.vector_search, query, brand)
+        with self.connect() as conn:
+            try:
+                lexical = lexical_search(conn, query, brand, self.candidates)
+            except Exception as e:
+                logger.error(f"Full-text search failed, using vector results only: {e}")
+                conn.rollback()
+                lexical = []
+            try:
+                vector_matches = vector_future.result()
+            except Exception as e:
+                logger.error(f"Vector search failed, using full-text results only: {e}")
+                vector_matches = []
+            # Several chunks of one record count once, at the rank of the best chunk
+            by_key = {}
+            for match in vector_matches:
+                by_key.setdefault(_match_key(match), match)
+            fused = reciprocal_rank_fusion([list(by_key), lexical], self.rrf_k)[:top_k]
+            matches = []
+            for key, score in fused:
+                match = by_key.get(key)
+                if match is None:
+                    match = {'id': f"{key[0]}:{key[1]}", 'metadata': {'db_id': str(key[1]), 'source': key[0]}}
+                matches.append(dict(match, score=score))
+            return hydrate_matches(conn, matches)
@@ -0,0 +1,116 @@
+# Versioned Postgres schema for scraped documents.
+# Every loader and graph writes to one documents table keyed by the canonical URL (core.manifest
+# document_key), so re-runs update rows in place instead of adding duplicates. Migrations are applied
+# in order and recorded in schema_migrations; run migrate() before reading or writing.
+import logging
+import threading
+from core.manifest import document_key, content_hash
+from core.pg_bulk import bulk_upsert
+
+logger = logging.getLogger(__name__)
+
+DOCUMENTS_TABLE = 'documents'
+DOCUMENT_COLUMNS = ('doc_key', 'url', 'brand', 'product', 'category', 'issue', 'solution', 'depth', 'ingest_source', 'content_hash')
+MIGRATION_LOCK_ID = 7305001  # pg_advisory_xact_lock key; serializes concurrent migrate() calls
+
+def _backfill_legacy(cur):
+    """Copy rows from the old per-source tables, collapsing dealer_info duplicates by document key."""
+    for table, brand_sql in (('snapone_pdfs', "'SnapOne'"), ('dealer_info', 'brand')):
+        cur.execute("SELECT to_regclass(%s)", (table,))
+        if cur.fetchone()[0] is None:
+            continue
+        depth_sql = 'depth' if table == 'snapone_pdfs' else '0'
+        cur.execute(f"SELECT url, {brand_sql}, product, category, issue, solution, {depth_sql} FROM {table} ORDER BY id")
+        items = [dict(zip(('url', 'brand', 'product', 'category', 'issue', 'solution', 'depth'), row)) for row in cur.fetchall()]
+        rows = [document_row(item, item['brand'] or 'unknown', table) for item in items]
+        if rows:
+            bulk_upsert(cur.connection, DOCUMENTS_TABLE, DOCUMENT_COLUMNS, rows, conflict_key='doc_key')
+        logger.info(f"Backfilled {len(rows)} rows from {table} into {DOCUMENTS_TABLE}")
+
+MIGRATIONS = [
+    (1, 'documents table with canonical-URL key, lookup, trigram and full-text indexes', [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        """
+        CREATE TABLE IF NOT EXISTS documents (
+            id BIGSERIAL PRIMARY KEY,
+            doc_key TEXT NOT NULL UNIQUE,
+            url TEXT,
+            brand TEXT NOT NULL,
+            product TEXT,
+            category TEXT,
+            issue TEXT,
+            solution TEXT,
+            depth INTEGER DEFAULT 0,
+            ingest_source TEXT,
+            content_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            search_tsv tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(product, '') || ' ' || coalesce(issue, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(solution, '')), 'B')
+            ) STORED
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_documents_brand_product ON documents (brand, product)",
+        "CREATE INDEX IF NOT EXISTS idx_documents_brand_category ON documents (brand, category)",
+        "CREATE INDEX IF NOT EXISTS idx_documents_product_trgm ON documents USING GIN (product gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_documents_solution_trgm ON documents USING GIN (solution gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_documents_search_tsv ON documents USING GIN (search_tsv)",
+    ]),
+    (2, 'backfill documents from dealer_info and snapone_pdfs', [_backfill_legacy]),
+]
+
+_migrated = False
+_migrate_lock = threading.Lock()
+
+def migrate(conn):
+    """Apply pending migrations in one transaction; cheap no-op once this process has migrated."""
+    global _migrated
+    with _migrate_lock:
+        if _migrated:
+            return
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+            current = cur.fetchone()[0]
+            for version, description, steps in MIGRATIONS:
+                if version <= current:
+                    continue
+                for step in steps:
+                    if callable(step):
+                        step(cur)
+                    else:
+                        cur.execute(step)
+                cur.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)", (version, description))
+                logger.info(f"Applied schema migration {version}: {description}")
+        conn.commit()
+        _migrated = True
+
+def document_row(item, brand, source):
+    """documents row for a scraped item, in DOCUMENT_COLUMNS order."""
+    item = dict(item, brand=brand)
+    return (
+        document_key(item),
+        item.get('url') or None,
+        brand,
+        item.get('product', ''),
+        item.get('category', ''),
+        item.get('issue', ''),
+        item.get('solution', ''),
+        item.get('depth') or 0,
+        source,
+        content_hash(item)
+    )
+
+def upsert_documents(conn, items, brand, source):
+    """Bulk upsert items into documents; returns their ids in input order. The caller commits."""
+    columns = DOCUMENT_COLUMNS + ('updated_at',)
+    rows = (document_row(item, brand, source) + ('now',) for item in items)  # 'now' is a Postgres timestamp literal
+    return bulk_upsert(conn, DOCUMENTS_TABLE, columns, rows, conflict_key='doc_key')
@@ -0,0 +1,260 @@
+# Harvest a site search through its JSON API instead of paging the rendered results.
+# The browser performs the first search as usual; the XHR/fetch response behind the result list is
+# captured, its request is replayed for every other page by changing the page/offset parameter, and the
+# pages are fetched in parallel from inside the logged-in page (so they carry its cookies and headers).
+# Result entries are found structurally: the largest list of objects that mention a PDF link.
+# harvest_terms() also shards the search: the same request is replayed with the search term swapped
+# for each of several narrower terms, and every shard is paged the same way.
+import os
+import json
+import logging
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+FETCH_CONCURRENCY = int(os.getenv('SEARCH_API_CONCURRENCY', 8))
+FETCH_BATCH_PAGES = 40  # Pages per page.evaluate round trip
+MAX_PAGES = 5000
+OFFSET_PARAMS = ('beginIndex', 'start', 'offset', 'from', 'startIndex')
+PAGE_PARAMS = ('page', 'pageNumber', 'currentPage', 'pageIndex', 'pageNo')
+SIZE_PARAMS = ('pageSize', 'rows', 'size', 'limit', 'count', 'resultsPerPage')
+TOTAL_KEYS = ('recordSetTotal', 'totalCount', 'totalResults', 'total', 'totalRecords', 'numFound', 'resultCount')
+TITLE_KEYS = ('title', 'name', 'displayName', 'fileName', 'description', 'shortDescription')
+CATEGORY_KEYS = ('usage', 'category', 'documentType', 'type', 'fileType', 'attachmentUsage')
+
+FETCH_PAGES_JS = '''async ({requests, concurrency}) => {
+    const results = new Array(requests.length);
+    let next = 0;
+    const worker = async () => {
+        while (next < requests.length) {
+            const i = next++;
+            const r = requests[i];
+            try {
+                const response = await fetch(r.url, {method: r.method, headers: r.headers, body: r.body, credentials: 'include'});
+                results[i] = response.ok ? await response.json() : {__error: response.status};
+            } catch (e) {
+                results[i] = {__error: String(e)};
+            }
+        }
+    };
+    await Promise.all(Array.from({length: Math.min(concurrency, requests.length)}, worker));
+    return results;
+}'''
+
+def is_json_xhr(response, url_hint=None):
+    """expect_response predicate: a fetch/XHR JSON response, optionally with url_hint in its URL."""
+    request = response.request
+    if request.resource_type not in ('xhr', 'fetch'):
+        return False
+    if 'json' not in (response.headers.get('content-type') or ''):
+        return False
+    return not url_hint or url_hint.lower() in response.url.lower()
+
+def _mentions_pdf(value, depth=0):
+    if isinstance(value, str):
+        return '.pdf' in value.lower()
+    if depth < 2 and isinstance(value, dict):
+        return any(_mentions_pdf(v, depth + 1) for v in value.values())
+    if depth < 2 and isinstance(value, list):
+        return any(_mentions_pdf(v, depth + 1) for v in value[:5])
+    return False
+
+def find_results(payload):
+    """The largest list of dicts in payload whose entries mention a .pdf URL ([] if none)."""
+    best = []
+    stack = [payload]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            entries = [v for v in value if isinstance(v, dict)]
+            if len(entries) > len(best) and any(_mentions_pdf(v) for v in entries[:5]):
+                best = entries
+            stack.extend(entries)
+    return best
+
+def find_total(payload):
+    stack = [payload]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            for key in TOTAL_KEYS:
+                if isinstance(value.get(key), (int, str)) and str(value[key]).isdigit():
+                    return int(value[key])
+            stack.extend(v for v in value.values() if isinstance(v, dict))
+    return None
+
+def _first(entry, keys):
+    for key in keys:
+        value = entry.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return ''
+
+def _pdf_url(entry, depth=0):
+    for value in entry.values():
+        if isinstance(value, str) and '.pdf' in value.lower():
+            return value
+        if depth < 1 and isinstance(value, dict):
+            url = _pdf_url(value, depth + 1)
+            if url:
+                return url
+    return None
+
+def result_fields(entry):
+    """(pdf_url, title, category) from one search result object; pdf_url is None if it has no PDF."""
+    return _pdf_url(entry), _first(entry, TITLE_KEYS), _first(entry, CATEGORY_KEYS)
+
+class SearchRequest:
+    """A captured search request whose page/offset parameter can be rewritten, in the query or in a JSON/form body."""
+
+    def __init__(self, url, method='GET', headers=None, body=None):
+        self.url = url
+        self.method = method
+        self.headers = {k: v for k, v in (headers or {}).items() if not k.startswith(':') and k.lower() not in ('cookie', 'content-length')}
+        self.body = body
+        self.query = dict(parse_qsl(urlsplit(url).query, keep_blank_values=True))
+        self.body_json = None
+        self.body_form = None
+        if body:
+            try:
+                self.body_json = json.loads(body)
+            except ValueError:
+                self.body_form = dict(parse_qsl(body, keep_blank_values=True))
+        self.param, self.where, self.offset_style = self._find_param()
+
+    @classmethod
+    def from_response(cls, response):
+        request = response.request
+        return cls(request.url, request.method, request.headers, request.post_data)
+
+    def _params(self):
+        yield 'query', self.query
+        if isinstance(self.body_json, dict):
+            yield 'json', self.body_json
+        if self.body_form is not None:
+            yield 'form', self.body_form
+
+    def _find_param(self):
+        for names, offset_style in ((OFFSET_PARAMS, True), (PAGE_PARAMS, False)):
+            for where, params in self._params():
+                for name in names:
+                    if name in params:
+                        return name, where, offset_style
+        return None, None, False
+
+    def page_size(self, first_count):
+        for _, params in self._params():
+            for name in SIZE_PARAMS:
+                if str(params.get(name, '')).isdigit() and int(params[name]) > 0:
+                    return int(params[name])
+        return first_count
+
+    def first_value(self):
+        params = dict(self._params())[self.where]
+        try:
+            return int(params[self.param])
+        except (TypeError, ValueError):
+            return 0 if self.offset_style else 1
+
+    def for_page(self, index, page_size):
+        """Request spec (for FETCH_PAGES_JS) of the page index pages after the captured one."""
+        url, body = self.url, self.body
+        if self.where is not None:
+            value = self.first_value() + (index * page_size if self.offset_style else index)
+        if self.where == 'query':
+            parts = urlsplit(self.url)
+            url = urlunsplit(parts._replace(query=urlencode(dict(self.query, **{self.param: value}))))
+        elif self.where == 'json':
+            body = json.dumps(dict(self.body_json, **{self.param: value}))
+        elif self.where == 'form':
+            body = urlencode(dict(self.body_form, **{self.param: value}))
+        return {'url': url, 'method': self.method, 'headers': self.headers, 'body': body}
+
+    def with_term(self, term, new_term):
+        """Copy of this request with every parameter equal to term set to new_term; None if no parameter is term."""
+        swap = lambda params: {k: new_term if v == term else v for k, v in params.items()}
+        url, body = self.url, self.body
+        if term in self.query.values():
+            url = urlunsplit(urlsplit(self.url)._replace(query=urlencode(swap(self.query))))
+        if isinstance(self.body_json, dict) and term in self.body_json.values():
+            body = json.dumps(swap(self.body_json))
+        elif self.body_form and term in self.body_form.values():
+            body = urlencode(swap(self.body_form))
+        if url == self.url and body == self.body:
+            return None
+        return SearchRequest(url, self.method, self.headers, body)
+
+def fetch_pages(page, specs, concurrency=FETCH_CONCURRENCY):
+    """Fetch request specs in parallel from inside page (sync Playwright); JSON payloads in order."""
+    return page.evaluate(FETCH_PAGES_JS, {'requests': specs, 'concurrency': concurrency})
+
+def truncated(search, payload):
+    """True if payload is the first page of more results than it holds and search has no parameter to page with."""
+    total = find_total(payload)
+    return search.param is None and total is not None and total > len(find_results(payload))
+
+def harvest_request(page, search, payload, concurrency=FETCH_CONCURRENCY, max_pages=MAX_PAGES):
+    """Yield every result entry of search, given the payload of its first page, fetching the other pages in parallel.
+
+    With a known total all remaining pages are requested at once (in batches); otherwise batches
+    continue until a page comes back empty.
+    """
+    first = find_results(payload)
+    yield from first
+    if not first or search.param is None:
+        if truncated(search, payload):
+            logger.warning(f"Search API: only the first {len(first)} of {find_total(payload)} results; no pagination parameter in {search.url}")
+        else:
+            logger.info(f"Search API: {len(first)} results, no pagination parameter in {search.url}")
+        return
+    page_size = search.page_size(len(first))
+    total = find_total(payload)
+    pages = min(max_pages, -(-total // page_size)) if total else max_pages
+    logger.info(f"Search API: {search.method} {search.url.split('?')[0]} paged by {search.param} ({page_size}/page, total {total})")
+    index = 1
+    while index < pages:
+        batch = range(index, min(pages, index + FETCH_BATCH_PAGES))
+        payloads = fetch_pages(page, [search.for_page(i, page_size) for i in batch], concurrency)
+        empty = 0
+        for i, data in zip(batch, payloads):
+            if isinstance(data, dict) and '__error' in data:
+                logger.warning(f"Search API page {i + 1} failed: {data['__error']}")
+                continue
+            results = find_results(data)
+            empty += not results
+            yield from results
+        logger.info(f"Search API: fetched pages {batch.start + 1}-{batch.stop} of {pages if total else '?'}")
+        if not total and empty:
+            return
+        index = batch.stop
+
+def harvest(page, response, concurrency=FETCH_CONCURRENCY, max_pages=MAX_PAGES):
+    """Yield every result entry of the search behind a captured JSON response (see harvest_request)."""
+    yield from harvest_request(page, SearchRequest.from_response(response), response.json(), concurrency, max_pages)
+
+def harvest_terms(page, response, term, other_terms, concurrency=FETCH_CONCURRENCY, max_pages=MAX_PAGES):
+    """harvest() the captured search for term, then the same search for each of other_terms (query shards).
+
+    The first pages of all shards are fetched in one parallel round trip; entries repeated across
+    shards are yielded again, so callers dedupe.
+    """
+    search = SearchRequest.from_response(response)
+    yield from harvest_request(page, search, response.json(), concurrency, max_pages)
+    shards = []
+    for other in other_terms:
+        shard = search.with_term(term, other)
+        if shard is None:
+            logger.warning(f"Search term {term!r} is not a parameter of {search.url}; skipping shard {other!r}")
+            continue
+        shards.append((other, shard))
+    if not shards:
+        return
+    firsts = fetch_pages(page, [shard.for_page(0, 0) for _, shard in shards], concurrency)
+    for (other, shard), payload in zip(shards, firsts):
+        if isinstance(payload, dict) and '__error' in payload:
+            logger.warning(f"Search API shard {other!r} failed: {payload['__error']}")
+            continue
+        logger.info(f"Search API: harvesting shard {other!r}")
+        yield from harvest_request(page, shard, payload, concurrency, max_pages)
@@ -0,0 +1,154 @@
+# Reusable authenticated browser session (Playwright storage_state) shared by spiders, scripts and workers.
+# Before anything logs in, the stored state is validated cheaply: first locally (auth cookies present and
+# not expired), then with one plain HTTP probe carrying those cookies, and a passing probe is trusted for
+# probe_ttl seconds. Only an expired session triggers the caller's login, under a file lock so concurrent
+# workers wait for one login instead of each running their own, and the new state is written atomically.
+import os
+import json
+import time
+import fcntl
+import logging
+from contextlib import contextmanager
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+from urllib.request import Request, HTTPRedirectHandler, build_opener
+
+logger = logging.getLogger(__name__)
+
+PROBE_TTL = int(os.getenv('SESSION_PROBE_TTL', 600))
+PROBE_TIMEOUT = 20
+LOGGED_OUT_MARKERS = ('name="Logon"', 'name="logonPassword"')  # A login form in the probe response
+
+class _NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None  # A redirect (typically to the login form) is the answer, not something to follow
+
+def _domain_matches(host, domain):
+    domain = domain.lstrip('.').lower()
+    return host == domain or host.endswith('.' + domain)
+
+class SessionManager:
+    """A storage_state JSON file, validated on use and refreshed only when the session has expired.
+
+    probe_url should be a cheap page or API call that only succeeds when logged in; auth_cookies are
+    name prefixes of the cookies that carry the login (checked for presence and expiry before probing).
+    """
+
+    def __init__(self, state_path, probe_url, auth_cookies=(), probe_ttl=PROBE_TTL):
+        self.state_path = state_path
+        self.probe_url = probe_url
+        self.auth_cookies = tuple(auth_cookies)
+        self.probe_ttl = probe_ttl
+        self.checked_path = state_path + '.checked'  # mtime = last successful probe
+
+    def load(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def cookies(self):
+        state = self.load()
+        return state.get('cookies', []) if state else []
+
+    def _local_check(self, cookies):
+        now = time.time()
+        live = [c for c in cookies if c.get('expires', -1) in (-1, None) or c['expires'] > now]
+        if not live:
+            return 'no unexpired cookies'
+        for prefix in self.auth_cookies:
+            if not any(c['name'].startswith(prefix) for c in live):
+                return f"no live {prefix}* cookie"
+        return None
+
+    def _cookie_header(self, cookies):
+        parts = urlsplit(self.probe_url)
+        host, path = (parts.hostname or '').lower(), parts.path or '/'
+        now = time.time()
+        return '; '.join(
+            f"{c['name']}={c['value']}" for c in cookies
+            if _domain_matches(host, c.get('domain', host)) and path.startswith(c.get('path', '/'))
+            and (c.get('expires', -1) in (-1, None) or c['expires'] > now)
+        )
+
+    def probe(self, cookies=None):
+        """True if probe_url answers as logged in with the stored cookies (a 2xx without a login form)."""
+        cookies = self.cookies() if cookies is None else cookies
+        request = Request(self.probe_url, headers={'Cookie': self._cookie_header(cookies), 'User-Agent': 'Mozilla/5.0'})
+        try:
+            with build_opener(_NoRedirect).open(request, timeout=PROBE_TIMEOUT) as response:
+                body = response.read(65536).decode('utf-8', 'replace')
+        except HTTPError as e:
+            logger.info(f"Session probe {self.probe_url}: HTTP {e.code} {e.headers.get('Location', '')}")
+            return False
+        except (URLError, OSError) as e:
+            logger.warning(f"Session probe {self.probe_url} failed: {e}")
+            return False
+        return not any(marker in body for marker in LOGGED_OUT_MARKERS)
+
+    def valid(self):
+        state = self.load()
+        if state is None:
+            logger.info(f"No stored session at {self.state_path}")
+            return False
+        problem = self._local_check(state.get('cookies', []))
+        if problem:
+            logger.info(f"Stored session expired: {problem}")
+            return False
+        try:
+            if time.time() - os.path.getmtime(self.checked_path) < self.probe_ttl:
+                return True
+        except OSError:
+            pass
+        if not self.probe(state.get('cookies', [])):
+            return False
+        self._mark_checked()
+        return True
+
+    def _mark_checked(self):
+        with open(self.checked_path, 'a'):
+            os.utime(self.checked_path)
+
+    def invalidate(self):
+        """Forget the last successful probe, e.g. after a request was bounced to the login form."""
+        try:
+            os.remove(self.checked_path)
+        except OSError:
+            pass
+
+    def save(self, context):
+        """Write a (sync-API) BrowserContext's storage_state atomically and mark it as just validated."""
+        state = context.storage_state()
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+        self._mark_checked()
+        logger.info(f"Session state saved to {self.state_path}")
+
+    @contextmanager
+    def lock(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        with open(self.state_path + '.lock', 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def ensure(self, refresh):
+        """Make sure a valid session is stored, calling refresh() (which must write it) only if not; True if it logged in.
+
+        Workers racing here serialize on the lock; the ones after the first find the fresh state valid.
+        """
+        with self.lock():
+            if self.valid():
+                logger.info(f"Reusing stored session {self.state_path}")
+                return False
+            logger.info("Session expired or missing; logging in")
+            refresh()
+            if self._local_check(self.cookies()):
+                raise RuntimeError(f"Login did not store a usable session in {self.state_path}")
+            self._mark_checked()
+            return True
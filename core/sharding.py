@@ -0,0 +1,42 @@
+# Sharded harvests: one catalog walk split into several narrower searches (by search term or category)
+# that run side by side in tabs of the same authenticated browser context.
+# The sync Playwright API can't be driven from several threads, so each shard is a generator that yields
+# its results right after it has started its next navigation or click; interleave() services the shards
+# round-robin, and while it waits on one tab the pages of the others are already loading.
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+def shard_list(value, default=('pdf',)):
+    """Comma-separated shards (e.g. the SNAPONE_SHARDS env var) as a de-duplicated list, in order."""
+    shards = [v.strip() for v in (value or '').split(',') if v.strip()]
+    return list(dict.fromkeys(shards)) or list(default)
+
+def interleave(tasks, workers, run):
+    """Run the generator run(worker, task) for every task, one per free worker at a time, round-robin.
+
+    Each step of a generator yields a list of results (possibly empty), which is passed on item by
+    item. A worker (tab) is reused for the next task once its generator is exhausted; a shard that
+    raises is logged and dropped without stopping the others.
+    """
+    tasks = deque(tasks)
+    free = deque(workers)
+    active = deque()
+    while tasks or active:
+        while tasks and free:
+            worker, task = free.popleft(), tasks.popleft()
+            active.append((worker, task, run(worker, task)))
+        worker, task, job = active.popleft()
+        try:
+            batch = next(job)
+        except StopIteration:
+            logger.info(f"Shard {task!r} done")
+            free.append(worker)
+            continue
+        except Exception as e:
+            logger.error(f"Shard {task!r} failed: {e}")
+            free.append(worker)
+            continue
+        active.append((worker, task, job))
+        yield from batch or ()
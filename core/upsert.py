@@ -0,0 +1,110 @@
+# Payload-size-aware parallel upsert writer.
+# Packs vectors into requests bounded by serialized size and vector count, sends them with bounded
+# concurrency, retries only the batches that failed and reports throughput.
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.vector_store import normalize_vectors
+
+logger = logging.getLogger(__name__)
+
+MAX_REQUEST_BYTES = 2 * 1024 * 1024  # Pinecone upsert request limit
+DEFAULT_BATCH_BYTES = int(MAX_REQUEST_BYTES * 0.9)
+DEFAULT_BATCH_VECTORS = 100
+FLOAT_JSON_BYTES = 20  # Upper bound for one serialized float32 value plus separator
+
+def estimate_vector_bytes(vector_id, values, metadata):
+    """Serialized size of one vector without dumping all of its floats."""
+    return len(vector_id) + len(values) * FLOAT_JSON_BYTES + len(json.dumps(metadata, ensure_ascii=False).encode('utf-8')) + 64
+
+class UpsertWriter:
+    """Buffers vectors and upserts them in size-bounded batches on a small thread pool.
+
+    Use as a context manager or call close(); after closing, failed_ids holds the IDs of
+    vectors whose batch still failed after max_retries attempts.
+    """
+
+    def __init__(self, index, namespace=None, max_batch_bytes=None, max_batch_vectors=None, concurrency=None, max_retries=3):
+        self.index = index
+        self.namespace = namespace
+        self.max_batch_bytes = max_batch_bytes or int(os.getenv('UPSERT_BATCH_BYTES', DEFAULT_BATCH_BYTES))
+        self.max_batch_vectors = max_batch_vectors or int(os.getenv('UPSERT_BATCH_VECTORS', DEFAULT_BATCH_VECTORS))
+        self.concurrency = concurrency or int(os.getenv('UPSERT_CONCURRENCY', 4))
+        self.max_retries = max_retries
+        self.upserted = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_ids = set()
+        self._batch = []
+        self._batch_bytes = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.concurrency * 2)  # Caps batches held in memory
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='upsert')
+        self._futures = []
+        self._started = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, vectors):
+        for vector_id, values, metadata in normalize_vectors(vectors):
+            size = estimate_vector_bytes(vector_id, values, metadata)
+            if self._batch and (self._batch_bytes + size > self.max_batch_bytes or len(self._batch) >= self.max_batch_vectors):
+                self._submit()
+            self._batch.append({'id': vector_id, 'values': values, 'metadata': metadata})
+            self._batch_bytes += size
+
+    def _submit(self):
+        batch, self._batch, self._batch_bytes = self._batch, [], 0
+        self._slots.acquire()
+        future = self._pool.submit(self._send, batch)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _send(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.index.upsert(vectors=batch, namespace=self.namespace)
+                with self._lock:
+                    self.upserted += len(batch)
+                    self.batches += 1
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Upsert of {len(batch)} vectors failed after {attempt + 1} attempts: {e}")
+                    with self._lock:
+                        self.failed_ids.update(v['id'] for v in batch)
+                    return
+                with self._lock:
+                    self.retries += 1
+                delay = min(2 ** attempt, 30)
+                logger.warning(f"Upsert of {len(batch)} vectors failed ({e}); retrying in {delay}s")
+                time.sleep(delay)
+
+    def close(self):
+        if self._batch:
+            self._submit()
+        for future in self._futures:
+            future.result()
+        self._futures = []
+        self._pool.shutdown(wait=True)
+        elapsed = time.perf_counter() - self._started
+        logger.info(f"Upserted {self.upserted} vectors in {self.batches} batches ({self.upserted / elapsed if elapsed else 0:.1f} vectors/sec, "
+                    f"{self.retries} retries, {len(self.failed_ids)} failed)")
+        return self.stats()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started
+        return {
+            'upserted': self.upserted,
+            'batches': self.batches,
+            'retries': self.retries,
+            'failed': len(self.failed_ids),
+            'vectors_per_sec': self.upserted / elapsed if elapsed else 0.0,
+        }
@@ -0,0 +1,119 @@
+# Pluggable vector store used by the loaders, graphs and test scripts.
+# VECTOR_STORE=pinecone (default) talks to the hosted index; VECTOR_STORE=local keeps vectors in an
+# in-process NumPy matrix for offline development, CI and latency benchmarks.
+import os
+import logging
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = 'troubleshooter-index'
+DIMENSION = 1536  # text-embedding-ada-002
+
+def normalize_vectors(vectors):
+    """Accept Pinecone-style (id, values[, metadata]) tuples or {'id', 'values', 'metadata'} dicts."""
+    normalized = []
+    for vector in vectors:
+        if isinstance(vector, dict):
+            normalized.append((str(vector['id']), vector['values'], vector.get('metadata') or {}))
+        else:
+            normalized.append((str(vector[0]), vector[1], vector[2] if len(vector) > 2 else {}))
+    return normalized
+
+class VectorStore(ABC):
+    """The subset of the Pinecone Index API the pipelines use.
+
+    query() returns {'matches': [{'id', 'score', 'metadata'}, ...]} and fetch() returns
+    {'vectors': {id: {'id', 'values', 'metadata'}}} so existing result handling keeps working.
+    """
+
+    @abstractmethod
+    def upsert(self, vectors=None, namespace=None):
+        pass
+
+    @abstractmethod
+    def query(self, vector=None, top_k=10, include_metadata=True, include_values=False, filter=None, namespace=None):
+        pass
+
+    def query_many(self, vectors, top_k=10, include_metadata=True, include_values=False, filter=None, namespace=None):
+        """Run several queries; backends override this when they can batch."""
+        return [self.query(vector=v, top_k=top_k, include_metadata=include_metadata, include_values=include_values,
+                           filter=filter, namespace=namespace) for v in vectors]
+
+    @abstractmethod
+    def delete(self, ids=None, namespace=None):
+        pass
+
+    @abstractmethod
+    def fetch(self, ids, namespace=None):
+        pass
+
+    def flush(self):
+        """Persist pending state (no-op for hosted backends)."""
+
+class PineconeVectorStore(VectorStore):
+    """Hosted Pinecone index, connected lazily on first use.
+
+    The index is only created (or, with recreate_on_mismatch, recreated) when create=True; readers
+    get a ValueError for a missing index instead.
+    """
+
+    def __init__(self, index_name=INDEX_NAME, dimension=DIMENSION, metric='cosine', create=False, recreate_on_mismatch=False):
+        self.index_name = index_name
+        self.dimension = dimension
+        self.metric = metric
+        self.create = create
+        self.recreate_on_mismatch = recreate_on_mismatch
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            from pinecone import Pinecone, ServerlessSpec
+            pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+            spec = ServerlessSpec(cloud='aws', region=os.getenv('PINECONE_ENVIRONMENT', 'us-east-1'))
+            if self.index_name in pc.list_indexes().names():
+                if self.create and self.recreate_on_mismatch and pc.describe_index(self.index_name).dimension != self.dimension:
+                    logger.info(f"Index {self.index_name} has the wrong dimension. Deleting and recreating with {self.dimension}.")
+                    pc.delete_index(self.index_name)
+                    pc.create_index(name=self.index_name, dimension=self.dimension, metric=self.metric, spec=spec)
+            elif not self.create:
+                raise ValueError(f"Pinecone index {self.index_name} does not exist (loaders create it with create=True)")
+            else:
+                logger.info(f"Creating Pinecone index {self.index_name} with dimension {self.dimension}")
+                pc.create_index(name=self.index_name, dimension=self.dimension, metric=self.metric, spec=spec)
+            self._index = pc.Index(self.index_name)
+        return self._index
+
+    def upsert(self, vectors=None, namespace=None):
+        kwargs = {'namespace': namespace} if namespace else {}
+        return self.index.upsert(vectors=vectors, **kwargs)
+
+    def query(self, vector=None, top_k=10, include_metadata=True, include_values=False, filter=None, namespace=None):
+        kwargs = {'namespace': namespace} if namespace else {}
+        if filter:
+            kwargs['filter'] = filter
+        return self.index.query(vector=vector, top_k=top_k, include_metadata=include_metadata, include_values=include_values, **kwargs)
+
+    def delete(self, ids=None, namespace=None):
+        kwargs = {'namespace': namespace} if namespace else {}
+        return self.index.delete(ids=ids, **kwargs)
+
+    def fetch(self, ids, namespace=None):
+        kwargs = {'namespace': namespace} if namespace else {}
+        return self.index.fetch(ids=ids, **kwargs)
+
+def get_vector_store(index_name=INDEX_NAME, dimension=DIMENSION, backend=None, **kwargs):
+    """Build the vector store selected by VECTOR_STORE ('pinecone' or 'local').
+
+    Pinecone kwargs: create=True lets writers create a missing index; recreate_on_mismatch=True
+    (with create) replaces one of the wrong dimension.
+    """
+    backend = (backend or os.getenv('VECTOR_STORE', 'pinecone')).lower()
+    if backend == 'local':
+        from core.local_vector_store import NumpyVectorStore
+        path = os.getenv('LOCAL_VECTOR_STORE_PATH', os.path.expanduser(f'~/.cache/ixome/{index_name}'))
+        return NumpyVectorStore(dimension=dimension, path=path)
+    if backend == 'pinecone':
+        return PineconeVectorStore(index_name=index_name, dimension=dimension, **kwargs)
+    raise ValueError(f"Unknown VECTOR_STORE backend: {backend}")
@@ -1,40 +1,51 @@
 import os
 import subprocess
-import json
+from collections import Counter
 from dotenv import load_dotenv  # Fits your existing env loading in chat_agent.py
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Root path for core/ 
 from langgraph.graph import StateGraph, END  # Fits LangGraph 0.2.20 deps
-from typing import Dict, List, TypedDict
+from typing import List, TypedDict
 from langchain_core.messages import HumanMessage
-from langchain_openai import OpenAIEmbeddings  # Embeddings fit (dynamic for variable data)
 from openai import OpenAI  # Fits your client for filter LLM
-from pinecone import Pinecone as PineconeClient  # Fits your pc/init in chat_agent.py
-from core.db import insert_dealer_info, query_sqlite  # Hybrid fit from db.py
+from core.db import upsert_document, get_pg_connection  # Hybrid fit from db.py
+from core.embedding_pool import AsyncEmbeddingExecutor  # Batched, cached, rate-limited embeddings shared with the loaders
+from core.chunking import chunk_records, chunk_metadata  # Token-bounded chunks instead of embedding whole PDFs
+from core.vector_store import get_vector_store  # Pinecone or local NumPy index (VECTOR_STORE)
+from core.manifest import get_manifest, document_key, document_id, vector_id  # Stable IDs; skip unchanged items
+from core.crawl_state import acknowledge_loaded  # Incremental crawls stop re-emitting what was loaded or filtered out
+from core.upsert import UpsertWriter  # Payload-size-aware parallel upserts
+from core.schema import migrate  # Versioned documents schema (canonical-URL key, btree/trigram/GIN indexes)
+from core.record_reader import iter_records  # Streaming JSON/JSONL/Parquet reader
+from core import columnar  # Parquet scrape output when pyarrow is installed
+from core.records import DocumentRecord, normalize_record, normalize_records  # __slots__ DocumentRecord, one normalization pass
+from core.hydrate import vector_metadata  # Slim metadata (VECTOR_METADATA=slim); full text from PG at query time
+from core.browser_service import ensure_service  # Warm shared browser for the crawl subprocess (PLAYWRIGHT_CDP_URL)
+from core.retrieval import HybridRetriever  # Full-text + vector search with rank fusion
 
 load_dotenv()
 
-embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")  # Fits your embeddings; dynamic/variable length (Grok 4 placeholder: model="grok-4" when API ready)
+embeddings = AsyncEmbeddingExecutor(model="text-embedding-ada-002")  # Same embed_query interface; unchanged text is served from the embedding cache
 openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))  # For filter LLM (fits your client in chat_agent.py)
-pc = PineconeClient(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index("troubleshooter-index")  # Fits your index
+index = get_vector_store("troubleshooter-index", create=True)  # Fits your index; created on first load if missing
+retriever = HybridRetriever(index, embeddings, get_pg_connection)  # GIN tsvector search + vector search, fused by rank
 
 class State(TypedDict):
     messages: List[str]
-    scraped_data: List[Dict[str, str]]
-    filtered_data: List[Dict[str, str]]
+    scraped_data: List[DocumentRecord]
+    filtered_data: List[DocumentRecord]
 
 def scrape_agent(state: State) -> State:
     scraped_data = []  # Collect yielded items from JSON
     # Run Scrapy via subprocess (fits your nested path; avoids import issues, preserves spider 100%)
     spider_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scrapy-selenium', 'control4_scraper', 'control4_scraper'))  # Change dir to your project root for run
-    output_file = '/tmp/scraped_items.json'  # Temp JSON in /tmp to avoid dir issues
+    output_file = '/tmp/scraped_items.parquet' if columnar.available() else '/tmp/scraped_items.json'  # Temp file in /tmp to avoid dir issues; Parquet via FEED_EXPORTERS
     try:
         current_dir = os.getcwd()  # Save current dir
         os.chdir(spider_dir)  # Change to project dir for crawl (fixes "no active project")
+        ensure_service()  # Starts scripts/browser_service.py if PLAYWRIGHT_CDP_URL is set but down; the spider attaches to it
         subprocess.call(['scrapy', 'crawl', 'control4', '-o', output_file])  # Run spider, output to JSON (name 'control4' fits new spider)
-        with open(output_file, 'r') as f:
-            scraped_data = json.load(f)  # Load yielded items (fits your spider yield dicts)
+        scraped_data = list(normalize_records(iter_records(output_file), brand="Control4", defaults={'product': 'unknown'}))  # Load yielded items as compact DocumentRecords; streamed, array or JSONL
         os.remove(output_file)  # Clean up
         os.chdir(current_dir)  # Restore dir
         print("Debug: Scraped data keys and sample: ", scraped_data[0] if scraped_data else "No items scraped")  # Debug for keys
@@ -45,7 +56,7 @@ def scrape_agent(state: State) -> State:
 def filter_agent(state: State) -> State:
     filtered_data = []  # Only important items (relevant to smart home/racks)
     for item in state["scraped_data"]:
-        text = item.get('solution', ' '.join(str(v) for v in item.values()))  # Dynamic text
+        text = item.solution or ' '.join(str(v) for v in item.values() if v)  # Dynamic text
         # Use LLM to filter important (fits goal: look at everything, add only relevant)
         response = openai_client.chat.completions.create(
             model="gpt-4o-mini",
@@ -57,23 +68,37 @@ def filter_agent(state: State) -> State:
     return {"filtered_data": filtered_data, "messages": state["messages"] + [f"Filtered to {len(filtered_data)} important items"]}
 
 def load_agent(state: State) -> State:
-    for item in state["filtered_data"]:
-        info = item.get('solution', ' '.join(str(v) for v in item.values()))  # Use 'solution' or concat
-        component = item.get('product', 'unknown')  # From your Lutron debug; fits Control4
-        insert_dealer_info("Control4", info, component)  # Hybrid to SQLite (full text, no limit)
-        # Dynamic upsert to Pinecone (batch for efficiency, variable lengths)
-        emb = embeddings.embed_query(info)  # Embed full for search
-        metadata_solution = info[:40000]  # Truncate to <40KB for metadata limit (fits Pinecone)
-        index.upsert([{"id": str(hash(info)), "values": emb, "metadata": {"solution": metadata_solution, "brand": "Control4", "issue": item.get('issue', ''), "category": item.get('category', ''), "url": item.get('url', ''), "product": component}}])
+    items = [item if item.solution else normalize_record(item, defaults={'solution': ' '.join(str(v) for v in item.values() if v)}) for item in state["filtered_data"]]  # Use 'solution' or concat
+    # Stable IDs from canonical URL (hash() is randomized per process); unchanged items are skipped entirely
+    manifest = get_manifest()
+    plan = manifest.plan('control4_graph', items, prune=False)  # No pruning: a run only sees the items that passed the filter
+    changed = [item for _, _, item in plan.changed]
+    with get_pg_connection() as conn:  # Pooled connection reused for every insert (prepared once)
+        migrate(conn)  # documents table keyed by canonical URL; re-runs update rows instead of duplicating them
+        db_ids = [upsert_document(item, "Control4", "control4_graph", conn) for item in changed]  # Hybrid to PG (full text, no limit)
+    chunks = chunk_records(changed, text_fn=lambda item: item.solution)  # Each chunk fits the embedding model
+    embs = embeddings.embed_texts([chunk['text'] for _, chunk in chunks])  # Embed all chunks concurrently, under the API rate limits
+    failed = set()
+    writer = UpsertWriter(index)  # One size-bounded parallel writer instead of one upsert call per vector
+    for (i, chunk), emb in zip(chunks, embs):
+        if emb is None:
+            failed.add(i)
+            continue
+        key, _, item = plan.changed[i]
+        # Dynamic upsert to Pinecone (batch for efficiency, variable lengths); chunk text stays well under the 40KB metadata limit
+        writer.add([{"id": vector_id(key, chunk['chunk_index']), "values": emb, "metadata": vector_metadata({"solution": chunk['text'], "brand": "Control4", "issue": item.issue, "category": item.category, "url": item.url, "product": item.product, "db_id": str(db_ids[i] or ''), "source": "documents", **chunk_metadata(document_id(key), chunk)})}])
+    writer.close()
+    failed.update(i for i, chunk in chunks if vector_id(plan.changed[i][0], chunk['chunk_index']) in writer.failed_ids)
+    manifest.commit(index, 'control4_graph', plan, Counter(i for i, _ in chunks), failed)
+    kept = {key for key, _, _ in plan.changed} | set(plan.unchanged)
+    acknowledge_loaded(plan, failed, skipped=[key for key in map(document_key, state["scraped_data"]) if key not in kept])  # Filtered out counts as handled
+    index.flush()
     return {"messages": state["messages"] + ["Loaded important data to hybrid DB"]}
 
 def query_agent(state: State) -> State:
-    # Hybrid query (fits retrieval in chat_agent.py)
-    emb = embeddings.embed_query("Control4 rack issue")
-    results = index.query(vector=emb, top_k=1, include_metadata=True).get('matches', [])
-    pinecone_result = results[0].get('metadata', {}).get('solution', '') if results else 'No Pinecone matches'
-    sqlite_result = query_sqlite("Control4", "audio")  # Example; dynamic from input/issue later
-    combined = f"Pinecone: {pinecone_result}\nSQLite: {sqlite_result}"
+    # Hybrid query (fits retrieval in chat_agent.py): full-text + vector search run concurrently, merged by reciprocal-rank fusion
+    results = retriever.search("Control4 rack audio issue", brand="Control4", top_k=3)  # Example; dynamic from input/issue later
+    combined = "\n".join(f"Hybrid ({r['score']:.3f}): {r.get('metadata', {}).get('solution', '')}" for r in results) or 'No matches'
     return {"messages": state["messages"] + [combined]}
 
 graph = StateGraph(State)
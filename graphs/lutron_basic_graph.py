@@ -1,53 +1,50 @@
 import os
 import subprocess
-import json
+from collections import Counter
 from dotenv import load_dotenv
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from langgraph.graph import StateGraph, END
-from typing import Dict, List, TypedDict
-from langchain_openai import OpenAIEmbeddings
+from typing import List, TypedDict
 from openai import OpenAI
-from pinecone import Pinecone as PineconeClient
-import psycopg2  # PG direct (replace core.db)
+from core.db import get_pg_connection, upsert_document
+from core.embedding_pool import AsyncEmbeddingExecutor
+from core.chunking import chunk_records, chunk_metadata
+from core.vector_store import get_vector_store
+from core.manifest import get_manifest, document_key, document_id, vector_id
+from core.crawl_state import acknowledge_loaded
+from core.upsert import UpsertWriter
+from core.schema import migrate
+from core.record_reader import iter_records
+from core import columnar
+from core.records import DocumentRecord, normalize_records
+from core.hydrate import vector_metadata
+from core.browser_service import ensure_service
+from core.retrieval import HybridRetriever
 
 load_dotenv()
 
-embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+embeddings = AsyncEmbeddingExecutor(model="text-embedding-ada-002")
 openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-pc = PineconeClient(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index("troubleshooter-index")
+index = get_vector_store("troubleshooter-index", create=True)  # Created on first load if missing
 
-def get_pg_connection():
-    return psycopg2.connect(dbname=os.getenv("PG_DBNAME"), user=os.getenv("PG_USER"), password=os.getenv("PG_PASSWORD"), host=os.getenv("PG_HOST", "localhost"), port=os.getenv("PG_PORT", 5432))
-
-def insert_dealer_info(brand, info, component):
-    with get_pg_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("INSERT INTO dealer_info (brand, solution, product) VALUES (%s, %s, %s)", (brand, info, component))
-            conn.commit()
-
-def query_sqlite(brand, keyword):  # Stub; use PG query
-    with get_pg_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute("SELECT solution FROM dealer_info WHERE brand=%s AND solution ILIKE %s LIMIT 1", (brand, f"%{keyword}%"))
-            return cur.fetchone()[0] if cur.fetchone() else 'No match'
+retriever = HybridRetriever(index, embeddings, get_pg_connection)
 
 class State(TypedDict):
     messages: List[str]
-    scraped_data: List[Dict[str, str]]
-    filtered_data: List[Dict[str, str]]
+    scraped_data: List[DocumentRecord]
+    filtered_data: List[DocumentRecord]
 
 def scrape_agent(state: State) -> State:
     scraped_data = []
     spider_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scrapers', 'lutron_scraper', 'lutron_scraper'))
-    output_file = '/tmp/lutron_homeworks_items.jsonl'
+    output_file = '/tmp/lutron_homeworks_items.parquet' if columnar.available() else '/tmp/lutron_homeworks_items.jsonl'
     try:
         current_dir = os.getcwd()
         os.chdir(spider_dir)
+        ensure_service()  # Starts scripts/browser_service.py if PLAYWRIGHT_CDP_URL is set but down; the spider attaches to it
         subprocess.call(['scrapy', 'crawl', 'lutron_homeworks', '-o', output_file], cwd=spider_dir)
-        with open(output_file, 'r') as f:
-            scraped_data = [json.loads(line) for line in f if line.strip()]
+        scraped_data = list(normalize_records(iter_records(output_file), brand="Lutron", defaults={'product': 'HomeWorks'}))
         os.remove(output_file)
         os.chdir(current_dir)
         print("Debug: Scraped sample: ", scraped_data[0] if scraped_data else "No items")
@@ -58,7 +55,7 @@ def scrape_agent(state: State) -> State:
 def filter_agent(state: State) -> State:
     filtered_data = []
     for item in state["scraped_data"]:
-        text = item.get('solution', ' '.join(str(v) for v in item.values()))
+        text = item.solution or ' '.join(str(v) for v in item.values() if v)
         response = openai_client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "system", "content": "Filter for Lutron HomeWorks data. 'yes' if relevant to smart home lighting, automation, switches, integration; else 'no'."},
@@ -69,21 +66,35 @@ def filter_agent(state: State) -> State:
     return {"filtered_data": filtered_data, "messages": state["messages"] + [f"Filtered to {len(filtered_data)} items"]}
 
 def load_agent(state: State) -> State:
-    for item in state["filtered_data"]:
-        info = item.get('solution', '')
-        component = item.get('product', 'HomeWorks')
-        insert_dealer_info("Lutron", info, component)
-        emb = embeddings.embed_query(info)
-        metadata_solution = info[:40000]
-        index.upsert([{"id": str(hash(info)), "values": emb, "metadata": {"solution": metadata_solution, "brand": "Lutron", "issue": item.get('issue', ''), "category": item.get('category', ''), "url": item.get('url', ''), "product": component}}])
+    items = state["filtered_data"]
+    manifest = get_manifest()
+    plan = manifest.plan('lutron_graph', items, prune=False)  # Stable IDs; unchanged items are skipped
+    changed = [item for _, _, item in plan.changed]
+    with get_pg_connection() as conn:  # One pooled connection and one prepared upsert for every item
+        migrate(conn)  # documents table keyed by canonical URL; re-runs update rows instead of duplicating them
+        db_ids = [upsert_document(item, "Lutron", "lutron_graph", conn) for item in changed]
+    chunks = chunk_records(changed, text_fn=lambda item: item.solution)
+    embs = embeddings.embed_texts([chunk['text'] for _, chunk in chunks])  # Concurrent, rate-limited embedding of every chunk
+    failed = set()
+    writer = UpsertWriter(index)  # One size-bounded parallel writer instead of one upsert call per vector
+    for (i, chunk), emb in zip(chunks, embs):
+        if emb is None:
+            failed.add(i)
+            continue
+        key, _, item = plan.changed[i]
+        writer.add([{"id": vector_id(key, chunk['chunk_index']), "values": emb, "metadata": vector_metadata({"solution": chunk['text'], "brand": "Lutron", "issue": item.issue, "category": item.category, "url": item.url, "product": item.product, "db_id": str(db_ids[i] or ''), "source": "documents", **chunk_metadata(document_id(key), chunk)})}])
+    writer.close()
+    failed.update(i for i, chunk in chunks if vector_id(plan.changed[i][0], chunk['chunk_index']) in writer.failed_ids)
+    manifest.commit(index, 'lutron_graph', plan, Counter(i for i, _ in chunks), failed)
+    kept = {key for key, _, _ in plan.changed} | set(plan.unchanged)
+    acknowledge_loaded(plan, failed, skipped=[key for key in map(document_key, state["scraped_data"]) if key not in kept])  # Filtered out counts as handled
+    index.flush()
     return {"messages": state["messages"] + ["Loaded to PG/Pinecone"]}
 
 def query_agent(state: State) -> State:
-    emb = embeddings.embed_query("HomeWorks lighting issue")
-    results = index.query(vector=emb, top_k=1, include_metadata=True).get('matches', [])
-    pinecone_result = results[0].get('metadata', {}).get('solution', '') if results else 'No match'
-    pg_result = query_sqlite("Lutron", "lighting")
-    combined = f"Pinecone: {pinecone_result[:100]}...\nPG: {pg_result[:100]}..."
+    # Full-text and vector search run concurrently; rankings are merged with reciprocal-rank fusion
+    results = retriever.search("HomeWorks lighting issue", brand="Lutron", top_k=3)
+    combined = "\n".join(f"Hybrid ({r['score']:.3f}): {r.get('metadata', {}).get('solution', '')[:100]}..." for r in results) or 'No match'
     return {"messages": state["messages"] + [combined]}
 
 graph = StateGraph(State)
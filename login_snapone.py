@@ -1,11 +1,19 @@
 from playwright.sync_api import sync_playwright
 from dotenv import load_dotenv
 import os
-import time
 import logging
-import json
 import random
+from datetime import datetime, timezone
 from urllib.parse import urljoin
+from core.columnar import export_records  # Parquet when SNAPONE_OUTPUT ends in .parquet, else JSON
+from core.resource_blocking import block_resources  # Abort images, media, fonts and trackers
+from core.page_wait import settle  # Wait until the DOM and network are quiet, not a fixed sleep
+from core.crawl_state import get_crawl_state, incremental_enabled  # Emit only new/changed PDFs with CRAWL_INCREMENTAL=1
+from core.record_writer import mark_incremental  # Tells the loaders whether the output is complete
+from core.search_api import is_json_xhr, find_results, result_fields, harvest_terms, truncated, SearchRequest  # Page the search JSON API instead of the DOM
+from core.sharding import shard_list, interleave  # Several searches side by side in tabs of one context
+from core.session import SessionManager  # Reuse the stored login until a probe says it expired
+from core.browser_service import connect_browser  # Attach to the warm browser service instead of launching
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, filename='/home/vincent/ixome/scrapy-selenium/control4_scraper/login_snapone.log',
@@ -15,214 +23,349 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv(dotenv_path='/home/vincent/ixome/.env')
 
-def login_snapone():
+SNAPONE_OUTPUT = os.getenv('SNAPONE_OUTPUT', '/home/vincent/ixome/scrapy-selenium/control4_scraper/control4_data.json')
+SNAPONE_HARVEST = os.getenv('SNAPONE_HARVEST', 'api')  # 'api': replay the search XHR for all pages in parallel; 'dom': click through result pages
+SNAPONE_SEARCH_API_HINT = os.getenv('SNAPONE_SEARCH_API_HINT', '')  # Substring of the search API URL, if other JSON XHRs get in the way
+SNAPONE_DEBUG_PAGES = os.getenv('SNAPONE_DEBUG_PAGES', '') == '1'  # Save each result page's HTML (DOM mode)
+SNAPONE_SHARDS = shard_list(os.getenv('SNAPONE_SHARDS', 'pdf'))  # Search terms/categories harvested separately and merged, e.g. 'pdf,manual,datasheet'
+SNAPONE_TABS = int(os.getenv('SNAPONE_TABS', 4))  # Shards paged at once in DOM mode
+SNAPONE_MAX_PER_HOST = int(os.getenv('SNAPONE_MAX_PER_HOST', 8))  # Cap on tabs / parallel API fetches against snapav.com
+SNAPONE_SESSION = os.getenv('SNAPONE_SESSION', '/home/vincent/ixome/scrapy-selenium/control4_scraper/cookies.json')  # storage_state shared with Control4Spider
+SNAPONE_PROBE_URL = os.getenv('SNAPONE_PROBE_URL', 'https://www.snapav.com/wcs/resources/store/10151/person/@self')  # 401 unless logged in
+SNAPONE_AUTH_COOKIES = ('WC_AUTHENTICATION_',)
+SNAPONE_LOGIN_ONLY = os.getenv('SNAPONE_LOGIN_ONLY', '') == '1'  # Just log in and store the session (used by Control4Spider)
+PRODUCT_FILES_URL = 'https://www.snapav.com/shop/en/snapav/product-files-videos-search'
+NEXT_SELECTOR = 'a >> text="Next"'
+
+CONTEXT_OPTIONS = {
+    'user_agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
+    'viewport': {'width': 1280, 'height': 720},
+    'bypass_csp': True,
+    'geolocation': {'latitude': 37.7749, 'longitude': -122.4194},
+    'extra_http_headers': {
+        'X-Requested-With': 'XMLHttpRequest',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Referer': 'https://www.snapav.com/'
+    }
+}
+
+# One round trip per result page instead of several per item
+RESULT_ITEMS_JS = '''items => items.map(item => {
+    const a = item.querySelector('a[href*=".pdf"]');
+    const usage = item.querySelector('div.attachment-usage');
+    if (!a || !usage) return {missing: item.innerHTML.slice(0, 200)};
+    return {href: a.getAttribute('href'), product: a.innerText.trim(), category: usage.innerText.trim()};
+})'''
+
+def pdf_record(full_url, href, product_name, category_text, crawled_at):
+    return {
+        'url': full_url,
+        'product': product_name or 'Control4 Product',
+        'category': category_text or 'PDF Document',
+        'issue': href.split('/')[-1].replace('.pdf', ''),
+        'solution': f"PDF link for parsing: {full_url}",
+        'depth': 0,
+        'crawled_at': crawled_at
+    }
+
+def harvest_api(page, responses, terms):
+    """(href, product, category) for every result of every term via the captured search API (run for terms[0]).
+
+    None, so the caller pages the DOM instead, if none of responses is the search API or the API
+    cannot be paged (no page/offset parameter) while the results span more than one page.
+    """
+    for response in reversed(responses):  # The last JSON response before the results rendered is most likely the search
+        try:
+            payload = response.json()
+        except Exception:
+            continue
+        if not find_results(payload):
+            continue
+        search = SearchRequest.from_response(response)
+        if search.param is None and (truncated(search, payload) or page.is_visible(NEXT_SELECTOR)):
+            logger.warning(f"Search API {response.url} has no pagination parameter but more than one page of results; paging the DOM instead")
+            return None
+        logger.info(f"Harvesting through search API {response.request.method} {response.url}")
+        results = []
+        for entry in harvest_terms(page, response, terms[0], terms[1:], concurrency=SNAPONE_MAX_PER_HOST):
+            href, title, category = result_fields(entry)
+            if href:
+                results.append((href, title, category))
+        logger.info(f"Search API returned {len(results)} PDF results")
+        return results
+    logger.warning(f"No search API response among {len(responses)} JSON XHRs; paging the DOM instead")
+    return None
+
+def submit_search(page, term):
+    """Open Advanced Search on the product files page and search for term (returns once submitted)."""
+    settle(page, selector='div#advAccordion', timeout_ms=90000)
+    # Toggle Advanced Search section
+    try:
+        page.wait_for_selector('div#advAccordion', state='visible', timeout=10000)
+        page.click('div#advAccordion')
+        logger.info("Clicked Advanced Search toggle")
+        settle(page, quiet_ms=300, timeout_ms=5000)  # Accordion animation
+    except Exception as e:
+        logger.error(f"Advanced Search toggle click failed: {e}")
+
+    # Fill and submit Advanced Search
+    page.wait_for_selector('input#contentSearchTerm', timeout=90000)
+    page.type('input#contentSearchTerm', term, delay=random.randint(50, 100))
+    logger.info(f"Typed '{term}' in Advanced Search input")
+    try:
+        page.click('a#qop-submit', timeout=10000)
+        logger.info("Clicked 'GO' button")
+    except Exception as e:
+        logger.warning(f"GO button click failed: {e}, pressing Enter")
+        page.press('input#contentSearchTerm', 'Enter')
+        logger.info("Pressed Enter in Advanced Search input")
+
+def dom_pages(page, term):
+    """Per rendered result page of the search for term, a list of (href, product, category).
+
+    Each list is yielded right after 'Next' is clicked, so other tabs can be serviced while this
+    one loads (core.sharding.interleave).
+    """
+    current_page = 1
+    while True:
+        # Wait for dynamic content
+        settle(page, selector='div.attachment-description', timeout_ms=90000)
+        page.wait_for_selector('text=Displaying documents & videos', timeout=300000)
+        if SNAPONE_DEBUG_PAGES:
+            with open(f'/home/vincent/ixome/scrapy-selenium/control4_scraper/page_{term}_{current_page}.html', 'w') as f:
+                f.write(page.content())
+
+        # Extract PDFs from current page
+        entries = page.eval_on_selector_all('div.attachment-description', RESULT_ITEMS_JS)
+        logger.info(f"Found {len(entries)} result items on page {current_page} of '{term}'")
+        results = []
+        for entry in entries:
+            if 'missing' in entry:
+                logger.warning(f"No PDF link or category found in item on page {current_page}: {entry['missing']}...")
+                continue
+            results.append((entry['href'], entry['product'], entry['category']))
+
+        # Check for next page
+        next_button = page.query_selector(NEXT_SELECTOR)
+        if not (next_button and next_button.is_visible()):
+            logger.info(f"No 'Next' button found, ending pagination of '{term}'")
+            yield results
+            return
+        first_href = next((entry['href'] for entry in entries if 'href' in entry), None)
+        next_button.click()
+        yield results
+        # The old results stay in the DOM until the next page's XHR returns; wait for them to be replaced
+        try:
+            page.wait_for_function('''(href) => {
+                const a = document.querySelector('div.attachment-description a[href*=".pdf"]');
+                return !a || a.getAttribute('href') !== href;
+            }''', arg=first_href, timeout=60000)
+        except Exception as e:
+            logger.warning(f"Results did not change after clicking 'Next': {e}")
+        current_page += 1
+
+def dom_shard(page, term):
+    """dom_pages() for term in a fresh tab: yields while the product files page and the search load."""
+    page.goto(PRODUCT_FILES_URL, wait_until='commit', timeout=90000)
+    yield []
+    submit_search(page, term)
+    yield []
+    yield from dom_pages(page, term)
+
+def harvest_dom(context, page, terms):
+    """(href, product, category) for every result of every term, clicking 'Next' through the rendered pages.
+
+    page already shows the results for terms[0]; the other terms get their own tabs, up to
+    SNAPONE_TABS (and SNAPONE_MAX_PER_HOST) paging at once.
+    """
+    tab_count = max(1, min(SNAPONE_TABS, SNAPONE_MAX_PER_HOST, len(terms)))
+    tabs = [page] + [context.new_page() for _ in range(tab_count - 1)]
+    if len(terms) > 1:
+        logger.info(f"Harvesting {len(terms)} search shards in {tab_count} tabs")
+    run = lambda tab, term: dom_pages(tab, term) if tab is page and term == terms[0] else dom_shard(tab, term)
+    try:
+        yield from interleave(terms, tabs, run)
+    finally:
+        for tab in tabs[1:]:
+            tab.close()
+
+def snapone_login(page):
+    """Full cookie consent, LogonForm and redirect sequence; leaves page logged in on the shop."""
     username = os.getenv('SNAPONE_USERNAME')
     password = os.getenv('SNAPONE_PASSWORD')
     if not username or not password:
         logger.error("SNAPONE_USERNAME or SNAPONE_PASSWORD not found in .env")
         raise ValueError("Missing credentials in .env")
 
+    # Navigate to Snap One homepage
+    logger.info("Navigating to https://www.snapav.com")
+    page.goto('https://www.snapav.com', wait_until='domcontentloaded', timeout=60000)
+    settle(page, quiet_ms=300, timeout_ms=10000)
+
+    # Handle cookie consent
+    try:
+        page.click('button#onetrust-accept-btn-handler, button[aria-label*="cookie"], button.accept-cookies, button#accept-cookies', timeout=5000)
+        logger.info("Accepted cookie consent on homepage")
+    except Exception:
+        logger.info("No cookie consent popup on homepage")
+
+    # Navigate to login page
+    logger.info("Navigating to login page")
+    try:
+        page.click('a[href*="LogonForm"], a.login-link, a#login-button, a[class*="login"], a[title*="Log In"]', timeout=5000)
+        logger.info("Clicked login link")
+    except Exception:
+        logger.warning("Login link not found, navigating directly to https://www.snapav.com/shop/LogonForm")
+        page.goto('https://www.snapav.com/shop/LogonForm', wait_until='domcontentloaded', timeout=60000)
+
+    # Wait for page load
+    settle(page, selector='form[name="Logon"]', timeout_ms=90000)
+    logger.info("Login page fully loaded")
+
+    # Handle cookie consent (if reappears)
+    try:
+        page.click('button#onetrust-accept-btn-handler, button[aria-label*="cookie"], button.accept-cookies, button#accept-cookies', timeout=5000)
+        logger.info("Accepted cookie consent on login page")
+    except Exception:
+        logger.info("No cookie consent popup on login page")
+
+    # Fill login form
+    logger.info("Filling login form")
+    page.wait_for_selector('form[name="Logon"]', timeout=60000)
+    page.type('input[name="logonId"].cvform', username, delay=random.randint(50, 100))
+    page.type('input[name="logonPassword"].cvform', password, delay=random.randint(50, 100))
+    page.evaluate('''() => {
+        const form = document.querySelector('form[name="Logon"]');
+        if (!form) throw new Error("Form not found");
+        const logonId = document.querySelector('input[name="logonId"].cvform');
+        const logonPassword = document.querySelector('input[name="logonPassword"].cvform');
+        const reLogonURL = document.querySelector('form[name="Logon"] input[name="reLogonURL"]');
+        const catalogId = document.querySelector('form[name="Logon"] input[name="catalogId"]');
+        const storeId = document.querySelector('form[name="Logon"] input[name="storeId"]');
+        const errorViewName = document.querySelector('form[name="Logon"] input[name="errorViewName"]');
+        if (!logonId || !logonPassword || !reLogonURL || !catalogId || !storeId || !errorViewName) {
+            throw new Error("Required form fields not found");
+        }
+        logonId.dispatchEvent(new Event("input"));
+        logonPassword.dispatchEvent(new Event("input"));
+        reLogonURL.value = "LogonForm";
+        catalogId.value = "10010";
+        storeId.value = "10151";
+        errorViewName.value = "LogonForm";
+        const langId = document.querySelector('form[name="Logon"] input[name="langId"]');
+        if (langId) langId.value = "-1";
+    }''')
+
+    # Submit form
+    logger.info("Attempting to submit login form")
+    try:
+        page.click('form[name="Logon"] button.btn-5[type="submit"]', timeout=10000)
+        logger.info("Clicked submit button")
+    except Exception as e:
+        logger.warning(f"Button click failed: {e}, trying JavaScript submission")
+        page.evaluate('document.querySelector("form[name=Logon]").submit()')
+        logger.info("Submitted form via JavaScript")
+
+    # Wait for redirect
+    page.wait_for_url('https://www.snapav.com/shop/**', timeout=90000)
+    if 'LogonForm' in page.url or 'login' in page.url.lower():
+        raise Exception("Login failed, stayed on login page")
+    logger.info("Login successful, redirected to %s", page.url)
+
+    # Handle "go to homepage" box
+    try:
+        page.wait_for_selector('a[href*="/shop/home"], a[href*="/shop/en/snapav/home"], button:contains("Go to Homepage"), a:contains("Homepage")', timeout=10000)
+        page.click('a[href*="/shop/home"], a[href*="/shop/en/snapav/home"], button:contains("Go to Homepage"), a:contains("Homepage")')
+        logger.info("Clicked 'go to homepage' link/button")
+        settle(page, quiet_ms=300, timeout_ms=10000)
+    except Exception:
+        logger.info("No 'go to homepage' box found, proceeding")
+
+def login_snapone():
+    session = SessionManager(SNAPONE_SESSION, SNAPONE_PROBE_URL, SNAPONE_AUTH_COOKIES)
     with sync_playwright() as p:
-        # Launch browser
-        context = p.chromium.launch_persistent_context(
-            user_data_dir='/home/vincent/ixome/snapone_profile',
-            headless=True,
-            args=['--disable-blink-features=AutomationControlled', '--no-sandbox', '--disable-web-security'],
-            user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
-            viewport={'width': 1280, 'height': 720},
-            bypass_csp=True,
-            geolocation={'latitude': 37.7749, 'longitude': -122.4194},
-            extra_http_headers={
-                'X-Requested-With': 'XMLHttpRequest',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Referer': 'https://www.snapav.com/'
-            }
-        )
+        browser = connect_browser(p)  # Warm shared browser (scripts/browser_service.py) if PLAYWRIGHT_CDP_URL answers
+        if browser:
+            context = browser.new_context(**CONTEXT_OPTIONS)
+        else:
+            # Launch browser
+            context = p.chromium.launch_persistent_context(
+                user_data_dir='/home/vincent/ixome/snapone_profile',
+                headless=True,
+                args=['--disable-blink-features=AutomationControlled', '--no-sandbox', '--disable-web-security'],
+                **CONTEXT_OPTIONS
+            )
+        blocker = block_resources(context)
         page = context.new_page()
 
         try:
-            # Navigate to Snap One homepage
-            logger.info("Navigating to https://www.snapav.com")
-            page.goto('https://www.snapav.com', wait_until='domcontentloaded', timeout=60000)
-            time.sleep(random.uniform(0.5, 1.5))
-
-            # Handle cookie consent
-            try:
-                page.click('button#onetrust-accept-btn-handler, button[aria-label*="cookie"], button.accept-cookies, button#accept-cookies', timeout=5000)
-                logger.info("Accepted cookie consent on homepage")
-            except Exception:
-                logger.info("No cookie consent popup on homepage")
-
-            # Navigate to login page
-            logger.info("Navigating to login page")
-            try:
-                page.click('a[href*="LogonForm"], a.login-link, a#login-button, a[class*="login"], a[title*="Log In"]', timeout=5000)
-                logger.info("Clicked login link")
-            except Exception:
-                logger.warning("Login link not found, navigating directly to https://www.snapav.com/shop/LogonForm")
-                page.goto('https://www.snapav.com/shop/LogonForm', wait_until='domcontentloaded', timeout=60000)
-            time.sleep(random.uniform(0.5, 1.5))
-
-            # Wait for page load
-            page.wait_for_load_state('networkidle', timeout=90000)
-            logger.info("Login page fully loaded")
-
-            # Handle cookie consent (if reappears)
-            try:
-                page.click('button#onetrust-accept-btn-handler, button[aria-label*="cookie"], button.accept-cookies, button#accept-cookies', timeout=5000)
-                logger.info("Accepted cookie consent on login page")
-            except Exception:
-                logger.info("No cookie consent popup on login page")
-
-            # Fill login form
-            logger.info("Filling login form")
-            page.wait_for_selector('form[name="Logon"]', timeout=60000)
-            page.type('input[name="logonId"].cvform', username, delay=random.randint(50, 100))
-            page.type('input[name="logonPassword"].cvform', password, delay=random.randint(50, 100))
-            page.evaluate('''() => {
-                const form = document.querySelector('form[name="Logon"]');
-                if (!form) throw new Error("Form not found");
-                const logonId = document.querySelector('input[name="logonId"].cvform');
-                const logonPassword = document.querySelector('input[name="logonPassword"].cvform');
-                const reLogonURL = document.querySelector('form[name="Logon"] input[name="reLogonURL"]');
-                const catalogId = document.querySelector('form[name="Logon"] input[name="catalogId"]');
-                const storeId = document.querySelector('form[name="Logon"] input[name="storeId"]');
-                const errorViewName = document.querySelector('form[name="Logon"] input[name="errorViewName"]');
-                if (!logonId || !logonPassword || !reLogonURL || !catalogId || !storeId || !errorViewName) {
-                    throw new Error("Required form fields not found");
-                }
-                logonId.dispatchEvent(new Event("input"));
-                logonPassword.dispatchEvent(new Event("input"));
-                reLogonURL.value = "LogonForm";
-                catalogId.value = "10010";
-                storeId.value = "10151";
-                errorViewName.value = "LogonForm";
-                const langId = document.querySelector('form[name="Logon"] input[name="langId"]');
-                if (langId) langId.value = "-1";
-            }''')
-            time.sleep(random.uniform(0.3, 0.8))
-
-            # Submit form
-            logger.info("Attempting to submit login form")
-            try:
-                page.click('form[name="Logon"] button.btn-5[type="submit"]', timeout=10000)
-                logger.info("Clicked submit button")
-            except Exception as e:
-                logger.warning(f"Button click failed: {e}, trying JavaScript submission")
-                page.evaluate('document.querySelector("form[name=Logon]").submit()')
-                logger.info("Submitted form via JavaScript")
-
-            # Wait for redirect
-            page.wait_for_url('https://www.snapav.com/shop/**', timeout=90000)
-            if 'LogonForm' in page.url or 'login' in page.url.lower():
-                raise Exception("Login failed, stayed on login page")
-            logger.info("Login successful, redirected to %s", page.url)
-
-            # Handle "go to homepage" box
-            try:
-                page.wait_for_selector('a[href*="/shop/home"], a[href*="/shop/en/snapav/home"], button:contains("Go to Homepage"), a:contains("Homepage")', timeout=10000)
-                page.click('a[href*="/shop/home"], a[href*="/shop/en/snapav/home"], button:contains("Go to Homepage"), a:contains("Homepage")')
-                logger.info("Clicked 'go to homepage' link/button")
-                time.sleep(random.uniform(0.5, 1.5))
-            except Exception:
-                logger.info("No 'go to homepage' box found, proceeding")
-
-            # Navigate to product-files-videos-search
-            product_files_url = 'https://www.snapav.com/shop/en/snapav/product-files-videos-search'
-            logger.info("Navigating to %s", product_files_url)
-            page.goto(product_files_url, wait_until='networkidle', timeout=90000)
-            time.sleep(random.uniform(0.5, 1.5))
-
-            # Toggle Advanced Search section
-            try:
-                page.wait_for_selector('div#advAccordion', state='visible', timeout=10000)
-                page.click('div#advAccordion')
-                logger.info("Clicked Advanced Search toggle")
-                time.sleep(random.uniform(0.5, 1))
-            except Exception as e:
-                logger.error(f"Advanced Search toggle click failed: {e}")
-
-            # Fill and submit Advanced Search
-            page.wait_for_selector('input#contentSearchTerm', timeout=90000)
-            page.type('input#contentSearchTerm', 'pdf', delay=random.randint(50, 100))
-            logger.info("Typed 'pdf' in Advanced Search input")
-            time.sleep(random.uniform(0.3, 0.8))
-            try:
-                page.click('a#qop-submit', timeout=10000)
-                logger.info("Clicked 'GO' button")
-            except Exception as e:
-                logger.warning(f"GO button click failed: {e}, pressing Enter")
-                page.press('input#contentSearchTerm', 'Enter')
-                logger.info("Pressed Enter in Advanced Search input")
+            if SNAPONE_LOGIN_ONLY:
+                snapone_login(page)
+                session.save(context)
+                context.close()
+                return
+
+            def refresh():
+                snapone_login(page)
+                session.save(context)
+
+            # Log in only when the stored session no longer passes the probe
+            if not session.ensure(refresh):
+                context.add_cookies(session.cookies())
+
+            # Navigate to product-files-videos-search and search for the first shard
+            logger.info("Navigating to %s", PRODUCT_FILES_URL)
+            page.goto(PRODUCT_FILES_URL, wait_until='domcontentloaded', timeout=90000)
+            search_responses = []  # JSON XHRs fired by the search; bodies are read once results show
+
+            def capture(response):
+                if is_json_xhr(response, SNAPONE_SEARCH_API_HINT):
+                    search_responses.append(response)
+
+            if SNAPONE_HARVEST == 'api':
+                page.on('response', capture)
+            submit_search(page, SNAPONE_SHARDS[0])
 
             # Wait for results
             page.wait_for_selector('text=Displaying documents & videos', timeout=300000)
             logger.info("Search results loaded")
 
-            # Scrape all PDFs
+            # Scrape all PDFs; shards overlap, so everything is merged through one dedupe set
             pdf_data = []
             seen_urls = set()
-            current_page = 1
-            while True:
-                # Wait for dynamic content
-                page.wait_for_load_state('networkidle', timeout=90000)
-                page.wait_for_selector('text=Displaying documents & videos', timeout=30000)
-                
-                # Debug: Save page HTML and count all links
-                with open(f'/home/vincent/ixome/scrapy-selenium/control4_scraper/page_{current_page}.html', 'w') as f:
-                    f.write(page.content())
-                all_links = page.query_selector_all('a')
-                pdf_links = [link for link in all_links if link.get_attribute('href') and '.pdf' in link.get_attribute('href')]
-                logger.info(f"Page {current_page}: Found {len(all_links)} total links, {len(pdf_links)} PDF links")
-
-                # Extract PDFs from current page
-                items = page.query_selector_all('div.attachment-description')
-                logger.info(f"Found {len(items)} result items on page {current_page}")
-                for item in items:
-                    a = item.query_selector('a[href*=".pdf"]')
-                    category = item.query_selector('div.attachment-usage')
-                    if a and category:
-                        href = a.get_attribute('href')
-                        full_url = urljoin(product_files_url, href)
-                        if full_url in seen_urls:
-                            logger.info(f"Skipping duplicate URL: {full_url}")
-                            continue
-                        seen_urls.add(full_url)
-                        product_name = a.inner_text().strip() or 'Control4 Product'
-                        category_text = category.inner_text().strip() if category else 'PDF Document'
-                        issue = href.split('/')[-1].replace('.pdf', '')
-                        pdf_data.append({
-                            'url': full_url,
-                            'product': product_name,
-                            'category': category_text,
-                            'issue': issue,
-                            'solution': f"PDF link for parsing: {full_url}",
-                            'depth': 0
-                        })
-                    else:
-                        logger.warning(f"No PDF link or category found in item on page {current_page}: {item.inner_html()[:200]}...")
-                logger.info(f"Extracted {len(pdf_data)} PDFs so far from page {current_page}")
-
-                # Check for next page
-                next_button = page.query_selector('a >> text="Next"')
-                if next_button and next_button.is_visible():
-                    next_button.click()
-                    time.sleep(random.uniform(1, 2))
-                    current_page += 1
+            crawl_state = get_crawl_state()
+            incremental = incremental_enabled()
+            unchanged = 0
+            crawled_at = datetime.now(timezone.utc).isoformat()
+            results = None
+            if SNAPONE_HARVEST == 'api':
+                page.remove_listener('response', capture)
+                results = harvest_api(page, search_responses, SNAPONE_SHARDS)
+            if results is None:
+                results = harvest_dom(context, page, SNAPONE_SHARDS)
+            for href, product_name, category_text in results:
+                full_url = urljoin(PRODUCT_FILES_URL, href)
+                if full_url in seen_urls:
+                    logger.debug(f"Skipping duplicate URL: {full_url}")
+                    continue
+                seen_urls.add(full_url)
+                record = pdf_record(full_url, href, product_name, category_text, crawled_at)
+                if crawl_state.record_item(record) or not incremental:
+                    pdf_data.append(record)
                 else:
-                    logger.info("No 'Next' button found, ending pagination")
-                    break
-
-            # Save to JSON
-            with open('/home/vincent/ixome/scrapy-selenium/control4_scraper/control4_data.json', 'w') as f:
-                json.dump(pdf_data, f, indent=4)
-            logger.info(f"Scraped {len(pdf_data)} PDFs and saved to control4_data.json")
-
-            # Save session
-            context.storage_state(path='cookies.json')
-            logger.info("Storage state saved to cookies.json")
-            logger.info("Scraping complete")
+                    unchanged += 1
+
+            # Save to Parquet or JSON; marked incremental until a full export is complete
+            mark_incremental(SNAPONE_OUTPUT, True)
+            export_records(pdf_data, SNAPONE_OUTPUT)
+            mark_incremental(SNAPONE_OUTPUT, incremental)
+            crawl_state.flush()
+            logger.info(f"Scraped {len(pdf_data)} PDFs ({unchanged} unchanged skipped) and saved to {SNAPONE_OUTPUT}")
+
+            # Save session (cookies roll over while browsing)
+            session.save(context)
+            logger.info(f"Scraping complete; {blocker.aborted} requests blocked")
             context.close()
 
         except Exception as e:
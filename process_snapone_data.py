@@ -1,163 +1,166 @@
-import json
-import psycopg2
-from pinecone import Pinecone, ServerlessSpec
 import os
 from dotenv import load_dotenv
 import logging
-import openai
-import time
+from collections import Counter
+from core.db import get_pool
+from core.embedding_pool import AsyncEmbeddingExecutor
+from core.chunking import chunk_records, chunk_metadata
+from core.vector_store import get_vector_store
+from core.manifest import get_manifest, document_key, document_id, vector_id, CONTENT_FIELDS
+from core.upsert import UpsertWriter
+from core.hydrate import vector_metadata
+from core.schema import migrate, upsert_documents
+from core.record_reader import iter_records
+from core.records import normalize_records
+from core.crawl_state import acknowledge_loaded
+from core.record_writer import is_incremental
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, filename='/home/vincent/ixome/data-1/data_processing.log',
                     format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
 logger = logging.getLogger(__name__)
 
+SNAPONE_DEFAULTS = {'product': 'Control4 Product', 'category': 'PDF Document', 'issue': 'unknown'}
+
 # Load environment variables
 load_dotenv(dotenv_path='/home/vincent/ixome/.env')
 
 def init_postgres():
+    # Borrowed from the shared pool (PG_POOL_MIN/PG_POOL_MAX); hand back with release_postgres()
     try:
-        conn = psycopg2.connect(
-            dbname=os.getenv('PG_DBNAME', 'ixome_db'),
-            user=os.getenv('PG_USER', 'postgres'),
-            password=os.getenv('PG_PASSWORD', 'HwCwTd2120#'),
-            host=os.getenv('PG_HOST', 'localhost'),
-            port=os.getenv('PG_PORT', '5432')
-        )
+        conn = get_pool().acquire()
         logger.info("Connected to PostgreSQL")
         return conn
     except Exception as e:
         logger.error(f"Failed to connect to PostgreSQL: {e}")
         raise
 
+def release_postgres(conn):
+    get_pool().release(conn)
+
 def init_pinecone():
+    # Pinecone by default; VECTOR_STORE=local for the in-process NumPy index
     try:
-        pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
-        index_name = 'troubleshooter-index'
-        if index_name not in pc.list_indexes().names():
-            pc.create_index(
-                name=index_name,
-                dimension=1536,
-                metric='cosine',
-                spec=ServerlessSpec(cloud='aws', region=os.getenv('PINECONE_ENVIRONMENT', 'us-east-1'))
-            )
-            logger.info(f"Created Pinecone index: {index_name}")
-        return pc.Index(index_name)
+        return get_vector_store('troubleshooter-index', dimension=1536, create=True)
     except Exception as e:
-        logger.error(f"Failed to initialize Pinecone: {e}")
+        logger.error(f"Failed to initialize vector store: {e}")
         raise
 
+_embedder = None
+
+def get_embedder():
+    # One client for the whole run; requests run concurrently under the API rate limits
+    global _embedder
+    if _embedder is None:
+        _embedder = AsyncEmbeddingExecutor()
+    return _embedder
+
 def generate_embedding(text):
-    try:
-        client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        response = client.embeddings.create(
-            input=text[:8192],
-            model='text-embedding-ada-002'
-        )
-        logger.info(f"Generated embedding for text '{text[:50]}...'")
-        return response.data[0].embedding
-    except Exception as e:
-        logger.error(f"Failed to generate embedding for text '{text[:50]}...': {e}")
-        return None
+    embedding = get_embedder().embed_query(text)
+    if embedding is None:
+        logger.error(f"Failed to generate embedding for text '{text[:50]}...'")
+    return embedding
 
-def process_snapone_data(json_path='/home/vincent/ixome/scrapy-selenium/control4_scraper/control4_data.json'):
-    # Load JSON data
-    try:
-        with open(json_path, 'r') as f:
-            data = json.load(f)
-        logger.info(f"Loaded {len(data)} records from {json_path}")
-    except Exception as e:
-        logger.error(f"Failed to load JSON: {e}")
-        raise
+def process_snapone_data(json_path=os.getenv('SNAPONE_OUTPUT', '/home/vincent/ixome/scrapy-selenium/control4_scraper/control4_data.json')):
+    # Stream records from the JSON/JSONL dump (optionally gzipped); parsed lazily in the dedupe loop below
+    if not os.path.exists(json_path):
+        logger.error(f"Failed to load JSON: {json_path} not found")
+        raise FileNotFoundError(json_path)
+    # Field defaults and cleanup are applied once, as records are read; read errors abort the run
+    read_errors = []
+    data = normalize_records(iter_records(json_path, columns=CONTENT_FIELDS + ('depth',), on_error=lambda path, message: read_errors.append(message)),
+                             brand='SnapOne', defaults=SNAPONE_DEFAULTS)
 
     # Initialize PostgreSQL
     conn = init_postgres()
     cursor = conn.cursor()
 
-    # Create table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS snapone_pdfs (
-            id SERIAL PRIMARY KEY,
-            url TEXT NOT NULL UNIQUE,
-            product TEXT NOT NULL,
-            category TEXT,
-            issue TEXT,
-            solution TEXT,
-            depth INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
-    conn.commit()
-    logger.info("Ensured snapone_pdfs table exists")
-
-    # Insert data with deduplication
-    inserted = 0
-    seen_urls = set()
+    # Create or upgrade the shared documents schema
+    migrate(conn)
+    logger.info("Ensured documents schema is current")
+
+    # Insert data with deduplication on the canonical URL
+    seen_keys = set()
+    deduped_data = []
+    loaded = 0
     for item in data:
-        url = item.get('url', '')
-        if url in seen_urls:
-            logger.info(f"Skipping duplicate URL: {url}")
+        loaded += 1
+        key = document_key(item)
+        if key in seen_keys:
+            logger.info(f"Skipping duplicate URL: {item.url}")
             continue
-        seen_urls.add(url)
-        try:
-            cursor.execute("""
-                INSERT INTO snapone_pdfs (url, product, category, issue, solution, depth)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (url) DO NOTHING;
-            """, (
-                url,
-                item.get('product', 'Control4 Product'),
-                item.get('category', 'PDF Document'),
-                item.get('issue', 'unknown'),
-                item.get('solution', ''),
-                item.get('depth', 0)
-            ))
-            inserted += 1
-        except Exception as e:
-            logger.error(f"Failed to insert record {url}: {e}")
-    conn.commit()
+        seen_keys.add(key)
+        deduped_data.append(item)
+    logger.info(f"Loaded {loaded} records from {json_path}")
+    # One COPY into a staging table and one merge instead of an INSERT per record
+    try:
+        ids = upsert_documents(conn, deduped_data, 'SnapOne', 'snapone_pdfs')
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Failed to bulk insert records: {e}")
+        raise
+    db_ids = {document_key(item): db_id for item, db_id in zip(deduped_data, ids)}  # documents.id, referenced from vector metadata
+    inserted = len(ids)
     logger.info(f"Inserted {inserted} records into PostgreSQL")
 
     # Generate and upsert embeddings to Pinecone
-    if os.getenv('PINECONE_API_KEY') and os.getenv('OPENAI_API_KEY'):
+    if (os.getenv('PINECONE_API_KEY') or os.getenv('VECTOR_STORE') == 'local') and os.getenv('OPENAI_API_KEY'):
         index = init_pinecone()
-        batch_size = 100
-        upserted = 0
-        deduped_data = [item for item in data if item.get('url', '') not in seen_urls or not seen_urls.add(item.get('url', ''))]
-        logger.info(f"Processing {len(deduped_data)} unique records for Pinecone")
-        for i in range(0, len(deduped_data), batch_size):
-            batch = deduped_data[i:i + batch_size]
+        # Only new or changed records are embedded; vectors of records gone from the scrape are deleted
+        manifest = get_manifest()
+        if read_errors:
+            logger.warning(f"Not pruning snapone_pdfs: {json_path} is partly corrupt ({'; '.join(read_errors)})")
+        plan = manifest.plan('snapone_pdfs', deduped_data, prune=not is_incremental(json_path) and not read_errors)  # Incremental crawls emit only changed items
+        changed = [item for _, _, item in plan.changed]
+        logger.info(f"Processing {len(changed)} new or changed of {len(deduped_data)} unique records for Pinecone")
+        # Long documents become several token-bounded chunks, each embedded as its own vector
+        chunks = chunk_records(
+            changed,
+            text_fn=lambda item: item.solution,
+            header_fn=lambda item: f"{item.product} {item.category} {item.issue}"
+        )
+        chunk_counts = Counter(i for i, _ in chunks)
+        embedded_chunks = set()
+        # Each embedding request carries many chunks; results come back keyed by chunk index and
+        # stream into the writer, which packs them into size-bounded upserts sent in parallel
+        writer = UpsertWriter(index)
+        for embedded in get_embedder().iter_batches([chunk['text'] for _, chunk in chunks]):
             vectors = []
-            for j, item in enumerate(batch):
-                text = f"{item.get('product', '')} {item.get('category', '')} {item.get('issue', '')} {item.get('solution', '')}"
-                embedding = generate_embedding(text)
-                if embedding:
-                    vectors.append((
-                        f"snapone_pdf_{i + j}",
-                        embedding,
-                        {
-                            'url': item.get('url', ''),
-                            'product': item.get('product', ''),
-                            'category': item.get('category', ''),
-                            'issue': item.get('issue', ''),
-                            'solution': item.get('solution', ''),
-                            'brand': 'SnapOne'  # Distinguish from Lutron data
-                        }
-                    ))
-            if vectors:
-                try:
-                    index.upsert(vectors)
-                    upserted += len(vectors)
-                    logger.info(f"Upserted {len(vectors)} embeddings to Pinecone")
-                except Exception as e:
-                    logger.error(f"Failed to upsert batch to Pinecone: {e}")
-            time.sleep(1)  # Avoid rate limits
-        logger.info(f"Total upserted {upserted} embeddings to Pinecone")
+            for c, embedding in embedded:
+                i, chunk = chunks[c]
+                key, item = plan.changed[i][0], changed[i]
+                embedded_chunks.add(c)
+                vectors.append((
+                    vector_id(key, chunk['chunk_index']),  # Stable across runs: canonical URL + chunk index
+                    embedding,
+                    vector_metadata({  # Slim mode keeps only the row reference and filter fields
+                        'url': item.url,
+                        'product': item.product,
+                        'category': item.category,
+                        'issue': item.issue,
+                        'solution': chunk['text'],
+                        'brand': 'SnapOne',  # Distinguish from Lutron data
+                        'db_id': str(db_ids.get(key, '')),
+                        'source': 'documents',
+                        **chunk_metadata(document_id(key), chunk)
+                    })
+                ))
+            writer.add(vectors)
+        writer.close()
+        failed = {i for c, (i, chunk) in enumerate(chunks)
+                  if c not in embedded_chunks or vector_id(plan.changed[i][0], chunk['chunk_index']) in writer.failed_ids}
+        manifest.commit(index, 'snapone_pdfs', plan, chunk_counts, failed)
+        acknowledge_loaded(plan, failed)  # Incremental crawls stop re-emitting what is now loaded
+        index.flush()
+        logger.info(f"Total upserted {writer.upserted} embeddings to Pinecone ({len(plan.unchanged)} unchanged records skipped)")
+        if get_embedder().cache is not None:
+            logger.info(f"Embedding cache: {get_embedder().cache.stats()}")
     else:
         logger.warning("Skipping Pinecone upsert: Missing API keys")
 
     cursor.close()
-    conn.close()
+    release_postgres(conn)
     logger.info("Data processing complete")
 
 if __name__ == "__main__":
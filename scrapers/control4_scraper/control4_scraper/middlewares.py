@@ -3,10 +3,19 @@
 from selenium import webdriver  # Added to fix 'name 'webdriver' is not defined'
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from scrapy import signals
 from scrapy.http import HtmlResponse
+from scrapy.utils.defer import maybe_deferred_to_future
 from scrapy.utils.python import to_bytes
+import os
+import sys
 import time
 import logging
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'lutron_scraper', 'scrapy-selenium')))  # Vendored scrapy_selenium, if not installed
+from scrapy_selenium.pool import DriverPool
 
 logger = logging.getLogger(__name__)
 
@@ -46,20 +55,37 @@ class SeleniumMiddleware(object):
 
         middleware = cls(driver_name, driver_executable_path, browser_executable_path, driver_arguments, driver_headless)
 
-        middleware.driver = webdriver.Chrome(service=Service(executable_path=driver_executable_path), options=Options())
+        def new_driver():
+            options = Options()
+            if crawler.settings.get('SELENIUM_PAGE_LOAD_STRATEGY'):
+                options.page_load_strategy = crawler.settings['SELENIUM_PAGE_LOAD_STRATEGY']
+            return webdriver.Chrome(service=Service(executable_path=driver_executable_path), options=options)
+
+        # Renders run on a pool of drivers in worker threads instead of one driver on the reactor thread
+        middleware.pool = DriverPool(
+            new_driver,
+            crawler.settings.getint('SELENIUM_POOL_SIZE', 1),
+            crawler.settings.getint('SELENIUM_DRIVER_MAX_REQUESTS', 0)
+        )
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
 
         return middleware
 
-    def process_request(self, request, spider):
+    async def process_request(self, request, spider):
         """Process a request using the selenium driver if applicable"""
 
         if not request.meta.get('selenium'):
             return None
 
-        self.driver.get(request.url)
+        return await maybe_deferred_to_future(self.pool.run(lambda driver: self.render(driver, request)))  # Renders in a pool thread
+
+    def render(self, driver, request):
+        """Load the request in a pooled driver and build the response (runs in a pool thread)"""
+
+        driver.get(request.url)
 
         for cookie_name, cookie_value in request.cookies.items():
-            self.driver.add_cookie(
+            driver.add_cookie(
                 {
                     'name': cookie_name,
                     'value': cookie_value
@@ -67,17 +93,17 @@ class SeleniumMiddleware(object):
             )
 
         if request.meta.get('wait_time'):
-            time.sleep(request.meta['wait_time'])
+            time.sleep(request.meta['wait_time'])  # Only blocks this pool thread
 
         if request.meta.get('wait_for'):
-            WebDriverWait(self.driver, 10).until(
+            WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, request.meta['wait_for']))
             )
 
-        body = to_bytes(self.driver.page_source)  # body must be of type bytes
-        return HtmlResponse(self.driver.current_url, body=body, encoding='utf-8', request=request)
+        body = to_bytes(driver.page_source)  # body must be of type bytes
+        return HtmlResponse(driver.current_url, body=body, encoding='utf-8', request=request)
 
     def spider_closed(self):
-        """Shutdown the driver when spider is closed"""
+        """Shutdown the drivers when spider is closed"""
 
-        self.driver.quit()
\ No newline at end of file
+        self.pool.close()
\ No newline at end of file
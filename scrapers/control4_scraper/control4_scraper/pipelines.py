@@ -1,10 +1,16 @@
+import os
+import sys
 from itemadapter import ItemAdapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))  # Root path for core/
+from core.records import normalize_record
 
 class Control4ScraperPipeline:
     def process_item(self, item, spider):
         adapter = ItemAdapter(item)
-        # Example cleaning: Strip whitespace from fields
-        for field in adapter.keys():
-            if adapter[field]:
-                adapter[field] = adapter[field].strip()
-        return item
\ No newline at end of file
+        # Shared normalization (core.records): strips strings and coerces depth to int
+        record = normalize_record(adapter)
+        if record is not None:
+            for field in adapter.keys():
+                if field in record:
+                    adapter[field] = record[field]
+        return item
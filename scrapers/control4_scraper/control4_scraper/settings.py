@@ -1,4 +1,10 @@
 # /home/vincent/ixome/scrapy-selenium/control4_scraper/control4_scraper/settings.py
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))  # Root path for core/
+from core.resource_blocking import abort_request
+from core.browser_service import service_url
+
 BOT_NAME = 'control4_scraper'
 
 SPIDER_MODULES = ['control4_scraper.spiders']
@@ -13,12 +19,14 @@ DEPTH_LIMIT = 5
 CONCURRENT_REQUESTS = 16
 
 ITEM_PIPELINES = {
+    'core.crawl_state.CrawlStatePipeline': 200,  # Drops unchanged items with CRAWL_INCREMENTAL=1
     'control4_scraper.pipelines.Control4ScraperPipeline': 300,
 }
 
 DOWNLOADER_MIDDLEWARES = {
     'scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler': 1000,
     'scrapy.downloadermiddlewares.retry.RetryMiddleware': 500,
+    'core.crawl_state.CrawlStateMiddleware': 560,  # Conditional requests; skips unchanged pages with CRAWL_INCREMENTAL=1
     'scrapy.downloadermiddlewares.httpcompression.HttpCompressionMiddleware': 810,
 }
 
@@ -34,12 +42,28 @@ PLAYWRIGHT_CONTEXT_ARGS = {
     'bypass_csp': True
 }
 
+# Playwright requests with meta['render_check'] try plain HTTP first (core.render_router)
 DOWNLOAD_HANDLERS = {
-    'http': 'scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler',
-    'https': 'scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler',
+    'http': 'core.render_router.RenderRouterHandler',
+    'https': 'core.render_router.RenderRouterHandler',
 }
+RENDER_ROUTER_STATE = 'render_routes.json'  # Per-URL-pattern plain/browser decisions, kept across crawls
 
 TWISTED_REACTOR = 'twisted.internet.asyncioreactor.AsyncioSelectorReactor'
 
 LOG_LEVEL = 'DEBUG'  # Increased to DEBUG for more detail
-LOG_FILE = '/home/vincent/ixome/scrapy-selenium/control4_scraper/control4_scraper/scrapy.log'  # Absolute path
\ No newline at end of file
+LOG_FILE = '/home/vincent/ixome/scrapy-selenium/control4_scraper/control4_scraper/scrapy.log'  # Absolute path
+
+# Columnar feed export (-o items.parquet); the exporter lives in the repo's core/ package
+FEED_EXPORTERS = {'parquet': 'core.columnar.ParquetItemExporter'}
+
+# Abort images, media, fonts and tracker requests in Playwright pages (PLAYWRIGHT_BLOCKING=off to disable)
+PLAYWRIGHT_ABORT_REQUEST = abort_request()
+# Attach to a warm shared browser (core.browser_service) and recycle contexts
+PLAYWRIGHT_CDP_URL = service_url()  # Attach to the warm browser of scripts/browser_service.py when it's up; None launches one
+PLAYWRIGHT_CONTEXTS = {'default': {}} if PLAYWRIGHT_CDP_URL else {}  # Pre-warm the default context at engine start
+PLAYWRIGHT_RECYCLE_PAGES = 200  # Fresh context after this many pages (core.browser_pool), capping memory growth
+# Selenium renders (SeleniumMiddleware) run on a pool of drivers in worker threads (scrapy_selenium.pool)
+SELENIUM_POOL_SIZE = int(os.getenv('SELENIUM_POOL_SIZE', 4))
+SELENIUM_DRIVER_MAX_REQUESTS = int(os.getenv('SELENIUM_DRIVER_MAX_REQUESTS', 100))  # Browsers leak memory over long sessions; 0 never recycles
+SELENIUM_PAGE_LOAD_STRATEGY = os.getenv('SELENIUM_PAGE_LOAD_STRATEGY', 'eager')  # DOMContentLoaded, not every image/iframe
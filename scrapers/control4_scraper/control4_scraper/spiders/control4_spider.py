@@ -1,10 +1,29 @@
 # /home/vincent/ixome/scrapy-selenium/control4_scraper/control4_scraper/spiders/control4_spider.py
+import os
+import sys
+import subprocess
 import scrapy
 from scrapy_playwright.page import PageMethod
 import logging
 from urllib.parse import urljoin
-from scrapy.exceptions import NotSupported
+from scrapy.exceptions import NotSupported, IgnoreRequest
 from scrapy.http import HtmlResponse
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.threads import deferToThread
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))  # Root path for core/
+from core.page_wait import settle_page_method
+from core.sharding import shard_list
+from core.session import SessionManager
+
+PUBLIC_PDF_SELECTOR = 'a[href$=".pdf"], embed[type="application/pdf"]'
+DEALER_URL = 'https://www.snapav.com/shop/en/snapav/product-files-videos-search'
+DEALER_PDF_SELECTOR = 'div[id*="searchResults"] a[href*=".pdf"], ul[class*="results"] a[href*=".pdf"], li[class*="result"] a[href*=".pdf"], embed[type="application/pdf"]'
+SNAPONE_SESSION = os.getenv('SNAPONE_SESSION', '/home/vincent/ixome/scrapy-selenium/control4_scraper/cookies.json')  # Same state login_snapone.py maintains
+SNAPONE_PROBE_URL = os.getenv('SNAPONE_PROBE_URL', 'https://www.snapav.com/wcs/resources/store/10151/person/@self')
+LOGIN_SCRIPT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'login_snapone.py'))
+DEALER_CONTEXT_KWARGS = {'storage_state': SNAPONE_SESSION, 'ignoreHTTPSErrors': True}
+SNAPONE_SHARDS = shard_list(os.getenv('SNAPONE_SHARDS', 'pdf'))  # One dealer search per term/category, each in its own tab
+SNAPONE_MAX_PER_HOST = int(os.getenv('SNAPONE_MAX_PER_HOST', 8))
 
 logger = logging.getLogger(__name__)
 
@@ -12,11 +31,10 @@ class Control4Spider(scrapy.Spider):
     name = 'control4'
     custom_settings = {
         'PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT': 120000,
-        'ITEM_PIPELINES': {'control4_scraper.pipelines.Control4ScraperPipeline': 300},
-        'DOWNLOAD_HANDLERS': {
-            'http': 'scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler',
-            'https': 'scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler',
-        },
+        # Dealer shards run as parallel pages of the persistent context, capped per host
+        'CONCURRENT_REQUESTS_PER_DOMAIN': SNAPONE_MAX_PER_HOST,
+        'PLAYWRIGHT_MAX_PAGES_PER_CONTEXT': SNAPONE_MAX_PER_HOST,
+        'ITEM_PIPELINES': {'core.crawl_state.CrawlStatePipeline': 200, 'control4_scraper.pipelines.Control4ScraperPipeline': 300},
         'TWISTED_REACTOR': 'twisted.internet.asyncioreactor.AsyncioSelectorReactor',
         'PLAYWRIGHT_BROWSER_TYPE': 'chromium',
         'RETRY_TIMES': 5,
@@ -69,87 +87,113 @@ class Control4Spider(scrapy.Spider):
         'https://docs.control4.com/docs/product/beta-test/agreement/english/latest/'
     ]
 
-    def start_requests(self):
-        # Dealer page request (authenticated)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seen_urls = set()  # Shared by all dealer shards; their results overlap
+        self.session = SessionManager(SNAPONE_SESSION, SNAPONE_PROBE_URL, ('WC_AUTHENTICATION_',))
+
+    def refresh_session(self):
+        # Only runs when the stored session failed its probe; the script logs in and writes SNAPONE_SESSION
+        subprocess.run([sys.executable, LOGIN_SCRIPT], env=dict(os.environ, SNAPONE_LOGIN_ONLY='1'), check=True, timeout=600)
+
+    def ensure_session(self):
         try:
-            logger.info("Initiating dealer request for %s", 'https://www.snapav.com/shop/en/snapav/product-files-videos-search')
-            yield scrapy.Request(
-                url='https://www.snapav.com/shop/en/snapav/product-files-videos-search',
-                meta={
-                    'playwright': True,
-                    'playwright_context': 'persistent',
-                    'playwright_context_kwargs': {
-                        'storage_state': '/home/vincent/ixome/scrapy-selenium/control4_scraper/cookies.json',
-                        'ignoreHTTPSErrors': True,
-                    },
-                    'playwright_page_methods': [
-                        PageMethod('wait_for_load_state', 'networkidle', timeout=120000),
-                        PageMethod('wait_for_selector', 'text=Displaying documents & videos', state='visible', timeout=300000),
-                        PageMethod('wait_for_selector', 'div#advAccordion', state='visible', timeout=15000),
-                        PageMethod('click', 'div#advAccordion', force=True),
-                        PageMethod('wait_for_timeout', 2000),
-                        PageMethod('evaluate', '''() => {
-                            const input = document.querySelector('input#contentSearchTerm');
-                            if (input) {
-                                input.style.display = 'block';
-                                input.style.visibility = 'visible';
-                                const parent = input.closest('div, section');
-                                if (parent) {
-                                    parent.style.display = 'block';
-                                    parent.style.visibility = 'visible';
-                                }
+            self.session.ensure(self.refresh_session)
+            return True
+        except Exception as e:
+            logger.error("No valid SnapOne session, skipping dealer pages: %s", e)
+            return False
+
+    def dealer_request(self, term):
+        logger.info("Initiating dealer request for %s (search '%s')", DEALER_URL, term)
+        return scrapy.Request(
+            url=DEALER_URL,
+            meta={
+                'playwright': True,
+                'playwright_context': 'persistent',
+                'playwright_context_kwargs': DEALER_CONTEXT_KWARGS,
+                'shard': term,
+                'crawl_state': False,  # Every shard shares DEALER_URL; results depend on the typed search
+                'playwright_page_methods': [
+                    PageMethod('wait_for_load_state', 'networkidle', timeout=120000),
+                    PageMethod('wait_for_selector', 'text=Displaying documents & videos', state='visible', timeout=300000),
+                    PageMethod('wait_for_selector', 'div#advAccordion', state='visible', timeout=15000),
+                    PageMethod('click', 'div#advAccordion', force=True),
+                    settle_page_method(quiet_ms=300, timeout_ms=5000),  # Accordion animation
+                    PageMethod('evaluate', '''() => {
+                        const input = document.querySelector('input#contentSearchTerm');
+                        if (input) {
+                            input.style.display = 'block';
+                            input.style.visibility = 'visible';
+                            const parent = input.closest('div, section');
+                            if (parent) {
+                                parent.style.display = 'block';
+                                parent.style.visibility = 'visible';
                             }
-                        }'''),
-                        PageMethod('wait_for_selector', 'input#contentSearchTerm', state='visible', timeout=90000),
-                        PageMethod('type', 'input#contentSearchTerm', value='pdf', delay=100),
-                        PageMethod('evaluate', '''() => {
-                            const input = document.querySelector('input#contentSearchTerm');
-                            if (input) {
-                                input.dispatchEvent(new Event("input"));
-                                if (typeof ContentSearch !== 'undefined' && ContentSearch.checkChange) {
-                                    ContentSearch.checkChange({ target: input });
-                                }
+                        }
+                    }'''),
+                    PageMethod('wait_for_selector', 'input#contentSearchTerm', state='visible', timeout=90000),
+                    PageMethod('type', 'input#contentSearchTerm', value=term, delay=100),
+                    PageMethod('evaluate', '''() => {
+                        const input = document.querySelector('input#contentSearchTerm');
+                        if (input) {
+                            input.dispatchEvent(new Event("input"));
+                            if (typeof ContentSearch !== 'undefined' && ContentSearch.checkChange) {
+                                ContentSearch.checkChange({ target: input });
                             }
-                        }'''),
-                        PageMethod('click', 'a#qop-submit', force=True),
-                        PageMethod('wait_for_selector', 'text=Displaying documents & videos', state='visible', timeout=30000),
-                        PageMethod('wait_for_selector', 'div[id*="searchResults"] a[href*=".pdf"], ul[class*="results"] a[href*=".pdf"], li[class*="result"] a[href*=".pdf"], embed[type="application/pdf"]', state='visible', timeout=300000)
-                    ]
-                },
-                callback=self.parse_dealer,
-                dont_filter=True,
-                errback=self.handle_error
-            )
-        except Exception as e:
-            logger.error("Failed to initiate dealer request: %s, Traceback: %s", e, str(e))
+                        }
+                    }'''),
+                    PageMethod('click', 'a#qop-submit', force=True),
+                    PageMethod('wait_for_selector', 'text=Displaying documents & videos', state='visible', timeout=30000),
+                    PageMethod('wait_for_selector', DEALER_PDF_SELECTOR, state='visible', timeout=300000)
+                ]
+            },
+            callback=self.parse_dealer,
+            dont_filter=True,
+            errback=self.handle_error
+        )
 
-        # Public URLs
+    async def start(self):
+        # Public URLs first: they crawl while the session is checked
         for url in self.start_urls[1:]:  # Skip dealer URL to avoid duplication
             logger.info("Initiating public request for %s", url)
             yield scrapy.Request(
                 url=url,
                 meta={'playwright': True, 'playwright_page_methods': [
-                    PageMethod('wait_for_load_state', 'networkidle', timeout=120000),
-                    PageMethod('wait_for_function', 'document.querySelector("a[href$=\'.pdf\']") !== null', timeout=120000)
-                ]},
+                    settle_page_method(selector='a[href$=".pdf"]', timeout_ms=60000),  # Pages without PDFs stop at the cap instead of erroring
+                ], 'render_check': PUBLIC_PDF_SELECTOR,  # Static pages that already link their PDFs skip the browser
+                    'crawl_state_skip': True},  # Leaf doc page: not parsed again while unchanged (CRAWL_INCREMENTAL=1)
                 callback=self.parse_public,
                 errback=self.handle_error
             )
 
+        # Dealer page requests (authenticated), one per search shard; scheduled concurrently.
+        # The probe, the session lock and a possible login block, so they run in a thread, off the reactor
+        if await maybe_deferred_to_future(deferToThread(self.ensure_session)):
+            for term in SNAPONE_SHARDS:
+                try:
+                    yield self.dealer_request(term)
+                except Exception as e:
+                    logger.error("Failed to initiate dealer request: %s, Traceback: %s", e, str(e))
+
     def parse_dealer(self, response):
         logger.info("Parsing dealer page: %s, status: %s, content snippet: %s", response.url, response.status, response.text[:500] if hasattr(response, 'text') else "No text content")
         if 'LogonForm' in response.url or response.status in [401, 403]:
             logger.error("Authentication failed, redirected to login or access denied for %s", response.url)
+            self.session.invalidate()  # Next run probes again and logs in if needed
             return
         if isinstance(response, NotSupported):
             logger.warning("Skipping non-text response for %s, attempting to extract HTML", response.url)
             response = HtmlResponse(url=response.url, body=response.body, encoding='utf-8')
         items_found = False
-        for item in response.css('div[id*="searchResults"] a[href*=".pdf"], ul[class*="results"] a[href*=".pdf"], li[class*="result"] a[href*=".pdf"], embed[type="application/pdf"]'):
+        for item in response.css(DEALER_PDF_SELECTOR):
             href = item.attrib.get('href') or item.attrib.get('src')
             if href and (href.endswith('.pdf') or 'video' in href.lower()):
                 items_found = True
                 full_url = urljoin(response.url, href)
+                if full_url in self.seen_urls:
+                    continue
+                self.seen_urls.add(full_url)
                 sku = item.css('::attr(data-sku), .sku::text').get(default='unknown').strip()
                 yield {
                     'url': full_url,
@@ -163,10 +207,10 @@ class Control4Spider(scrapy.Spider):
             logger.warning("No items found on dealer page: %s, content: %s", response.url, response.text[:500] if hasattr(response, 'text') else "No text content")
         next_page = response.css('a.next-page, .pagination .next, a:where(:text("Next"))').attrib.get('href')
         if next_page:
-            logger.info("Found next page: %s", next_page)
+            logger.info("Found next page: %s (search '%s')", next_page, response.meta.get('shard'))
             yield scrapy.Request(
                 url=urljoin(response.url, next_page),
-                meta={'playwright': True, 'playwright_context': 'persistent', 'playwright_context_kwargs': {'storage_state': '/home/vincent/ixome/scrapy-selenium/control4_scraper/cookies.json', 'ignoreHTTPSErrors': True}},
+                meta={'playwright': True, 'playwright_context': 'persistent', 'playwright_context_kwargs': DEALER_CONTEXT_KWARGS, 'shard': response.meta.get('shard'), 'crawl_state': False},
                 callback=self.parse_dealer,
                 dont_filter=True,
                 errback=self.handle_error
@@ -178,7 +222,7 @@ class Control4Spider(scrapy.Spider):
             logger.warning("Skipping non-text response for %s, attempting to extract HTML", response.url)
             response = HtmlResponse(url=response.url, body=response.body, encoding='utf-8')
         items_found = False
-        for pdf in response.css('a[href$=".pdf"], embed[type="application/pdf"]'):
+        for pdf in response.css(PUBLIC_PDF_SELECTOR):
             items_found = True
             href = pdf.attrib.get('href') or pdf.attrib.get('src')
             full_url = urljoin(response.url, href)
@@ -195,4 +239,7 @@ class Control4Spider(scrapy.Spider):
             logger.warning("No PDFs found on public page: %s", response.url)
 
     def handle_error(self, failure):
+        if failure.check(IgnoreRequest):
+            logger.debug("Skipped %s: %s", failure.request.url, failure.value)  # Unchanged since last crawl
+            return
         logger.error("Request failed: %s, Error: %s, Traceback: %s", failure.request.url, failure.value, failure.getTraceback())
\ No newline at end of file
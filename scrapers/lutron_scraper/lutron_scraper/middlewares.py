@@ -1,20 +1,27 @@
 from importlib import import_module
 import logging
+import os
+import sys
 from os.path import exists
 
 from scrapy import signals
 from scrapy.http import HtmlResponse
+from scrapy.utils.defer import maybe_deferred_to_future
 from scrapy.utils.misc import load_object
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver import DesiredCapabilities
 from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'scrapy-selenium')))  # Vendored scrapy_selenium, if not installed
+from scrapy_selenium import SeleniumRequest
+from scrapy_selenium.pool import DriverPool
 
 class SeleniumMiddleware:
     """Scrapy middleware to handle JavaScript pages using Selenium"""
 
     def __init__(self, driver_name, driver_executable_path, driver_arguments,
-                 browser_executable_path, command_executor, wait_time=0):
+                 browser_executable_path, command_executor, wait_time=0,
+                 pool_size=1, max_requests=0, page_load_strategy=None):
         """Initialize the selenium webdriver
 
         Parameters
@@ -31,6 +38,12 @@ class SeleniumMiddleware:
             The Selenium remote server endpoint
         wait_time: int
             The default wait time for Selenium to wait for elements
+        pool_size: int
+            The number of drivers rendering in parallel (scrapy_selenium.pool)
+        max_requests: int
+            The number of requests after which a driver is replaced (0 for never)
+        page_load_strategy: str
+            The WebDriver page load strategy ('eager' returns at DOMContentLoaded)
         """
         self.logger = logging.getLogger(__name__)
 
@@ -47,22 +60,20 @@ class SeleniumMiddleware:
             driver_options.binary_location = browser_executable_path
         for argument in driver_arguments:
             driver_options.add_argument(argument)
-
-        driver_kwargs = {}
-        if command_executor:
-            driver_kwargs = {
-                'command_executor': command_executor,
-                'desired_capabilities': getattr(DesiredCapabilities, driver_name.upper()),
-                'options': driver_options
-            }
-        else:
-            driver_kwargs = {
-                'service': Service(driver_executable_path),
-                'options': driver_options
-            }
+        if page_load_strategy:
+            driver_options.page_load_strategy = page_load_strategy
+
+        def new_driver():
+            if command_executor:
+                return driver_klass(
+                    command_executor=command_executor,
+                    desired_capabilities=getattr(DesiredCapabilities, driver_name.upper()),
+                    options=driver_options
+                )
+            return driver_klass(service=Service(driver_executable_path), options=driver_options)  # One Service per driver process
 
         self.wait_time = wait_time
-        self.driver = driver_klass(**driver_kwargs)
+        self.pool = DriverPool(new_driver, pool_size, max_requests)
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -73,6 +84,9 @@ class SeleniumMiddleware:
         command_executor = crawler.settings.get('SELENIUM_COMMAND_EXECUTOR')
         driver_arguments = crawler.settings.get('SELENIUM_DRIVER_ARGUMENTS')
         wait_time = crawler.settings.get('SELENIUM_DEFAULT_WAIT_TIME', 0)
+        pool_size = crawler.settings.getint('SELENIUM_POOL_SIZE', 1)
+        max_requests = crawler.settings.getint('SELENIUM_DRIVER_MAX_REQUESTS', 0)
+        page_load_strategy = crawler.settings.get('SELENIUM_PAGE_LOAD_STRATEGY')
 
         if driver_name is None:
             raise ValueError('You must specify SELENIUM_DRIVER_NAME in settings.py')
@@ -85,52 +99,59 @@ class SeleniumMiddleware:
             driver_arguments=driver_arguments,
             browser_executable_path=browser_executable_path,
             command_executor=command_executor,
-            wait_time=wait_time
+            wait_time=wait_time,
+            pool_size=pool_size,
+            max_requests=max_requests,
+            page_load_strategy=page_load_strategy
         )
 
         crawler.signals.connect(middleware.spider_closed, signals.spider_closed)
 
         return middleware
 
-    def process_request(self, request, spider):
-        """Process a request using the selenium driver if the request is a SeleniumRequest"""
+    async def process_request(self, request, spider):
+        """Process a request using a pooled selenium driver if the request is a SeleniumRequest
+
+        The rendering runs in the pool's threads; the reactor keeps scheduling while it is awaited.
+        """
         if not isinstance(request, SeleniumRequest):
             return None
 
-        self.driver.get(request.url)
+        return await maybe_deferred_to_future(self.pool.run(lambda driver: self.render(driver, request)))
+
+    def render(self, driver, request):
+        """Load the request in driver and build the response (runs in a pool thread)"""
+        driver.get(request.url)
 
         for cookie_name, cookie_value in request.cookies.items():
-            self.driver.add_cookie({
+            driver.add_cookie({
                 'name': cookie_name,
                 'value': cookie_value
             })
 
         if request.wait_until:
             try:
-                WebDriverWait(self.driver, request.wait_time or self.wait_time).until(
+                WebDriverWait(driver, request.wait_time or self.wait_time).until(
                     request.wait_until
                 )
             except TimeoutException:
                 pass
 
         if request.screenshot:
-            request.meta['screenshot'] = self.driver.get_screenshot_as_png()
+            request.meta['screenshot'] = driver.get_screenshot_as_png()
 
         if request.script:
-            self.driver.execute_script(request.script)
-
-        body = str.encode(self.driver.page_source)
+            driver.execute_script(request.script)
 
-        # Expose the driver via the "meta" attribute
-        request.meta.update({'driver': self.driver})
+        body = str.encode(driver.page_source)
 
         return HtmlResponse(
-            self.driver.current_url,
+            driver.current_url,
             body=body,
             encoding='utf-8',
             request=request
         )
 
     def spider_closed(self):
-        """Shutdown the driver when spider is closed"""
-        self.driver.quit()
\ No newline at end of file
+        """Shutdown the drivers when spider is closed"""
+        self.pool.close()
\ No newline at end of file
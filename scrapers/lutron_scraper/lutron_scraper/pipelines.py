@@ -1,30 +1,45 @@
-import json
+import os
+import sys
 from itemadapter import ItemAdapter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))  # Root path for core/
+from core.records import normalize_record
+from core.record_writer import RecordWriter, mark_incremental
+from core.crawl_state import incremental_enabled
 
 class LutronScraperPipeline:
-    def __init__(self):
-        self.file = open('lutron_data.json', 'w', encoding='utf-8')
-        self.discarded_file = open('discarded_items.json', 'w', encoding='utf-8')
-        self.items = []
+    def __init__(self, max_bytes=0, flush_bytes=1 << 20, flush_seconds=5.0, compress=False, incremental=False):
+        # Valid and discarded items share one buffered, rotating writer setup; nothing is kept in memory
+        options = dict(max_bytes=max_bytes, flush_bytes=flush_bytes, flush_seconds=flush_seconds, compress=compress)
+        self.writer = RecordWriter('lutron_data.json', **options)
+        self.discarded_writer = RecordWriter('discarded_items.json', **options)
+        self.incremental = incremental
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            max_bytes=settings.getint('RECORD_ROTATE_BYTES', 0),
+            flush_bytes=settings.getint('RECORD_FLUSH_BYTES', 1 << 20),
+            flush_seconds=settings.getfloat('RECORD_FLUSH_SECONDS', 5.0),
+            compress=settings.getbool('RECORD_COMPRESS', False),
+            incremental=settings.getbool('CRAWL_INCREMENTAL', incremental_enabled()),
+        )
+
+    def open_spider(self, spider):
+        # Loaders don't prune against incremental output; a crawl that never finishes keeps the mark too
+        mark_incremental(self.writer.path, True)
 
     def process_item(self, item, spider):
         adapter = ItemAdapter(item)
-        cleaned_item = {
-            'issue': adapter.get('issue', '').strip(),
-            'solution': adapter.get('solution', '').strip(),
-            'product': adapter.get('product', '').strip(),
-            'category': adapter.get('category', '').strip(),
-            'url': adapter.get('url', '').strip()
-        }
-        if cleaned_item['issue'] or cleaned_item['solution'] or cleaned_item['product']:
-            self.items.append(cleaned_item)
-            json.dump(cleaned_item, self.file, ensure_ascii=False)
-            self.file.write('\n')
+        # Same normalization as the loaders: strip, alias title/description, require issue, solution or product
+        record = normalize_record(adapter, brand='Lutron')
+        if record is not None:
+            self.writer.write(record)
         else:
-            json.dump(cleaned_item, self.discarded_file, ensure_ascii=False)
-            self.discarded_file.write('\n')
+            self.discarded_writer.write(adapter.asdict())
         return item
 
     def close_spider(self, spider):
-        self.file.close()
-        self.discarded_file.close()
\ No newline at end of file
+        self.writer.close()
+        self.discarded_writer.close()
+        mark_incremental(self.writer.path, self.incremental)
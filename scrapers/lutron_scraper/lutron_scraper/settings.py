@@ -1,3 +1,9 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))  # Root path for core/
+from core.resource_blocking import abort_request
+from core.browser_service import service_url
+
 BOT_NAME = "lutron_scraper"
 
 SPIDER_MODULES = ["lutron_scraper.spiders"]
@@ -13,24 +19,50 @@ RETRY_TIMES = 3
 DOWNLOAD_TIMEOUT = 120
 
 ITEM_PIPELINES = {
+    'core.crawl_state.CrawlStatePipeline': 200,  # Drops unchanged items with CRAWL_INCREMENTAL=1
     'lutron_scraper.pipelines.LutronScraperPipeline': 300,
 }
 
+DOWNLOADER_MIDDLEWARES = {
+    'core.crawl_state.CrawlStateMiddleware': 560,  # Conditional requests; skips unchanged pages with CRAWL_INCREMENTAL=1
+}
+
 FEED_FORMAT = 'jsonlines'
 FEED_EXPORT_ENCODING = "utf-8"
 
+# LutronScraperPipeline output: buffered JSONL, flushed every 1 MB or 5 s and rotated every RECORD_ROTATE_BYTES
+# (0 = one file) as lutron_data.00000.json, lutron_data.00001.json, ... (.gz with RECORD_COMPRESS)
+RECORD_ROTATE_BYTES = 256 << 20
+RECORD_FLUSH_BYTES = 1 << 20
+RECORD_FLUSH_SECONDS = 5.0
+RECORD_COMPRESS = False
+
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 DUPEFILTER_CLASS = 'scrapy.dupefilters.RFPDupeFilter'
 
 # Playwright
 PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT = 120000
 DOWNLOAD_HANDLERS = {
-    'http': 'scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler',
-    'https': 'scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler',
+    'http': 'core.browser_pool.ContextRecyclingHandler',
+    'https': 'core.browser_pool.ContextRecyclingHandler',
 }
 PLAYWRIGHT_BROWSER_TYPE = 'chromium'
 PLAYWRIGHT_LAUNCH_OPTIONS = {
     'headless': False,
     'args': ['--disable-blink-features=AutomationControlled', '--no-sandbox', '--disable-web-security', '--ignore-certificate-errors'],
 }
-DOWNLOAD_FAIL_ON_DATALOSS = False
\ No newline at end of file
+DOWNLOAD_FAIL_ON_DATALOSS = False
+
+# Columnar feed export (-o items.parquet); the exporter lives in the repo's core/ package
+FEED_EXPORTERS = {'parquet': 'core.columnar.ParquetItemExporter'}
+
+# Abort images, media, fonts and tracker requests in Playwright pages (PLAYWRIGHT_BLOCKING=off to disable)
+PLAYWRIGHT_ABORT_REQUEST = abort_request()
+# Attach to a warm shared browser (core.browser_service) and recycle contexts
+PLAYWRIGHT_CDP_URL = service_url()  # Attach to the warm browser of scripts/browser_service.py when it's up; None launches one
+PLAYWRIGHT_CONTEXTS = {'default': {}} if PLAYWRIGHT_CDP_URL else {}  # Pre-warm the default context at engine start
+PLAYWRIGHT_RECYCLE_PAGES = 200  # Fresh context after this many pages (core.browser_pool), capping memory growth
+# Selenium renders (SeleniumMiddleware) run on a pool of drivers in worker threads (scrapy_selenium.pool)
+SELENIUM_POOL_SIZE = int(os.getenv('SELENIUM_POOL_SIZE', 4))
+SELENIUM_DRIVER_MAX_REQUESTS = int(os.getenv('SELENIUM_DRIVER_MAX_REQUESTS', 100))  # Browsers leak memory over long sessions; 0 never recycles
+SELENIUM_PAGE_LOAD_STRATEGY = os.getenv('SELENIUM_PAGE_LOAD_STRATEGY', 'eager')  # DOMContentLoaded, not every image/iframe
@@ -1,15 +1,26 @@
+import os
+import sys
 import scrapy
 from scrapy_playwright.page import PageMethod
 from lutron_scraper.items import LutronScraperItem
 import logging
 from urllib.parse import urljoin
-from scrapy.exceptions import NotSupported
+from scrapy.exceptions import NotSupported, IgnoreRequest
 from scrapy.http import HtmlResponse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))  # Root path for core/
+from core.resource_blocking import abort_request, BLOCK_RESOURCE_TYPES
+from core.page_wait import settle_page_method
+
+RESULT_LINKS = 'a[href*="/article"], a[href*="/product"], a[href*="homeworks"]'
 
 logger = logging.getLogger(__name__)
 
 class LutronHomeworksSpider(scrapy.Spider):
     name = 'lutron_homeworks'
+    custom_settings = {
+        # Results are parsed from the HTML alone, so stylesheets go too
+        'PLAYWRIGHT_ABORT_REQUEST': abort_request(block_types=BLOCK_RESOURCE_TYPES + ('stylesheet',)),
+    }
     start_urls = ['https://support.lutron.com/us/en/search?q=homeworks&scope=all']
 
     async def start_requests(self):
@@ -18,18 +29,14 @@ class LutronHomeworksSpider(scrapy.Spider):
                 url=url,
                 meta={
                     'playwright': True,
+                    'crawl_state': False,  # Search listing: always parsed so pagination is followed; items dedupe in CrawlStatePipeline
                     'playwright_page_methods': [
-                        PageMethod('wait_for_load_state', 'networkidle', timeout=120000),
                         PageMethod('evaluate', '''() => {
                             const acceptBtn = document.querySelector('#onetrust-accept-btn-handler, button[onclick*="accept"]');
                             if (acceptBtn) acceptBtn.click();
-                            // Scroll 5 times for full dynamic load
-                            for (let i = 0; i < 5; i++) {
-                                window.scrollTo(0, document.body.scrollHeight);
-                                return new Promise(resolve => setTimeout(resolve, 3000));
-                            }
                         }'''),
-                        PageMethod('wait_for_timeout', 20000),  # 20s extra for JS
+                        # Scroll and settle until the result list stops growing, instead of fixed 3 s + 20 s waits
+                        settle_page_method(selector=RESULT_LINKS, scroll=True, timeout_ms=60000),
                     ]
                 },
                 callback=self.parse_search,
@@ -67,18 +74,14 @@ class LutronHomeworksSpider(scrapy.Spider):
         if next_page:
             yield scrapy.Request(
                 url=urljoin(response.url, next_page),
-                meta={'playwright': True, 'playwright_page_methods': [
-                    PageMethod('wait_for_load_state', 'networkidle', timeout=60000),
-                    PageMethod('evaluate', '''() => {
-                        for (let i = 0; i < 5; i++) {
-                            window.scrollTo(0, document.body.scrollHeight);
-                            return new Promise(resolve => setTimeout(resolve, 3000));
-                        }
-                    }'''),
-                    PageMethod('wait_for_timeout', 15000),
+                meta={'playwright': True, 'crawl_state': False, 'playwright_page_methods': [
+                    settle_page_method(selector=RESULT_LINKS, scroll=True, timeout_ms=60000),
                 ]},
                 callback=self.parse_search
             )
 
     def handle_error(self, failure):
+        if failure.check(IgnoreRequest):
+            logger.debug(f"Skipped {failure.request.url}: {failure.value}")
+            return
         logger.error(f"Failed {failure.request.url}: {failure.value}")
\ No newline at end of file
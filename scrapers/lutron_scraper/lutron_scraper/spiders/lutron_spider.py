@@ -1,10 +1,18 @@
 # /home/vincent/ixome/ixome-data/scrapers/lutron_scraper/lutron_scraper/spiders/lutron_homeworks_spider.py
+import os
+import sys
 import scrapy
 from scrapy_playwright.page import PageMethod
 import logging
 from urllib.parse import urljoin
-from scrapy.exceptions import NotSupported
+from scrapy.exceptions import NotSupported, IgnoreRequest
 from scrapy.http import HtmlResponse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..')))  # Root path for core/
+from core.resource_blocking import abort_request, BLOCK_RESOURCE_TYPES
+from core.page_wait import settle_page_method
+
+RESULT_SELECTOR = '.coh-search-result, div.search-result, article.result, li.result-item'
+ACCEPT_COOKIES_JS = '() => { const btn = document.querySelector("#onetrust-accept-btn-handler"); if (btn) btn.click(); }'
 
 logger = logging.getLogger(__name__)
 
@@ -12,15 +20,17 @@ class LutronHomeworksSpider(scrapy.Spider):
     name = 'lutron_homeworks'
     custom_settings = {
         'PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT': 120000,
-        'ITEM_PIPELINES': {'lutron_scraper.pipelines.LutronScraperPipeline': 300},  # Assume pipelines.py exists; process to JSON
+        'ITEM_PIPELINES': {'core.crawl_state.CrawlStatePipeline': 200, 'lutron_scraper.pipelines.LutronScraperPipeline': 300},  # Assume pipelines.py exists; process to JSON
         'DOWNLOAD_HANDLERS': {
-            'http': 'scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler',
-            'https': 'scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler',
+            'http': 'core.browser_pool.ContextRecyclingHandler',
+            'https': 'core.browser_pool.ContextRecyclingHandler',
         },
         'TWISTED_REACTOR': 'twisted.internet.asyncioreactor.AsyncioSelectorReactor',
         'PLAYWRIGHT_BROWSER_TYPE': 'chromium',
         'RETRY_TIMES': 5,
         'DOWNLOAD_FAIL_ON_DATALOSS': False,
+        # Results are parsed from the HTML alone, so stylesheets go too
+        'PLAYWRIGHT_ABORT_REQUEST': abort_request(block_types=BLOCK_RESOURCE_TYPES + ('stylesheet',)),
         'PLAYWRIGHT_LAUNCH_OPTIONS': {
             'headless': False,  # Set True for prod
             'args': ['--disable-blink-features=AutomationControlled', '--no-sandbox', '--disable-web-security', '--ignore-certificate-errors'],
@@ -36,18 +46,11 @@ class LutronHomeworksSpider(scrapy.Spider):
                 url=url,
                 meta={
                     'playwright': True,
+                    'crawl_state': False,  # Search listing: always parsed so pagination is followed; items dedupe in CrawlStatePipeline
                     'playwright_page_methods': [
-                        PageMethod('wait_for_load_state', 'networkidle', timeout=120000),
-                        PageMethod('wait_for_selector', '.coh-search-result, div.search-result, article.result', state='visible', timeout=60000),  # Wait for results (Salesforce-like)
-                        PageMethod('wait_for_function', 'document.querySelector(".coh-search-result") !== null', timeout=60000),
-                        PageMethod('evaluate', '''() => {
-                            // Accept cookies if present
-                            const acceptBtn = document.querySelector('#onetrust-accept-btn-handler');
-                            if (acceptBtn) acceptBtn.click();
-                            // Scroll to load more if infinite
-                            window.scrollTo(0, document.body.scrollHeight);
-                        }'''),
-                        PageMethod('wait_for_timeout', 3000),
+                        PageMethod('evaluate', ACCEPT_COOKIES_JS),
+                        # Returns once results exist and the DOM/network are quiet, scrolling until no more load (60 s cap)
+                        settle_page_method(selector=RESULT_SELECTOR, scroll=True, timeout_ms=60000),
                     ]
                 },
                 callback=self.parse_search,
@@ -62,7 +65,7 @@ class LutronHomeworksSpider(scrapy.Spider):
             response = HtmlResponse(url=response.url, body=response.body, encoding='utf-8')
         items_found = False
         # Extract results (adapt from Lutron old: .coh-search-result or standard)
-        for result in response.css('.coh-search-result, div.search-result, article.result, li.result-item'):
+        for result in response.css(RESULT_SELECTOR):
             items_found = True
             title = result.css('h3.title::text, a.title::text, h2::text, .search-title::text').get(default='').strip()
             description = ' '.join(result.css('p.description::text, .snippet::text, div.summary p::text').getall()).strip()
@@ -93,9 +96,9 @@ class LutronHomeworksSpider(scrapy.Spider):
                 url=urljoin(response.url, next_page),
                 meta={
                     'playwright': True,
+                    'crawl_state': False,  # Search listing: always parsed so pagination is followed; items dedupe in CrawlStatePipeline
                     'playwright_page_methods': [
-                        PageMethod('wait_for_load_state', 'networkidle', timeout=60000),
-                        PageMethod('wait_for_selector', '.coh-search-result', state='visible', timeout=60000),
+                        settle_page_method(selector=RESULT_SELECTOR, scroll=True, timeout_ms=60000),
                     ]
                 },
                 callback=self.parse_search,
@@ -104,4 +107,7 @@ class LutronHomeworksSpider(scrapy.Spider):
             )
 
     def handle_error(self, failure):
+        if failure.check(IgnoreRequest):
+            logger.debug(f"Skipped {failure.request.url}: {failure.value}")
+            return
         logger.error(f"Request failed: {failure.request.url}, Error: {failure.value}")
\ No newline at end of file
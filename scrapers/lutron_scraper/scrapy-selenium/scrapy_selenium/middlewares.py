@@ -5,17 +5,20 @@ from importlib import import_module
 from scrapy import signals
 from scrapy.exceptions import NotConfigured
 from scrapy.http import HtmlResponse
+from scrapy.utils.defer import maybe_deferred_to_future
 from selenium.webdriver.support.ui import WebDriverWait
 
 from .http import SeleniumRequest
+from .pool import DriverPool
 
 
 class SeleniumMiddleware:
     """Scrapy middleware handling the requests using selenium"""
 
     def __init__(self, driver_name, driver_executable_path,
-        browser_executable_path, command_executor, driver_arguments):
-        """Initialize the selenium webdriver
+        browser_executable_path, command_executor, driver_arguments,
+        pool_size=1, max_requests=0, page_load_strategy=None):
+        """Initialize the pool of selenium webdrivers
 
         Parameters
         ----------
@@ -29,6 +32,12 @@ class SeleniumMiddleware:
             The path of the executable binary of the browser
         command_executor: str
             Selenium remote server endpoint
+        pool_size: int
+            The number of drivers rendering requests in parallel
+        max_requests: int
+            The number of requests after which a driver is replaced (0 for never)
+        page_load_strategy: str
+            The page load strategy of the drivers ('normal', 'eager' or 'none')
         """
 
         webdriver_base_path = f'selenium.webdriver.{driver_name}'
@@ -45,25 +54,24 @@ class SeleniumMiddleware:
             driver_options.binary_location = browser_executable_path
         for argument in driver_arguments:
             driver_options.add_argument(argument)
-
-        driver_kwargs = {
-            'executable_path': driver_executable_path,
-            f'{driver_name}_options': driver_options
-        }
-
-        # locally installed driver
-        if driver_executable_path is not None:
-            driver_kwargs = {
-                'executable_path': driver_executable_path,
-                f'{driver_name}_options': driver_options
-            }
-            self.driver = driver_klass(**driver_kwargs)
-        # remote driver
-        elif command_executor is not None:
+        if page_load_strategy:
+            driver_options.page_load_strategy = page_load_strategy
+
+        def driver_factory():
+            # locally installed driver
+            if driver_executable_path is not None:
+                driver_kwargs = {
+                    'executable_path': driver_executable_path,
+                    f'{driver_name}_options': driver_options
+                }
+                return driver_klass(**driver_kwargs)
+            # remote driver
             from selenium import webdriver
             capabilities = driver_options.to_capabilities()
-            self.driver = webdriver.Remote(command_executor=command_executor,
-                                           desired_capabilities=capabilities)
+            return webdriver.Remote(command_executor=command_executor,
+                                    desired_capabilities=capabilities)
+
+        self.pool = DriverPool(driver_factory, pool_size, max_requests)
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -74,6 +82,9 @@ class SeleniumMiddleware:
         browser_executable_path = crawler.settings.get('SELENIUM_BROWSER_EXECUTABLE_PATH')
         command_executor = crawler.settings.get('SELENIUM_COMMAND_EXECUTOR')
         driver_arguments = crawler.settings.get('SELENIUM_DRIVER_ARGUMENTS')
+        pool_size = crawler.settings.getint('SELENIUM_POOL_SIZE', 1)
+        max_requests = crawler.settings.getint('SELENIUM_DRIVER_MAX_REQUESTS', 0)
+        page_load_strategy = crawler.settings.get('SELENIUM_PAGE_LOAD_STRATEGY')
 
         if driver_name is None:
             raise NotConfigured('SELENIUM_DRIVER_NAME must be set')
@@ -87,23 +98,34 @@ class SeleniumMiddleware:
             driver_executable_path=driver_executable_path,
             browser_executable_path=browser_executable_path,
             command_executor=command_executor,
-            driver_arguments=driver_arguments
+            driver_arguments=driver_arguments,
+            pool_size=pool_size,
+            max_requests=max_requests,
+            page_load_strategy=page_load_strategy
         )
 
         crawler.signals.connect(middleware.spider_closed, signals.spider_closed)
 
         return middleware
 
-    def process_request(self, request, spider):
-        """Process a request using the selenium driver if applicable"""
+    async def process_request(self, request, spider):
+        """Process a request using a selenium driver of the pool if applicable
+
+        The request is rendered in a worker thread of the pool while the reactor keeps running.
+        """
 
         if not isinstance(request, SeleniumRequest):
             return None
 
-        self.driver.get(request.url)
+        return await maybe_deferred_to_future(self.pool.run(lambda driver: self.render(driver, request)))
+
+    def render(self, driver, request):
+        """Load the request with the given driver and return the response"""
+
+        driver.get(request.url)
 
         for cookie_name, cookie_value in request.cookies.items():
-            self.driver.add_cookie(
+            driver.add_cookie(
                 {
                     'name': cookie_name,
                     'value': cookie_value
@@ -111,30 +133,27 @@ class SeleniumMiddleware:
             )
 
         if request.wait_until:
-            WebDriverWait(self.driver, request.wait_time).until(
+            WebDriverWait(driver, request.wait_time).until(
                 request.wait_until
             )
 
         if request.screenshot:
-            request.meta['screenshot'] = self.driver.get_screenshot_as_png()
+            request.meta['screenshot'] = driver.get_screenshot_as_png()
 
         if request.script:
-            self.driver.execute_script(request.script)
-
-        body = str.encode(self.driver.page_source)
+            driver.execute_script(request.script)
 
-        # Expose the driver via the "meta" attribute
-        request.meta.update({'driver': self.driver})
+        body = str.encode(driver.page_source)
 
         return HtmlResponse(
-            self.driver.current_url,
+            driver.current_url,
             body=body,
             encoding='utf-8',
             request=request
         )
 
     def spider_closed(self):
-        """Shutdown the driver when spider is closed"""
+        """Shutdown the drivers when spider is closed"""
 
-        self.driver.quit()
+        self.pool.close()
 
@@ -0,0 +1,102 @@
+"""This module contains the ``DriverPool`` class"""
+
+import logging
+import threading
+
+from twisted.internet import threads
+from twisted.python.threadpool import ThreadPool
+
+logger = logging.getLogger(__name__)
+
+
+class DriverPool:
+    """Pool of selenium drivers used from a dedicated thread pool
+
+    WebDriver calls are blocking: running them in worker threads keeps the reactor free,
+    so up to ``size`` requests are rendered at the same time.
+    """
+
+    def __init__(self, driver_factory, size=1, max_requests=0):
+        """Initialize the pool (the drivers are started on first use)
+
+        Parameters
+        ----------
+        driver_factory: callable
+            Called without arguments to start a new driver
+        size: int
+            The maximum number of drivers, and of requests rendered in parallel
+        max_requests: int
+            The number of requests after which a driver is quit and replaced (0 for never)
+
+        """
+
+        self.driver_factory = driver_factory
+        self.size = max(1, size)
+        self.max_requests = max_requests
+        self.idle = []
+        self.drivers = set()
+        self.lock = threading.Lock()
+        self.threadpool = ThreadPool(minthreads=0, maxthreads=self.size, name='scrapy-selenium')
+        self.threadpool.start()
+
+    def _checkout(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        driver = self.driver_factory()
+        with self.lock:
+            self.drivers.add(driver)
+        return [driver, 0]
+
+    def _checkin(self, slot, healthy):
+        slot[1] += 1
+        if healthy and not (self.max_requests and slot[1] >= self.max_requests):
+            with self.lock:
+                self.idle.append(slot)
+            return
+        with self.lock:
+            self.drivers.discard(slot[0])
+        self._quit(slot[0])
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception as exception:
+            logger.warning('Failed to quit the driver: %s', exception)
+
+    def _call(self, function):
+        slot = self._checkout()
+        try:
+            result = function(slot[0])
+        except Exception:
+            # A driver that raised may be in any state: replace it
+            self._checkin(slot, False)
+            raise
+        self._checkin(slot, True)
+        return result
+
+    def run(self, function):
+        """Call ``function(driver)`` in a worker thread, with a driver from the pool
+
+        Returns
+        -------
+        Deferred
+            Fired with the result of ``function`` in the reactor thread
+
+        """
+
+        from twisted.internet import reactor
+
+        return threads.deferToThreadPool(reactor, self.threadpool, self._call, function)
+
+    def close(self):
+        """Stop the worker threads and quit all the drivers"""
+
+        self.threadpool.stop()
+        with self.lock:
+            drivers = list(self.drivers)
+            self.drivers.clear()
+            self.idle.clear()
+        for driver in drivers:
+            self._quit(driver)
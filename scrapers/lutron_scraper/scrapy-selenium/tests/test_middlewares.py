@@ -4,6 +4,7 @@ from unittest.mock import patch
 
 from scrapy import Request
 from scrapy.crawler import Crawler
+from twisted.internet import defer
 
 from scrapy_selenium.http import SeleniumRequest
 from scrapy_selenium.middlewares import SeleniumMiddleware
@@ -29,30 +30,36 @@ class SeleniumMiddlewareTestCase(BaseScrapySeleniumTestCase):
 
     @classmethod
     def tearDownClass(cls):
-        """Close the selenium webdriver"""
+        """Close the selenium webdrivers"""
 
         super().tearDownClass()
 
-        cls.selenium_middleware.driver.quit()
+        cls.selenium_middleware.pool.close()
 
-    def test_from_crawler_method_should_initialize_the_driver(self):
-        """Test that the ``from_crawler`` method should initialize the selenium driver"""
+    def test_from_crawler_method_should_initialize_the_pool(self):
+        """Test that the ``from_crawler`` method should initialize the pool of selenium drivers"""
 
         crawler = Crawler(
             spidercls=self.spider_klass,
-            settings=self.settings
+            settings=dict(self.settings, SELENIUM_POOL_SIZE=2, SELENIUM_DRIVER_MAX_REQUESTS=10)
         )
 
         selenium_middleware = SeleniumMiddleware.from_crawler(crawler)
 
-        # The driver must be initialized
-        self.assertIsNotNone(selenium_middleware.driver)
+        # The pool must be initialized with the settings
+        self.assertEqual(selenium_middleware.pool.size, 2)
+        self.assertEqual(selenium_middleware.pool.max_requests, 10)
+
+        def get_title(driver):
+            driver.get('http://www.python.org')
+            return driver.title
 
-        # We can now use the driver
-        selenium_middleware.driver.get('http://www.python.org')
-        self.assertIn('Python', selenium_middleware.driver.title)
+        # We can now use a driver of the pool
+        deferred = selenium_middleware.pool.run(get_title)
+        deferred.addCallback(lambda title: self.assertIn('Python', title))
+        deferred.addBoth(lambda result: selenium_middleware.pool.close() or result)
 
-        selenium_middleware.driver.close()
+        return deferred
 
     def test_spider_closed_should_close_the_driver(self):
         """Test that the ``spider_closed`` method should close the driver"""
@@ -64,44 +71,50 @@ class SeleniumMiddlewareTestCase(BaseScrapySeleniumTestCase):
 
         selenium_middleware = SeleniumMiddleware.from_crawler(crawler)
 
-        with patch.object(selenium_middleware.driver, 'quit') as mocked_quit:
+        with patch.object(selenium_middleware.pool, 'close') as mocked_close:
             selenium_middleware.spider_closed()
 
-        mocked_quit.assert_called_once()
+        mocked_close.assert_called_once()
+
+        selenium_middleware.pool.close()
 
     def test_process_request_should_return_none_if_not_selenium_request(self):
         """Test that the ``process_request`` should return none if not selenium request"""
 
         scrapy_request = Request(url='http://not-an-url')
 
-        self.assertIsNone(
+        deferred = defer.ensureDeferred(
             self.selenium_middleware.process_request(
                 request=scrapy_request,
                 spider=None
             )
         )
 
+        return deferred.addCallback(self.assertIsNone)
+
     def test_process_request_should_return_a_response_if_selenium_request(self):
         """Test that the ``process_request`` should return a response if selenium request"""
 
         selenium_request = SeleniumRequest(url='http://www.python.org')
 
-        html_response = self.selenium_middleware.process_request(
-            request=selenium_request,
-            spider=None
+        deferred = defer.ensureDeferred(
+            self.selenium_middleware.process_request(
+                request=selenium_request,
+                spider=None
+            )
         )
 
-        # We have access to the driver on the response via the "meta"
-        self.assertEqual(
-            html_response.meta['driver'],
-            self.selenium_middleware.driver
-        )
+        def check_response(html_response):
+            # The driver is back in the pool, so it is not exposed on the response
+            self.assertNotIn('driver', html_response.meta)
 
-        # We also have access to the "selector" attribute on the response
-        self.assertEqual(
-            html_response.selector.xpath('//title/text()').extract_first(),
-            'Welcome to Python.org'
-        )
+            # We also have access to the "selector" attribute on the response
+            self.assertEqual(
+                html_response.selector.xpath('//title/text()').extract_first(),
+                'Welcome to Python.org'
+            )
+
+        return deferred.addCallback(check_response)
 
     def test_process_request_should_return_a_screenshot_if_screenshot_option(self):
         """Test that the ``process_request`` should return a response with a screenshot"""
@@ -111,12 +124,16 @@ class SeleniumMiddlewareTestCase(BaseScrapySeleniumTestCase):
             screenshot=True
         )
 
-        html_response = self.selenium_middleware.process_request(
-            request=selenium_request,
-            spider=None
+        deferred = defer.ensureDeferred(
+            self.selenium_middleware.process_request(
+                request=selenium_request,
+                spider=None
+            )
         )
 
-        self.assertIsNotNone(html_response.meta['screenshot'])
+        return deferred.addCallback(
+            lambda html_response: self.assertIsNotNone(html_response.meta['screenshot'])
+        )
 
     def test_process_request_should_execute_script_if_script_option(self):
         """Test that the ``process_request`` should execute the script and return a response"""
@@ -126,12 +143,16 @@ class SeleniumMiddlewareTestCase(BaseScrapySeleniumTestCase):
             script='document.title = "scrapy_selenium";'
         )
 
-        html_response = self.selenium_middleware.process_request(
-            request=selenium_request,
-            spider=None
+        deferred = defer.ensureDeferred(
+            self.selenium_middleware.process_request(
+                request=selenium_request,
+                spider=None
+            )
         )
 
-        self.assertEqual(
-            html_response.selector.xpath('//title/text()').extract_first(),
-            'scrapy_selenium'
+        return deferred.addCallback(
+            lambda html_response: self.assertEqual(
+                html_response.selector.xpath('//title/text()').extract_first(),
+                'scrapy_selenium'
+            )
         )
@@ -0,0 +1,123 @@
+"""This module contains the test cases for the ``DriverPool`` of the ``scrapy_selenium`` package"""
+
+import threading
+import time
+
+from twisted.internet.defer import gatherResults
+from twisted.trial.unittest import TestCase
+
+from scrapy_selenium.pool import DriverPool
+
+
+class FakeDriver:
+    """Stand-in for a selenium driver, recording the calls made to it"""
+
+    def __init__(self):
+        self.urls = []
+        self.quit_count = 0
+
+    def get(self, url):
+        self.urls.append(url)
+
+    def quit(self):
+        self.quit_count += 1
+
+
+class DriverPoolTestCase(TestCase):
+    """Test case for the ``DriverPool``"""
+
+    def setUp(self):
+        self.started = []
+
+    def driver_factory(self):
+        driver = FakeDriver()
+        self.started.append(driver)
+        return driver
+
+    def make_pool(self, **kwargs):
+        pool = DriverPool(self.driver_factory, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_run_should_call_the_function_with_a_driver_in_a_worker_thread(self):
+        """Test that ``run`` should fire with the result of the function called in another thread"""
+
+        pool = self.make_pool()
+        main_thread = threading.current_thread()
+
+        def visit(driver):
+            driver.get('http://example.com')
+            return driver, threading.current_thread()
+
+        def check(result):
+            driver, thread = result
+            self.assertIsInstance(driver, FakeDriver)
+            self.assertEqual(driver.urls, ['http://example.com'])
+            self.assertIsNot(thread, main_thread)
+
+        return pool.run(visit).addCallback(check)
+
+    def test_run_should_render_in_parallel_up_to_the_pool_size(self):
+        """Test that up to ``size`` functions should run at the same time, each with its own driver"""
+
+        pool = self.make_pool(size=3)
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow(driver):
+            with lock:
+                running.append(driver)
+                peak.append(len(running))
+            time.sleep(0.2)
+            with lock:
+                running.remove(driver)
+
+        def check(_):
+            self.assertEqual(max(peak), 3)
+            self.assertEqual(len(self.started), 3)
+
+        return gatherResults([pool.run(slow) for _ in range(6)]).addCallback(check)
+
+    def test_drivers_should_be_replaced_after_max_requests(self):
+        """Test that a driver should be quit and replaced once it has handled ``max_requests`` requests"""
+
+        pool = self.make_pool(size=1, max_requests=2)
+
+        def check(_):
+            self.assertEqual(len(self.started), 3)
+            self.assertEqual([driver.quit_count for driver in self.started], [1, 1, 1])
+
+        deferred = gatherResults([pool.run(lambda driver: driver.get('http://example.com')) for _ in range(6)])
+
+        return deferred.addCallback(check)
+
+    def test_driver_should_be_replaced_after_an_error(self):
+        """Test that a driver whose function raised should be quit and not reused"""
+
+        pool = self.make_pool(size=1)
+
+        def fail(driver):
+            raise ValueError('broken page')
+
+        def check(_):
+            self.assertEqual(len(self.started), 2)
+            self.assertEqual(self.started[0].quit_count, 1)
+            self.assertEqual(self.started[1].quit_count, 0)
+
+        deferred = self.assertFailure(pool.run(fail), ValueError)
+        deferred.addCallback(lambda _: pool.run(lambda driver: driver.get('http://example.com')))
+
+        return deferred.addCallback(check)
+
+    def test_close_should_quit_all_the_drivers(self):
+        """Test that ``close`` should quit the idle drivers"""
+
+        pool = DriverPool(self.driver_factory, size=2)
+
+        def check(_):
+            pool.close()
+            self.assertEqual([driver.quit_count for driver in self.started], [1, 1])
+            self.assertEqual(pool.drivers, set())
+
+        return gatherResults([pool.run(lambda driver: time.sleep(0.1)) for _ in range(2)]).addCallback(check)
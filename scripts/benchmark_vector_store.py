@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Root path for core/
+from core.local_vector_store import NumpyVectorStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv(dotenv_path='/home/vincent/ixome/.env')
+
+def benchmark(path=None, count=50000, queries=200, top_k=5, batch_size=32, dimension=1536):
+    """Time top-k queries against the local store (saved troubleshooter-index data or random vectors)."""
+    store = NumpyVectorStore(dimension=dimension, path=path)
+    if not len(store):
+        logger.info(f"No saved vectors at {path}; generating {count} random {dimension}-dim vectors")
+        rng = np.random.default_rng(0)
+        for start in range(0, count, 1000):
+            values = rng.standard_normal((min(1000, count - start), dimension), dtype=np.float32)
+            store.upsert([(f"bench_{start + i}", v, {}) for i, v in enumerate(values)])
+    probes = np.random.default_rng(1).standard_normal((queries, dimension), dtype=np.float32)
+
+    start = time.perf_counter()
+    for probe in probes:
+        store.query(vector=probe, top_k=top_k, include_metadata=True)
+    single = (time.perf_counter() - start) / queries
+
+    start = time.perf_counter()
+    for i in range(0, queries, batch_size):
+        store.query_many(probes[i:i + batch_size], top_k=top_k, include_metadata=True)
+    batched = (time.perf_counter() - start) / queries
+
+    logger.info(f"{len(store)} vectors: {single * 1000:.2f} ms/query single, {batched * 1000:.2f} ms/query batched ({batch_size} per batch)")
+    return single, batched
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency benchmark for the local NumPy vector store")
+    parser.add_argument('--path', default=os.getenv('LOCAL_VECTOR_STORE_PATH'))
+    parser.add_argument('--count', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=32)
+    args = parser.parse_args()
+    benchmark(args.path, args.count, args.queries, args.top_k, args.batch_size)
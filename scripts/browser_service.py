@@ -0,0 +1,17 @@
+import os
+import sys
+import logging
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Root path for core/
+from core.browser_service import run_service, SERVICE_PORT, SERVICE_PROFILE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm Chromium for Playwright crawls; attach with PLAYWRIGHT_CDP_URL=http://127.0.0.1:<port>")
+    parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    parser.add_argument('--profile', default=SERVICE_PROFILE)
+    parser.add_argument('--headed', action='store_true', help="Show the browser window")
+    args = parser.parse_args()
+    run_service(args.port, args.profile, headless=not args.headed)
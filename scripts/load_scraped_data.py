@@ -1,11 +1,20 @@
-import json
 import os
 import logging
-import uuid
-from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
-import psycopg2
+import sys
+from collections import Counter
 from dotenv import load_dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Root path for core/
+from core.db import get_pg_connection
+from core.embedding_pool import AsyncEmbeddingExecutor
+from core.chunking import chunk_records, chunk_metadata
+from core.vector_store import get_vector_store
+from core.manifest import get_manifest, plan_files, document_key, document_id, vector_id, CONTENT_FIELDS
+from core.upsert import UpsertWriter
+from core.hydrate import vector_metadata
+from core.schema import migrate, upsert_documents
+from core.record_reader import iter_record_files
+from core.records import normalize_records
+from core.crawl_state import acknowledge_loaded
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,103 +22,84 @@ logger = logging.getLogger(__name__)
 load_dotenv(dotenv_path='/home/vincent/ixome/.env', override=True)
 
 def get_db_connection():
-    return psycopg2.connect(
-        dbname=os.getenv("PG_DBNAME"),
-        user=os.getenv("PG_USER"),
-        password=os.getenv("PG_PASSWORD"),
-        host=os.getenv("PG_HOST", "localhost"),
-        port=os.getenv("PG_PORT", 5432)
-    )
+    return get_pg_connection()  # Pooled; returned to the pool when the with block exits
 
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index_name = "troubleshooter-index"
-if index_name not in pc.list_indexes().names():
-    pc.create_index(name=index_name, dimension=1536, metric='cosine', spec=ServerlessSpec(cloud='aws', region=os.getenv("PINECONE_ENVIRONMENT", "us-east-1")))
-index = pc.Index(index_name)
+index = get_vector_store("troubleshooter-index", dimension=1536, create=True)  # Connects (and creates the index if missing) on first use
 
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+embedder = AsyncEmbeddingExecutor()  # Cached, concurrent and rate limited
 
 def get_embedding(text):
     if not text.strip():
         return None
-    try:
-        response = openai_client.embeddings.create(input=text, model="text-embedding-ada-002")
-        return response.data[0].embedding
-    except Exception as e:
-        logger.error(f"Embedding error: {e}")
-        return None
+    embedding = embedder.embed_query(text)
+    if embedding is None:
+        logger.error(f"Embedding error for text '{text[:50]}...'")
+    return embedding
 
-def load_json_data(file_path):
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            try:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    data = [data]
-                return [item for item in data if isinstance(item, dict) and ('issue' in item or 'title' in item) and ('solution' in item or 'description' in item)]
-            except json.JSONDecodeError:
-                f.seek(0)
-                data = []
-                for line in f:
-                    if line.strip():
-                        try:
-                            item = json.loads(line)
-                            if isinstance(item, dict) and ('issue' in item or 'title' in item) and ('solution' in item or 'description' in item):
-                                # Normalize keys
-                                if 'title' in item:
-                                    item['issue'] = item['title']
-                                if 'description' in item:
-                                    item['solution'] = item['description']
-                                data.append(item)
-                        except json.JSONDecodeError:
-                            continue
-                return data
-    except Exception as e:
-        logger.error(f"Load {file_path} failed: {e}")
-        return []
+def load_json_data(file_path, on_error=None):
+    """Stream normalized records from a JSON array, JSONL (optionally gzipped or rotated into parts) or Parquet file without loading it whole.
+
+    Read errors propagate and corrupt records are reported to on_error, so plan_files() can turn pruning off.
+    """
+    # title/description are folded into issue/solution; records need both
+    yield from normalize_records(iter_record_files(file_path, columns=CONTENT_FIELDS, on_error=on_error), required=('issue', 'solution'))
 
 def insert_into_postgres(data):
     db_ids = []
     try:
         with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                for item in data:
-                    cur.execute(
-                        "INSERT INTO dealer_info (brand, issue, solution, product, category, url) VALUES (%s, %s, %s, %s, %s, %s) RETURNING id",
-                        ('Lutron', item.get('issue', ''), item.get('solution', ''), item.get('product', ''), item.get('category', ''), item.get('url', ''))
-                    )
-                    db_id = cur.fetchone()[0]
-                    db_ids.append(db_id)
-                conn.commit()
-                logger.info(f"Inserted {len(data)} to PG")
+            migrate(conn)
+            # COPY into a staging table and merge on the canonical URL; ids come back in input order
+            db_ids = upsert_documents(conn, data, 'Lutron', 'dealer_info')
+            conn.commit()
+            logger.info(f"Inserted {len(data)} to PG")
     except Exception as e:
         logger.error(f"PG insert failed: {e}")
     return db_ids
 
-def upsert_to_pinecone(data, db_ids):
+def upsert_to_pinecone(data, db_ids, plan=None):
+    """Upsert data under stable IDs; with a manifest plan, also delete stale vectors and record the run."""
+    keys = [key for key, _, _ in plan.changed] if plan else [document_key(item) for item in data]
     vectors = []
-    for item, db_id in zip(data, db_ids):
-        solution = item.get('solution', '')
-        text = f"Lutron {item.get('issue', '')} {solution} {item.get('product', '')}".strip()
-        embedding = get_embedding(text)
+    embedded = set()
+    chunks = chunk_records(
+        data,
+        text_fn=lambda item: item.solution,
+        header_fn=lambda item: f"Lutron {item.issue} {item.product}"
+    )
+    embeddings = embedder.embed_texts([chunk['text'] for _, chunk in chunks])
+    for c, ((i, chunk), embedding) in enumerate(zip(chunks, embeddings)):
         if embedding is None:
             continue
+        item, db_id = data[i], db_ids[i]
+        solution = item.solution
         word_count = len(solution.split())
         metadata = {
             'brand': 'Lutron',
-            'issue': item.get('issue', ''),
+            'issue': item.issue,
             'solution': solution if word_count < 100 else '',
-            'product': item.get('product', ''),
-            'category': item.get('category', ''),
-            'url': item.get('url', ''),
-            'db_id': str(db_id)
+            'product': item.product,
+            'category': item.category,
+            'url': item.url,
+            'db_id': str(db_id),
+            'source': 'documents',
+            **chunk_metadata(document_id(keys[i]), chunk)
         }
-        vectors.append({'id': str(uuid.uuid4()), 'values': embedding, 'metadata': metadata})
-    batch_size = 100
-    for i in range(0, len(vectors), batch_size):
-        index.upsert(vectors=vectors[i:i + batch_size])
-        logger.info(f"Upsert batch {i//batch_size + 1}")
+        # VECTOR_METADATA=slim keeps only db_id/source/brand/product/category; text is hydrated from PG at query time
+        vectors.append({'id': vector_id(keys[i], chunk['chunk_index']), 'values': embedding, 'metadata': vector_metadata(metadata)})
+        embedded.add(c)
+    # Batches are packed by payload size and vector count and sent in parallel; failed batches are retried
+    with UpsertWriter(index) as writer:
+        writer.add(vectors)
+    if plan:
+        failed = {i for c, (i, chunk) in enumerate(chunks)
+                  if c not in embedded or vector_id(keys[i], chunk['chunk_index']) in writer.failed_ids}
+        get_manifest().commit(index, 'dealer_info', plan, Counter(i for i, _ in chunks), failed)
+        acknowledge_loaded(plan, failed)  # Incremental crawls stop re-emitting what is now loaded
+    index.flush()
     logger.info(f"Total {len(vectors)} to Pinecone")
+    if embedder.cache is not None:
+        logger.info(f"Embedding cache: {embedder.cache.stats()}")
 
 def main():
     data_files = [
@@ -118,14 +108,16 @@ def main():
         '/home/vincent/ixome/ixome-data/scrapers/lutron_scraper/lutron_data.json',
         '/home/vincent/ixome/ixome-data/scrapers/lutron_scraper/lutron_homeworks_data.json'  # New
     ]
-    all_data = []
-    for file_path in data_files:
-        if os.path.exists(file_path):
-            all_data.extend(load_json_data(file_path))
-    if all_data:
-        db_ids = insert_into_postgres(all_data)
-        if len(db_ids) == len(all_data):
-            upsert_to_pinecone(all_data, db_ids)
+    # Records stream through the manifest plan; only new or changed ones are kept in memory.
+    # Pruning is off when any input is missing, unreadable or marked incremental (only changed items),
+    # so documents absent from it are not taken for deleted
+    plan = plan_files(get_manifest(), 'dealer_info', data_files, load_json_data)
+    if plan.changed or plan.unchanged:
+        # Unchanged records were loaded by an earlier run; only new or changed ones go to PG and Pinecone
+        changed = [item for _, _, item in plan.changed]
+        db_ids = insert_into_postgres(changed) if changed else []
+        if len(db_ids) == len(changed):
+            upsert_to_pinecone(changed, db_ids, plan)
     else:
         logger.warning("No data")
 
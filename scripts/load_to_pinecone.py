@@ -1,10 +1,17 @@
-import json
 import os
 import logging
-import uuid
-from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
+import sys
+from collections import Counter
 from dotenv import load_dotenv
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Root path for core/
+from core.embeddings import BatchEmbedder
+from core.chunking import chunk_records, chunk_metadata
+from core.vector_store import get_vector_store
+from core.manifest import get_manifest, plan_files, document_id, vector_id, CONTENT_FIELDS
+from core.upsert import UpsertWriter
+from core.record_reader import iter_record_files
+from core.records import normalize_records
+from core.crawl_state import acknowledge_loaded
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -12,100 +19,79 @@ logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv(dotenv_path='/home/vincent/ixome/.env')
-PINECONE_API_KEY = os.getenv('PINECONE_API_KEY')
-PINECONE_ENVIRONMENT = os.getenv('PINECONE_ENVIRONMENT')
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
 index_name = 'troubleshooter-index'
 
-# Ensure index has correct dimension (1536 for text-embedding-ada-002)
-if index_name in pc.list_indexes().names():
-    index_desc = pc.describe_index(index_name)
-    if index_desc.dimension != 1536:
-        logger.info(f"Index {index_name} has dimension {index_desc.dimension}. Deleting and recreating with 1536.")
-        pc.delete_index(index_name)
-        pc.create_index(
-            name=index_name,
-            dimension=1536,
-            metric='cosine',
-            spec=ServerlessSpec(cloud='aws', region=PINECONE_ENVIRONMENT)
-        )
-else:
-    logger.info(f"Creating new index {index_name} with dimension 1536.")
-    pc.create_index(
-        name=index_name,
-        dimension=1536,
-        metric='cosine',
-        spec=ServerlessSpec(cloud='aws', region=PINECONE_ENVIRONMENT)
-    )
-
-# Connect to the index
-index = pc.Index(index_name)
+# Vector store (Pinecone unless VECTOR_STORE=local); ensures dimension 1536 for text-embedding-ada-002 on first use
+index = get_vector_store(index_name, dimension=1536, create=True, recreate_on_mismatch=True)
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# Initialize embedder (OpenAI client + shared embedding cache)
+embedder = BatchEmbedder()
 
 def get_embedding(text):
-    """Generate embedding for the given text using OpenAI."""
+    """Generate embedding for the given text using OpenAI, served from the cache when unchanged."""
     if not text.strip():
         logger.warning("Empty text provided for embedding. Skipping.")
         return None
-    try:
-        response = openai_client.embeddings.create(
-            input=text,
-            model="text-embedding-ada-002"
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        logger.error(f"Error generating embedding: {e}")
-        return None
+    embedding = embedder.embed_query(text)
+    if embedding is None:
+        logger.error(f"Error generating embedding for text '{text[:50]}...'")
+    return embedding
 
 def load_to_pinecone():
     """Load data from lutron_data.json into Pinecone."""
     try:
-        data = []
         json_file = '/home/vincent/ixome/scrapy-selenium/lutron_scraper/lutron_data.json'
-        with open(json_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():  # Skip empty lines
-                    try:
-                        item = json.loads(line)
-                        data.append(item)
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Skipping malformed JSON line: {line[:50]}... {e}")
-                        continue
+        # JSONL (incl. rotated/gzipped parts), JSON array or Parquet (content columns only), streamed and normalized once
+        read = lambda path, on_error: normalize_records(iter_record_files(path, columns=CONTENT_FIELDS, on_error=on_error))
 
-        if not data:
+        # Skip records already upserted with the same content; stale vectors are deleted below unless the file was
+        # missing, corrupt or written by an incremental crawl (only changed items)
+        manifest = get_manifest()
+        plan = plan_files(manifest, 'lutron_data', [json_file], read)
+        if not plan.changed and not plan.unchanged:
             logger.warning("No valid data found in lutron_data.json.")
             return
+        data = [item for _, _, item in plan.changed]
+        keys = [key for key, _, _ in plan.changed]
 
         vectors = []
-        for item in data:
-            # Combine fields for embedding
-            text = f"{item.get('issue', '')} {item.get('solution', '')} {item.get('product', '')}".strip()
-            embedding = get_embedding(text)
+        # Split long solutions into token-bounded chunks; issue/product head every chunk
+        chunks = chunk_records(
+            data,
+            text_fn=lambda item: item.solution,
+            header_fn=lambda item: f"{item.issue} {item.product}"
+        )
+        embeddings = embedder.embed_texts([chunk['text'] for _, chunk in chunks])
+        failed = set()
+        for (i, chunk), embedding in zip(chunks, embeddings):
             if embedding is None:
+                failed.add(i)
                 continue
-            vector_id = str(uuid.uuid4())
+            item = data[i]
             vectors.append({
-                'id': vector_id,
+                'id': vector_id(keys[i], chunk['chunk_index']),
                 'values': embedding,
                 'metadata': {
-                    'issue': item.get('issue', ''),
-                    'solution': item.get('solution', ''),
-                    'product': item.get('product', ''),
-                    'category': item.get('category', ''),
-                    'url': item.get('url', '')
+                    'issue': item.issue,
+                    'solution': chunk['text'],
+                    'product': item.product,
+                    'category': item.category,
+                    'url': item.url,
+                    **chunk_metadata(document_id(keys[i]), chunk)
                 }
             })
 
         if vectors:
-            index.upsert(vectors=vectors)
-            logger.info(f"Successfully upserted {len(vectors)} vectors to Pinecone index {index_name}")
+            # Size-bounded parallel batches instead of one request carrying every vector
+            with UpsertWriter(index) as writer:
+                writer.add(vectors)
+            failed.update(i for i, chunk in chunks if vector_id(keys[i], chunk['chunk_index']) in writer.failed_ids)
+            logger.info(f"Successfully upserted {writer.upserted} vectors to Pinecone index {index_name}")
         else:
             logger.warning("No vectors generated to upsert.")
+        manifest.commit(index, 'lutron_data', plan, Counter(i for i, _ in chunks), failed)
+        acknowledge_loaded(plan, failed)  # Incremental crawls stop re-emitting what is now loaded
+        index.flush()
 
     except Exception as e:
         logger.error(f"Error loading to Pinecone: {e}")
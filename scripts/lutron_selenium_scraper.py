@@ -5,10 +5,13 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
+import os
+import sys
 import json
-import time
 from urllib.parse import urljoin
 import logging
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.page_wait import settle_driver  # DOM/network-quiet waits instead of fixed sleeps
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,7 +27,7 @@ def scrape_lutron_homeworks():
 
     base_url = 'https://support.lutron.com/us/en/search?q=homeworks&scope=all'
     driver.get(base_url)
-    time.sleep(5)
+    settle_driver(driver, selector='a[href*="/article"], a[href*="/product"]')
     try:
         accept_btn = wait.until(EC.element_to_be_clickable((By.ID, 'onetrust-accept-btn-handler')))
         accept_btn.click()
@@ -35,18 +38,19 @@ def scrape_lutron_homeworks():
     page = 1
     while True:
         logger.info(f"Scraping page {page}")
-        # Scroll for load
-        for _ in range(5):
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(3)
+        # Scroll until the results stop growing
+        settle_driver(driver, scroll=True, timeout_ms=60000)
         # Broader XPath: All /article, /product, or "HomeWorks" links after "results"
         links = driver.find_elements(By.XPATH, '//div[contains(text(), "results")]//following::a[contains(@href, "/article") or contains(@href, "/product") or contains(translate(text(), "ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"), "homeworks")]')
-        for link in links[:20]:
-            title = link.text.strip()
-            url = link.get_attribute('href')
+        # Read titles/URLs first; the elements go stale once another page loads
+        targets = [(link.text.strip(), link.get_attribute('href')) for link in links[:20]]
+        results_window = driver.current_window_handle
+        for title, url in targets:
             if url:
+                # Open articles in a second tab so the results page keeps its scroll position and pagination
+                driver.switch_to.new_window('tab')
                 driver.get(url)
-                time.sleep(2)
+                settle_driver(driver, selector='p', quiet_ms=300, timeout_ms=15000)
                 desc_elements = driver.find_elements(By.TAG_NAME, 'p')
                 desc = ' '.join([el.text.strip() for el in desc_elements if el.text.strip()])[:1000]
                 item = {
@@ -58,14 +62,14 @@ def scrape_lutron_homeworks():
                 }
                 data.append(item)
                 logger.info(f"Scraped: {title[:50]}...")
-                driver.back()
-                time.sleep(1)
+                driver.close()
+                driver.switch_to.window(results_window)
         # Next page: Explicit wait/click
         try:
             next_btn = wait.until(EC.element_to_be_clickable((By.XPATH, '//a[contains(text(), "Next") or contains(@aria-label, "Next")]')))
             if next_btn:
                 next_btn.click()
-                time.sleep(5)
+                settle_driver(driver)
                 page += 1
             else:
                 break
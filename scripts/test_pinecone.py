@@ -1,16 +1,17 @@
-from pinecone import Pinecone
 import os
+import sys
 from dotenv import load_dotenv
-import openai
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from core.embeddings import BatchEmbedder
+from core.vector_store import get_vector_store
 
 load_dotenv('/home/vincent/ixome/.env')
-pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
-index = pc.Index('troubleshooter-index')
-client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+index = get_vector_store('troubleshooter-index')
+embedder = BatchEmbedder()
 
 queries = ["Touch Screens", "Microphone", "Lutron"]
 for query in queries:
-    embedding = client.embeddings.create(input=query, model='text-embedding-ada-002').data[0].embedding
+    embedding = embedder.embed_query(query)
     results = index.query(vector=embedding, top_k=2, include_metadata=True)
     print(f"\nQuery: {query}")
     print(results)
\ No newline at end of file
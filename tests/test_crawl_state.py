@@ -0,0 +1,78 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Root path for core/
+from core.crawl_state import CrawlState
+from core.manifest import IngestManifest, plan_files
+from core.record_reader import iter_record_files
+from core.record_writer import RecordWriter, mark_incremental, is_incremental
+
+ITEM = {'url': 'https://example.com/a', 'issue': 'issue', 'solution': 'solution'}
+
+
+class CrawlStateItemsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.state = CrawlState(os.path.join(self.directory, 'crawl_state.sqlite'))
+        self.manifest = IngestManifest(os.path.join(self.directory, 'manifest.sqlite'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_unloaded_item_should_be_emitted_again(self):
+        self.assertTrue(self.state.record_item(ITEM))
+        self.assertTrue(self.state.record_item(ITEM))
+
+    def test_acknowledged_item_should_be_skipped_until_it_changes(self):
+        self.state.record_item(ITEM)
+        plan = self.manifest.plan('lutron_data', [ITEM])
+        self.state.acknowledge([key for key, _, _ in plan.changed], plan.started_at)
+
+        self.assertFalse(self.state.record_item(ITEM))
+        self.assertTrue(self.state.record_item(dict(ITEM, solution='new solution')))
+        self.assertTrue(self.state.record_item(dict(ITEM, solution='new solution')))
+
+    def test_emission_after_the_load_started_should_stay_pending(self):
+        plan = self.manifest.plan('lutron_data', [ITEM])
+        self.state.record_item(ITEM)
+        self.state.acknowledge([key for key, _, _ in plan.changed], plan.started_at)
+
+        self.assertTrue(self.state.record_item(ITEM))
+
+
+class IncrementalOutputTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'lutron_data.json')
+        self.manifest = IngestManifest(os.path.join(self.directory, 'manifest.sqlite'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, items, incremental):
+        mark_incremental(self.path, True)
+        with RecordWriter(self.path, max_bytes=0) as writer:
+            for item in items:
+                writer.write(item)
+        mark_incremental(self.path, incremental)
+
+    def test_incremental_output_should_not_be_pruned_against(self):
+        self.write([ITEM, dict(ITEM, url='https://example.com/b')], incremental=False)
+        plan_files(self.manifest, 'lutron_data', [self.path], iter_record_files)
+        self.manifest.record('lutron_data', [('https://example.com/a', 'x', 1), ('https://example.com/b', 'x', 1)])
+
+        self.write([ITEM], incremental=True)
+        self.assertTrue(is_incremental(self.path))
+        plan = plan_files(self.manifest, 'lutron_data', [self.path], iter_record_files)
+
+        self.assertEqual(plan.removed, [])
+
+        self.write([ITEM], incremental=False)
+        self.assertFalse(is_incremental(self.path))
+        plan = plan_files(self.manifest, 'lutron_data', [self.path], iter_record_files)
+
+        self.assertEqual(plan.removed, [('https://example.com/b', 1)])
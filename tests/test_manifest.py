@@ -0,0 +1,87 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # Root path for core/
+from core.manifest import IngestManifest, plan_files, vector_id
+from core.record_reader import iter_record_files
+from core.record_writer import RecordWriter
+
+
+class FakeIndex:
+    def __init__(self):
+        self.deleted = []
+
+    def delete(self, ids=None, namespace=None):
+        self.deleted.extend(ids)
+
+
+class PlanFilesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.paths = [os.path.join(self.directory, name) for name in ('control4_data.json', 'lutron_data.json')]
+        for n, path in enumerate(self.paths):
+            with RecordWriter(path, max_bytes=0) as writer:
+                for i in range(3):
+                    writer.write({'url': f'https://example.com/{n}/{i}', 'issue': f'issue {i}', 'solution': 'solution'})
+        self.manifest = IngestManifest(os.path.join(self.directory, 'manifest.sqlite'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_loader(self, index):
+        plan = plan_files(self.manifest, 'dealer_info', self.paths, iter_record_files)
+        self.manifest.commit(index, 'dealer_info', plan, {i: 1 for i in range(len(plan.changed))})
+        return plan
+
+    def test_all_inputs_present_should_prune_removed_documents(self):
+        self.run_loader(FakeIndex())
+        with RecordWriter(self.paths[1], max_bytes=0) as writer:
+            writer.write({'url': 'https://example.com/1/0', 'issue': 'issue 0', 'solution': 'solution'})
+
+        index = FakeIndex()
+        plan = self.run_loader(index)
+
+        self.assertEqual(len(plan.unchanged), 4)
+        self.assertEqual(len(plan.removed), 2)
+        self.assertEqual(sorted(index.deleted), sorted(vector_id(f'https://example.com/1/{i}') for i in (1, 2)))
+
+    def test_missing_input_should_not_prune(self):
+        self.run_loader(FakeIndex())
+        os.remove(self.paths[1])
+
+        index = FakeIndex()
+        plan = self.run_loader(index)
+
+        self.assertEqual(len(plan.unchanged), 3)
+        self.assertEqual(plan.removed, [])
+        self.assertEqual(index.deleted, [])
+        self.assertEqual(len(self.manifest.plan('dealer_info', [], prune=True).removed), 6)
+
+    def test_truncated_gzip_input_should_not_prune(self):
+        self.run_loader(FakeIndex())
+        with RecordWriter(self.paths[1], max_bytes=0, compress=True) as writer:
+            for i in range(200):
+                writer.write({'url': f'https://example.com/1/{i}', 'issue': f'issue {i}', 'solution': 'solution'})
+        with open(self.paths[1] + '.gz', 'r+b') as f:
+            f.truncate(os.path.getsize(self.paths[1] + '.gz') // 2)
+
+        index = FakeIndex()
+        plan = self.run_loader(index)
+
+        self.assertEqual(plan.removed, [])
+        self.assertEqual(index.deleted, [])
+
+    def test_truncated_json_array_should_not_prune(self):
+        self.run_loader(FakeIndex())
+        with open(self.paths[1], 'w') as f:
+            f.write('[{"url": "https://example.com/1/0", "issue": "issue 0", "solution": "solution"}, {"url": "https://exa')
+
+        index = FakeIndex()
+        plan = self.run_loader(index)
+
+        self.assertEqual(len(plan.unchanged), 4)
+        self.assertEqual(plan.removed, [])
+        self.assertEqual(index.deleted, [])